@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the cc-fraud reference pipeline in `data_and_features.py`.
+
+Synthetic `txn_log`, `user_info` and `fraud_labels` data is generated in chunks, so any scale from 1e5 to 1e9 rows runs in bounded memory, and the same seed always produces the same data.  Measured:
+[1] training_set - point-in-time join of `fraud_labels` to `txn_log`, streamed through `TrainingBatches` into split training matrices, rows/s
+[2] backfill - the SingleRecord, Aggregation and Join (`user_info` lookup) features of `txn_log` computed by an ExecutionPlan, rows/s
+[3] streaming - decoding the `txn-log-stream` messages and updating `purchase_amount` avg_last_5n / avg_last_5mins, events/s
+[4] serving - per-request latency (p50/p99) of online feature lookup + model input assembly + predict, with and without micro-batching
+
+Results are written as JSON for regression tracking, e.g.
+
+    python example/benchmark.py --rows 1e6 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "orchestra"))
+
+from feature import Aggregation  # noqa: E402
+from join import AsOfJoin  # noqa: E402
+from layout import ModelInput  # noqa: E402
+from lookup import JoinExecutor, LookupClient  # noqa: E402
+from metrics import Histogram  # noqa: E402
+from plan import ExecutionPlan  # noqa: E402
+from serving import MicroBatcher  # noqa: E402
+from store import OnlineStore  # noqa: E402
+from training import TrainingBatches  # noqa: E402
+from stream import StructDecoder  # noqa: E402
+from vectorize import BatchExecutor  # noqa: E402
+from window import AggregationExecutor, WindowAggregator  # noqa: E402
+
+
+PAYMENT_METHODS = np.array(["pos", "online", "recurring", "atm"], dtype=object)
+TXN_TYPES = np.array(["point_of_sale", "refund", "chargeback", "transfer"], dtype=object)
+START = 1640995200  # 2022-01-01, seconds since epoch
+
+# txn_log's wire order: output_features, then keys, then the timestamp
+TXN_FIELDS = [
+    ("business_name", "String"),
+    ("business_address", "String"),
+    ("payment_method", "String"),
+    ("txn_type", "String"),
+    ("purchase_amount", "Float64"),
+    ("is_card_present", "Boolean"),
+    ("txn_id", "Int64"),
+    ("user_id", "Int64"),
+    ("event_time", "Int64"),
+]
+
+
+def transactions(rows: int, users: int, seed: int, chunk_rows: int = 1000000) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    `txn_log` in chunks of columns, ordered by `event_time` (about 10 transactions per second)
+    """
+    for start in range(0, rows, chunk_rows):
+        length = min(chunk_rows, rows - start)
+        rng = np.random.default_rng([seed, start])
+        txn_id = np.arange(start, start + length, dtype=np.int64)
+        business = rng.integers(0, 5000, length)
+        yield {
+            "business_name": np.char.add("business-", business.astype(str)).astype(object),
+            "business_address": np.char.add("address-", business.astype(str)).astype(object),
+            "payment_method": PAYMENT_METHODS[rng.integers(0, len(PAYMENT_METHODS), length)],
+            "txn_type": TXN_TYPES[rng.integers(0, len(TXN_TYPES), length)],
+            "purchase_amount": np.round(rng.lognormal(3.5, 1.0, length), 2),
+            "is_card_present": rng.random(length) < 0.6,
+            "txn_id": txn_id,
+            "user_id": rng.integers(0, users, length).astype(np.int64),
+            "event_time": START + txn_id // 10,
+        }
+
+
+def fraud_labels(chunk: Dict[str, np.ndarray], seed: int) -> Dict[str, np.ndarray]:
+    """
+    `fraud_labels` for a chunk of transactions: about 1% fraud, labelled up to a day after the transaction
+    """
+    rng = np.random.default_rng([seed, int(chunk["txn_id"][0]), 1])
+    return {
+        "txn_id": chunk["txn_id"],
+        "user_id": chunk["user_id"],
+        "timestamp": chunk["event_time"] + rng.integers(60, 86400, len(chunk["txn_id"])),
+        "is_fraud": (rng.random(len(chunk["txn_id"])) < 0.01).astype(np.int32),
+    }
+
+
+def user_info(users: int, seed: int) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng([seed, 2])
+    return {
+        "user_id": np.arange(users, dtype=np.int64),
+        "user_address": np.char.add("address-", rng.integers(0, 5000, users).astype(str)).astype(object),
+        "birthday": START - rng.integers(18 * 365, 80 * 365, users) * 86400,
+    }
+
+
+def rows_of(columns: Dict[str, np.ndarray]) -> Iterator[dict]:
+    names = list(columns)
+    for values in zip(*(columns[name].tolist() for name in names)):
+        yield dict(zip(names, values))
+
+
+def joined_columns(rows: Iterator[dict], chunk_rows: int = 65536) -> Iterator[Dict[str, np.ndarray]]:
+    """
+    As-of joined rows as column chunks.  Every label must have found the features of its own transaction.
+    """
+    names = ["txn_id", "purchase_amount", "is_card_present", "is_fraud"]
+    while True:
+        chunk = [tuple(row[name] for name in names) for _, row in zip(range(chunk_rows), rows)]
+        if not chunk:
+            return
+        txn_id, amount, card_present, is_fraud = zip(*chunk)
+        if None in amount:
+            raise ValueError(f"Transaction {txn_id[amount.index(None)]} was joined without its features")
+        yield {
+            "txn_id": np.array(txn_id, dtype=np.int64),
+            "purchase_amount": np.array(amount, dtype=np.float32),
+            "is_card_present": np.array(card_present, dtype=np.float32),
+            "is_fraud": np.array(is_fraud, dtype=np.int32),
+        }
+
+
+def bench_training_set(args) -> Dict[str, Any]:
+    # fraud_labels are keyed by txn_id: each label takes the features of the transaction it labels
+    join = AsOfJoin(keys=["txn_id", "user_id"], label_timestamp="timestamp", feature_timestamp="event_time")
+    labels = (row for chunk in transactions(args.rows, args.users, args.seed) for row in rows_of(fraud_labels(chunk, args.seed)))
+    features = (row for chunk in transactions(args.rows, args.users, args.seed) for row in rows_of(chunk))
+    start = time.perf_counter()
+    joined = join.join(labels, features, ["purchase_amount", "is_card_present"])
+    batches = TrainingBatches(joined_columns(joined), ["purchase_amount", "is_card_present"], "is_fraud", ["txn_id"])
+    rows, columns = 0, 0
+    for batch in batches:
+        rows += len(batch.y_train) + len(batch.y_test)
+        columns = batch.X_train.shape[1]
+    seconds = time.perf_counter() - start
+    if rows != args.rows:
+        raise ValueError(f"Expected one training row per label, {args.rows}, got {rows}")
+    return {"rows": rows, "columns": columns, "seconds": seconds, "rows_per_second": rows / seconds}
+
+
+def _code(name: str, function, vectorized: bool = True) -> SimpleNamespace:
+    return SimpleNamespace(name=name, function=function, vectorized=vectorized)
+
+
+def _aggregation(**config) -> Aggregation:
+    aggregation = Aggregation.__new__(Aggregation)
+    aggregation.__dict__.update(config)
+    return aggregation
+
+
+def txn_features():
+    hour = SimpleNamespace(
+        name="hour",
+        input_features=["txn_log.event_time"],
+        business_logics=[_code("hour", lambda timestamp: (timestamp // 3600) % 24)],
+    )
+    is_card_present = SimpleNamespace(
+        name="is_card_present",
+        input_features=["txn_log.is_card_present"],
+        business_logics=[_code("as_int", lambda value: value.astype(np.int32))],
+    )
+    business_description = SimpleNamespace(
+        name="business_description",
+        input_features=["txn_log.business_name", "txn_log.business_address"],
+        business_logics=[_code("business_description", lambda name, address: name + " " + address)],
+    )
+    avg_last_5n = SimpleNamespace(
+        name="purchase_amount_avg_last_5n",
+        input_features=["txn_log.purchase_amount"],
+        business_logics=[_aggregation(aggregate_function="AVG", window="5n", aggregate_by=["txn_log.user_id"])],
+    )
+    users = SimpleNamespace(name="user_info", keys=[SimpleNamespace(name="user_id")])
+    distance = SimpleNamespace(
+        name="transaction_distance_to_user_address",
+        input_features=["txn_log.user_id", "txn_log.business_address"],
+        business_logics=[
+            SimpleNamespace(name="distance", function=_distance_to_user_address, input_datasources=[users])
+        ],
+    )
+    return [hour, is_card_present, business_description, avg_last_5n, distance]
+
+
+def _distance_to_user_address(user_id, business_address, **data_sources):
+    user_address = data_sources["user_info"].keys([user_id])["user_address"]
+    return 0.0 if user_address == business_address else 1.0
+
+
+def bench_backfill(args) -> Dict[str, Any]:
+    plan = ExecutionPlan.compile(txn_features(), timestamp="txn_log.event_time")
+    addresses = user_info(args.users, args.seed)["user_address"]
+
+    async def fetch_users(keys):
+        return {key: {"user_address": addresses[key]} for key in keys}
+
+    lookups = LookupClient(fetch_users)
+    executors = {
+        "SingleRecord": BatchExecutor(),
+        "Aggregation": AggregationExecutor(),
+        "Join": JoinExecutor({"user_info": lookups}),
+    }
+    rows, seconds = 0, 0.0
+    for chunk in transactions(args.rows, args.users, args.seed):
+        batch = {f"txn_log.{name}": values for name, values in chunk.items()}
+        start = time.perf_counter()
+        plan.run(batch, executors)
+        seconds += time.perf_counter() - start
+        rows += len(chunk["txn_id"])
+    lookups.close()
+    return {"rows": rows, "features": len(plan.outputs), "seconds": seconds, "rows_per_second": rows / seconds}
+
+
+def bench_streaming(args) -> Dict[str, Any]:
+    decoder = StructDecoder(TXN_FIELDS)
+    last_5n = WindowAggregator(_aggregation(aggregate_function="AVG", window="5n"))
+    last_5mins = WindowAggregator(_aggregation(aggregate_function="AVG", window=timedelta(minutes=5)))
+    events, seconds = 0, 0.0
+    for chunk in transactions(args.rows, args.users, args.seed):
+        encoded = np.empty(len(chunk["txn_id"]), dtype=decoder.dtype)
+        for name in decoder.names:
+            encoded[name] = chunk[name]
+        buffer = encoded.tobytes()
+        start = time.perf_counter()
+        columns = decoder.decode_buffer(buffer)
+        users = columns["user_id"].tolist()
+        amounts = columns["purchase_amount"].tolist()
+        times = [datetime.fromtimestamp(t, timezone.utc) for t in columns["event_time"].tolist()]
+        for user, amount, timestamp in zip(users, amounts, times):
+            last_5n.update(user, amount)
+            last_5mins.update(user, amount, timestamp)
+        seconds += time.perf_counter() - start
+        events += len(users)
+    return {"events": events, "seconds": seconds, "events_per_second": events / seconds}
+
+
+def bench_serving(args) -> Dict[str, Any]:
+    users = user_info(args.users, args.seed)
+    store = OnlineStore()
+    rng = np.random.default_rng([args.seed, 3])
+    for user in users["user_id"].tolist():
+        store.put("purchase_amount_avg_last_5n", user, float(rng.lognormal(3.5, 1.0)))
+        store.put("age_days", user, float((START - users["birthday"][user]) // 86400))
+    model = SimpleNamespace(
+        input_features=[
+            SimpleNamespace(name="purchase_amount", type="Float64"),
+            SimpleNamespace(name="is_card_present", type="Boolean"),
+            SimpleNamespace(name="purchase_amount_avg_last_5n", type="Float64"),
+            SimpleNamespace(name="age_days", type="Float64"),
+        ]
+    )
+    model_input = ModelInput.for_model(model)
+    weights = rng.normal(size=model_input.width).astype(np.float32)
+    stored = ["purchase_amount_avg_last_5n", "age_days"]
+
+    def predict(X: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-np.clip(X @ weights, -30, 30)))
+
+    def handle(request: dict) -> float:
+        record = dict(request, **store.get_features(request["user_id"], stored))
+        return float(predict(model_input.assemble(record))[0])
+
+    def handle_batch(requests: list) -> list:
+        columns = {name: [r[name] for r in requests] for name in ("purchase_amount", "is_card_present")}
+        for name in stored:
+            columns[name] = [store.get(name, r["user_id"]) for r in requests]
+        return predict(model_input.assemble_batch(columns)).tolist()
+
+    requests = [
+        {"user_id": int(u), "purchase_amount": float(a), "is_card_present": bool(c)}
+        for u, a, c in zip(
+            rng.integers(0, args.users, args.requests), rng.lognormal(3.5, 1.0, args.requests), rng.random(args.requests) < 0.6
+        )
+    ]
+
+    def run(call) -> Dict[str, Any]:
+        histogram = Histogram()
+        shards = [requests[i :: args.concurrency] for i in range(args.concurrency)]
+
+        def client(shard):
+            for request in shard:
+                start = time.perf_counter_ns()
+                call(request)
+                histogram.record(time.perf_counter_ns() - start)
+
+        threads = [threading.Thread(target=client, args=(shard,)) for shard in shards]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        summary = histogram.snapshot()
+        summary["requests_per_second"] = len(requests) / seconds
+        return summary
+
+    batcher = MicroBatcher(handle_batch, max_batch_size=64, max_delay=timedelta(milliseconds=2))
+    return {
+        "concurrency": args.concurrency,
+        "unbatched": run(handle),
+        "micro_batched": run(batcher),
+    }
+
+
+BENCHMARKS = {
+    "training_set": bench_training_set,
+    "backfill": bench_backfill,
+    "streaming": bench_streaming,
+    "serving": bench_serving,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=float, default=1e5, help="txn_log rows, e.g. 1e5 .. 1e9")
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=20000, help="serving requests")
+    parser.add_argument("--concurrency", type=int, default=16, help="concurrent serving clients")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--output", default="bench.json")
+    args = parser.parse_args()
+    args.rows = int(args.rows)
+
+    results = {}
+    for name in args.only:
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = BENCHMARKS[name](args)
+        print(json.dumps(results[name]), file=sys.stderr)
+
+    report = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "numpy": np.__version__,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-from orchestra import OrchestraClient, GetModel, ModelEndpoint
+from orchestra import OrchestraClient, GetModel, ModelEndpoint, ServingBundle
 
 from model_train import model_name
 
@@ -16,6 +16,17 @@ model = GetModel(name=model_name, version="latest")  # how can we hard link the
 
 features = model.features()
 
+# precompiled serving bundle baked into the serving image, so pods cold-start without the full Feature / Model graph.
+# backends: API lookups over HTTP, the in-process drift monitor and the prediction log.
+# the trained model itself ships in the bundle too, so pods never fetch it through the client.
+ServingBundle.build(
+    model,
+    "server-container/bundle",
+    dtype="float32",
+    backends=["API", "DriftMonitor", "PredictionLog"],
+    artifact=f"{model_name}.json",
+)
+
 model_server = ModelEndpoint(
     # machine-readable but human-understandable common name
     name="cc-fraud-main",
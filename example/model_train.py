@@ -1,6 +1,7 @@
 from data_and_features import (
     fraud_labels,
     local_test_sample_training_examples,
+    all_training_examples,
     hour,
     minute,
     month,
@@ -77,6 +78,9 @@ with mlflow.start_run():
 
     mlflow.sklearn.log_model(xgb, model_name, registered_model_name=model_name)
 
+    # the artifact model_deploy.py ships in the serving bundle, so serving pods load it without the client
+    xgb.save_model(f"{model_name}.json")
+
     mlflow_uri = mlflow.geturi()  # this is fake code but i know this function exists
 
     # this registers everything about the model as a Model() object
@@ -88,6 +92,17 @@ with mlflow.start_run():
 start_train.end()
 
 
+# when the training examples don't fit in memory (e.g., the full `all_training_examples` table),
+# stream fixed-size batches instead - the train/test split is a stable hash of the keys
+for (X_train, X_test, y_train, y_test) in orchestra.get_training_batches(
+    training_examples_data_source=fraud_labels,
+    training_examples_data_provider=all_training_examples,
+    features=[hour, purchase_amount, transaction_distance_to_user_address],
+    batch_size=100000,
+):
+    xgb.fit(X_train, y_train, xgb_model=xgb.get_booster())  # continue training batch by batch
+
+
 # now, imagine how a feature expirementation tool here would work
 
 # define the expirement
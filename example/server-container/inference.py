@@ -1,40 +1,101 @@
 #!/usr/bin/env python3
 
-import pandas as pd
+from datetime import timedelta
+from functools import lru_cache
+from typing import List
+
 import numpy as np
 from fastapi import APIRouter
-from orchestralib import OrchestraClient
+from xgboost import XGBClassifier
+from orchestralib import DriftMonitor, OrchestraClient, MicroBatcher, PredictionLogSink, ServingBundle, StageTimers
 
 router = APIRouter()
 
-orchestra = OrchestraClient(
-    api_key="74738ff5-5367-5958-9aee-98fffdcd1876",
-    organization="novuslabs",
-    environment="production-serving",
-)
+# column layout, dtypes, compiled transformations and the trained model, precomputed at deploy time (see model_deploy.py);
+# loading it imports only numpy plus the backends this model's serving path needs
+bundle = ServingBundle.load("/bundle")
+model_input = bundle.model_input
+
+# the model comes from the bundle baked into the image, not from the client
+model_obj = XGBClassifier()
+model_obj.load_model(bundle.artifact)
+
+
+@lru_cache(maxsize=None)
+def orchestra() -> OrchestraClient:
+    # the full client (feature fetches, input validation) is built by the first request instead of at boot
+    return OrchestraClient(
+        api_key="74738ff5-5367-5958-9aee-98fffdcd1876",
+        organization="novuslabs",
+        environment="production-serving",
+    )
+
+# per-stage latency histograms, served at http://127.0.0.1:9464/metrics and dumped every minute
+timers = StageTimers()
+timers.serve(port=9464)
+timers.dump_every("/tmp/serving-latency.json", interval=60)
 
-# auto filled in by Orchestra
-model_obj = orchestra.get_model("cc-fraud-xgb")
+# constant-memory sketches of every served scalar feature and prediction, flushed every minute and merged across replicas
+scalars = [slot.name for slot in model_input.slots if slot.width == 1]
+monitor = DriftMonitor(scalars, f"/var/orchestra/drift/{bundle.model}", predictions=bundle.predictions)
+monitor.flush_every(interval=60)
 
+# features and scores are logged off the request path, into columnar files typed by the bundle's log schema
+sink = PredictionLogSink(f"/var/orchestra/predictions/{bundle.model}", bundle.log_fields)
 
-def predict(transformed_data: pd.DataFrame):
+
+@timers.timed("predict")
+def predict(transformed_data: np.ndarray):
     # Make Predictions
-    score = model_obj.predict(transformed_data.values)
+    score = model_obj.predict(transformed_data)
 
     return score
 
 
-@router.post("/inference", status_code=200)
-@orchestra.log_model_serving_code("serving-execution")
-def inference(data: dict):
-    # some code to validate the dict against the schema
-    orchestra.validate_inputs(data)
+def predict_batch(batch: List[dict]):
+    # one feature fetch and one .predict() for every request in the micro-batch
+    with timers.time("get_features"):
+        features = orchestra().get_features(batch, format="columns", timers=timers)
+    with timers.time("ml_transformations"):
+        X = model_input.assemble_batch(features)
+    scores = predict(X)
+    with timers.time("monitor"):
+        monitor.observe_batch(features, predictions=scores)
+    with timers.time("log_prediction"):
+        sink.log_batch({**features, bundle.predictions[0]: scores})
+    return list(scores)
+
 
-    features = orchestra.get_features(data)
-    predicted_score = predict(features)
+# concurrent requests wait up to 5ms (or until 64 are queued) to be scored together
+batcher = MicroBatcher(
+    predict_batch, max_batch_size=64, max_delay=timedelta(milliseconds=5)
+)
 
-    # all of `data` is already logged!
-    orchestra.log_prediction(predicted_score)
+
+@router.on_event("shutdown")
+def shutdown():
+    # finish the requests already queued, and write their logs, before the pod goes away
+    batcher.close()
+    sink.close()
+
+
+def score(data: dict):
+    # some code to validate the dict against the schema
+    with timers.time("validate_inputs"):
+        orchestra().validate_inputs(data)
+
+    # scored and logged by predict_batch
+    predicted_score = batcher(data)
 
     # TODO: format properly to the output_features of the model
     return predicted_score
+
+
+@lru_cache(maxsize=None)
+def logged_score():
+    return orchestra().log_model_serving_code("serving-execution")(score)
+
+
+@router.post("/inference", status_code=200)
+def inference(data: dict):
+    return logged_score()(data)
@@ -0,0 +1,118 @@
+import json
+import os
+import shutil
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from common import object_name
+from compiled import FusedTransformation
+from layout import ColumnSlot, ModelInput
+from lazy import preload
+from sink import LogField, log_fields
+
+
+BACKENDS = {
+    # what a serving path needs besides numpy: the modules to import before the first request
+    "S3": ["fsspec", "pyarrow.parquet", "pyarrow.csv"],
+    "Kafka": ["fastavro"],
+    "API": ["requests"],
+    "PredictionLog": ["pyarrow.parquet", "pyarrow.ipc"],
+    "DriftMonitor": ["pandas"],
+}
+
+
+class ServingBundle:
+    """
+    Precompiled serving bundle: everything a serving pod needs to turn feature values into a specific `Model`'s input, without importing the Feature / Model spec graph or any backend the Model doesn't use.
+
+    `build` (at deploy time) computes the `ModelInput` layout, compiles fitted `ml_transformations` and records the prediction log's `log_fields`, and writes them to a directory as bundle.json (plus transformation.npz, and a copy of the trained model's saved `artifact` if given, so pods load the model from the image instead of fetching it through the client).  `load` (at pod start) rebuilds the `ModelInput` from those files with only numpy and then imports the `backends` listed for the Model - e.g. BACKENDS["API"] for lookups over HTTP - so no request pays for a first import.  Everything else stays lazy.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        model_input: ModelInput,
+        predictions: List[str],
+        backends: List[str],
+        log_fields: Optional[List[LogField]] = None,
+        artifact: Optional[str] = None,
+    ):
+        self.model = model
+        self.model_input = model_input
+        self.predictions = predictions
+        self.backends = backends
+        self.log_fields = log_fields or []
+        self.artifact = artifact
+
+    @property
+    def features(self) -> List[str]:
+        return [slot.name for slot in self.model_input.slots]
+
+    @staticmethod
+    def build(
+        model: Any,
+        directory: str,
+        dtype: Any = np.float32,
+        fitted: Optional[Dict[str, Any]] = None,
+        batch_size: int = 64,
+        backends: List[str] = (),
+        artifact: Optional[str] = None,
+    ) -> str:
+        """
+        Write the bundle of `model` to `directory` and return the path of its bundle.json.  `backends` are module names or BACKENDS keys; `artifact` is the path of the trained model as saved by its library (e.g., XGBoost's `save_model`), copied into the bundle as model.<extension>.
+        """
+        model_input = ModelInput.for_model(model, dtype, fitted, batch_size)
+        modules: List[str] = []
+        for backend in backends:
+            modules.extend(BACKENDS.get(backend, [backend]))
+        os.makedirs(directory, exist_ok=True)
+        if model_input.transformation is not None:
+            model_input.transformation.save(os.path.join(directory, "transformation.npz"))
+        artifact_name = None
+        if artifact is not None:
+            artifact_name = "model" + os.path.splitext(artifact)[1]
+            temporary = os.path.join(directory, f"{artifact_name}.{os.getpid()}.tmp")
+            shutil.copyfile(artifact, temporary)
+            os.replace(temporary, os.path.join(directory, artifact_name))
+        manifest = {
+            "model": object_name(model),
+            "slots": [list(slot) for slot in model_input.slots],
+            "dtype": model_input.dtype.str,
+            "batch_size": batch_size,
+            "transformation": model_input.transformation is not None,
+            "predictions": [object_name(p) for p in getattr(model, "output_features", None) or {}],
+            "backends": list(dict.fromkeys(modules)),
+            "log_fields": [list(field) for field in log_fields(model)],
+            "artifact": artifact_name,
+        }
+        path = os.path.join(directory, "bundle.json")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temporary, path)
+        return path
+
+    @classmethod
+    def load(cls, directory: str, preload_backends: bool = True) -> "ServingBundle":
+        """
+        The bundle in `directory`.  Raises ImportError if a listed backend isn't installed.
+        """
+        with open(os.path.join(directory, "bundle.json")) as f:
+            manifest = json.load(f)
+        transformation = None
+        if manifest["transformation"]:
+            transformation = FusedTransformation.load(os.path.join(directory, "transformation.npz"))
+        slots = [ColumnSlot(*slot) for slot in manifest["slots"]]
+        model_input = ModelInput(slots, np.dtype(manifest["dtype"]), transformation, manifest["batch_size"])
+        if preload_backends:
+            missing = preload(manifest["backends"])
+            if missing:
+                raise ImportError(f"Serving bundle of {manifest['model']} needs {', '.join(missing)}")
+        fields = [tuple(field) for field in manifest.get("log_fields", [])]
+        artifact = manifest.get("artifact")
+        artifact = os.path.join(directory, artifact) if artifact else None
+        return cls(manifest["model"], model_input, manifest["predictions"], manifest["backends"], fields, artifact)
+
+
+# TODO: verify the artifact against a checksum recorded at build time before serving it.
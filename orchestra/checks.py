@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Literal, Mapping, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+from common import object_name
+from datacheck import DataCheck
+from feature import Feature
+from lazy import lazy_import
+from sketch import CategoryCounts, HyperLogLog, TDigest
+
+pd = lazy_import("pandas")
+
+
+CheckPoint = Literal["raw_input_features", "raw_input_lookups", "post_business_logic", "post_ml_transformation"]
+
+
+def _series(values: Any) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values
+    if hasattr(values, "to_pandas"):  # pyarrow arrays
+        return values.to_pandas()
+    return pd.Series(values)
+
+
+class ColumnProfile:
+    """
+    Mergeable summary of one column: row and null counts, plus
+    [1] numeric columns - a `TDigest` of the values (quantiles, min / max, CDF)
+    [2] other columns - `CategoryCounts` of the values
+    [3] both - a `HyperLogLog` of the distinct values
+
+    Whether a column is numeric is decided by the first batch with a non-null value.  Profiles of the same column built on different partitions or replicas can be merged, and a profile built on the training data is the reference for drift checks.
+    """
+
+    def __init__(self, compression: float = 200.0, capacity: int = 1000, precision: int = 12):
+        self.rows = 0
+        self.nulls = 0
+        self.numeric: Optional[bool] = None
+        self.digest = TDigest(compression)
+        self.categories = CategoryCounts(capacity)
+        self.distinct = HyperLogLog(precision)
+
+    @property
+    def null_rate(self) -> float:
+        return self.nulls / self.rows if self.rows else 0.0
+
+    def update(self, values: Any) -> pd.Series:
+        """
+        Add a batch of values and return its non-null ones
+        """
+        series = _series(values)
+        nulls = series.isna().to_numpy()
+        self.rows += len(series)
+        self.nulls += int(np.count_nonzero(nulls))
+        valid = series[~nulls] if nulls.any() else series
+        if not len(valid):
+            return valid
+        if self.numeric is None:
+            self.numeric = series.dtype.kind in "iuf"
+        array = valid.to_numpy()
+        if self.numeric:
+            self.digest.update(array)
+        else:
+            self.categories.update(array)
+        self.distinct.update(array)
+        return valid
+
+    def merge(self, other: "ColumnProfile"):
+        if self.numeric is not None and other.numeric is not None and self.numeric != other.numeric:
+            raise ValueError("Can't merge the profile of a numeric column with a categorical one")
+        self.rows += other.rows
+        self.nulls += other.nulls
+        self.numeric = self.numeric if self.numeric is not None else other.numeric
+        self.digest.merge(other.digest)
+        self.categories.merge(other.categories)
+        self.distinct.merge(other.distinct)
+
+    def drift(self, reference: "ColumnProfile") -> float:
+        """
+        Kolmogorov-Smirnov distance (numeric) or population stability index (categorical) from `reference`
+        """
+        if self.numeric is None or reference.numeric is None:
+            return float("nan")
+        if self.numeric != reference.numeric:
+            raise ValueError("Can't compare a numeric column with a categorical one")
+        if self.numeric:
+            return self.digest.ks_distance(reference.digest)
+        return self.categories.psi(reference.categories)
+
+
+def profile(batch: Mapping[str, Any], columns: Optional[List[str]] = None, **kwargs) -> Dict[str, ColumnProfile]:
+    """
+    {column: ColumnProfile} of a columnar batch, e.g. the training data to use as the drift reference.  `kwargs` are passed to `ColumnProfile`.
+    """
+    profiles = {}
+    for column in columns if columns is not None else list(batch.keys()):
+        profiles[column] = ColumnProfile(**kwargs)
+        profiles[column].update(batch[column])
+    return profiles
+
+
+class CheckResult(NamedTuple):
+    column: str
+    check: str
+    """
+    null_rate, min_value, max_value, allowed_values or drift
+    """
+
+    value: float
+    """
+    The observed value: the null rate, the minimum / maximum, the fraction of non-null rows outside `allowed_values`, or the drift distance.  NaN when there was no data to evaluate.
+    """
+
+    threshold: float
+    passed: bool
+
+
+class DataCheckEngine:
+    """
+    Evaluates every declared `DataCheck` on a dataset in a single vectorized pass over each column batch.
+
+    Instead of re-scanning the data for every check, `update` reads each checked column of a batch once: the null mask, the `ColumnProfile` sketches and the `allowed_values` membership are all computed from that pass, and every other check is then answered from the mergeable profile.  Batches may be fed one at a time (e.g., while streaming through a backfill), and engines run on separate partitions can be merged before calling `results`.
+
+    `checks` maps a column to its DataChecks; `reference` maps a column to its training-time profile (see `profile`) and is required for every column with a `max_drift` check.
+    """
+
+    def __init__(
+        self,
+        checks: Mapping[str, Union[DataCheck, Sequence[DataCheck]]],
+        reference: Optional[Mapping[str, ColumnProfile]] = None,
+        **profile_options,
+    ):
+        self.checks: Dict[str, List[DataCheck]] = {
+            column: [c] if isinstance(c, DataCheck) else list(c) for column, c in checks.items()
+        }
+        self.reference = dict(reference or {})
+        for column, column_checks in self.checks.items():
+            if column not in self.reference and any(getattr(c, "max_drift", None) is not None for c in column_checks):
+                raise ValueError(f"Column {column} has a drift check but no reference profile")
+        self.profiles: Dict[str, ColumnProfile] = {column: ColumnProfile(**profile_options) for column in self.checks}
+        self.allowed = {
+            column: [set(c.allowed_values) for c in column_checks if getattr(c, "allowed_values", None) is not None]
+            for column, column_checks in self.checks.items()
+        }
+        self.disallowed = {column: [0] * len(sets) for column, sets in self.allowed.items()}
+
+    @classmethod
+    def for_features(
+        cls,
+        features: List[Feature],
+        point: CheckPoint,
+        reference: Optional[Mapping[str, ColumnProfile]] = None,
+        **profile_options,
+    ) -> "DataCheckEngine":
+        """
+        The checks that `features` declare (`Feature.data_checks`) for one check point:
+        [1] raw_input_features - on each of the feature's `input_features` columns
+        [2] raw_input_lookups - on each of its `input_lookups` columns
+        [3] post_business_logic and post_ml_transformation - on the feature's own column
+        A DataCheck with a `column` only checks that column.
+        """
+        checks: Dict[str, List[DataCheck]] = {}
+        for feature in features:
+            data_checks = getattr(feature, "data_checks", None)
+            if isinstance(data_checks, Mapping):
+                declared = data_checks.get(point)
+            else:
+                declared = getattr(data_checks, point, None)
+            if declared is None:
+                continue
+            if point == "raw_input_features":
+                columns = [object_name(f) for f in getattr(feature, "input_features", None) or []]
+            elif point == "raw_input_lookups":
+                columns = [object_name(f) for f in getattr(feature, "input_lookups", None) or []]
+            else:
+                columns = [object_name(feature)]
+            for check in [declared] if isinstance(declared, DataCheck) else declared:
+                column = getattr(check, "column", None)
+                for name in [column] if column is not None else columns:
+                    if not any(c is check for c in checks.setdefault(name, [])):
+                        checks[name].append(check)
+        return cls(checks, reference, **profile_options)
+
+    def update(self, batch: Mapping[str, Any]):
+        """
+        Add a columnar batch ({column: values}; a DataFrame or pyarrow Table works too)
+        """
+        for column, profile in self.profiles.items():
+            valid = profile.update(batch[column])
+            for index, allowed in enumerate(self.allowed[column]):
+                self.disallowed[column][index] += len(valid) - int(np.count_nonzero(valid.isin(allowed).to_numpy()))
+
+    def merge(self, other: "DataCheckEngine"):
+        for column, profile in other.profiles.items():
+            self.profiles[column].merge(profile)
+            for index, count in enumerate(other.disallowed[column]):
+                self.disallowed[column][index] += count
+
+    def results(self) -> List[CheckResult]:
+        results = []
+        for column, column_checks in self.checks.items():
+            profile = self.profiles[column]
+            valid = profile.rows - profile.nulls
+            numeric = bool(profile.numeric) and valid > 0
+            allowed = 0
+            for check in column_checks:
+                threshold = getattr(check, "max_null_rate", None)
+                if threshold is not None:
+                    results.append(CheckResult(column, "null_rate", profile.null_rate, threshold, profile.null_rate <= threshold))
+                threshold = getattr(check, "min_value", None)
+                if threshold is not None:
+                    value = profile.digest.min if numeric else float("nan")
+                    results.append(CheckResult(column, "min_value", value, threshold, not value < threshold))
+                threshold = getattr(check, "max_value", None)
+                if threshold is not None:
+                    value = profile.digest.max if numeric else float("nan")
+                    results.append(CheckResult(column, "max_value", value, threshold, not value > threshold))
+                if getattr(check, "allowed_values", None) is not None:
+                    value = self.disallowed[column][allowed] / valid if valid else float("nan")
+                    results.append(CheckResult(column, "allowed_values", value, 0.0, not value > 0))
+                    allowed += 1
+                threshold = getattr(check, "max_drift", None)
+                if threshold is not None:
+                    value = profile.drift(self.reference[column])
+                    results.append(CheckResult(column, "drift", value, threshold, not value > threshold))
+        return results
+
+    def failures(self) -> List[CheckResult]:
+        return [result for result in self.results() if not result.passed]
+
+
+# TODO: push the same single-pass checks down to the customer's data infra (e.g., as one SQL aggregate query per table).
@@ -1,4 +1,4 @@
-from typing import Literal, Dict, Optional
+from typing import Callable, Literal, Dict, Optional
 from common import Metadata
 
 
@@ -73,6 +73,16 @@ class PythonDataCode(DataCode):
 
     """
 
+    function: Callable
+    """
+    The decorated function itself.  Positional arguments follow the order of the linked `Feature.input_features`.
+    """
+
+    vectorized: Optional[bool]
+    """
+    Optional.  True if `function` can be called once with whole columns (NumPy arrays) instead of once per row, False if it can't.  If not set, Orchestra probes the function on a few rows to decide.
+    """
+
     python_modules: Optional[Dict[str, str]]
     """
     Modules in the form of {'module-nmae', '1.0.33'}
@@ -124,6 +134,13 @@ class SQLDataCode(DataCode):
 
     """
 
+    sql: str
+    """
+    The SQL fragment.  `{{input_feature_N}}` refers to the N-th of the linked `Feature.input_features`; `{{feature_name}}` works too.
+
+    All SQL-expressible Features over the same `InputDataSchema` are compiled into a single query, see `sql.SQLCompiler`.
+    """
+
 
 class SnowparkDataCode(DataCode):
     """
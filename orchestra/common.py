@@ -20,3 +20,29 @@ class Metadata(Tuple):
     """
     Human or machine defined tags for easy indexing and reference
     """
+
+
+def datatype_name(datatype) -> Optional[str]:
+    """
+    Name of a DataType given as a name, a class (`Float64`) or a sized instance (`FloatVector(128)`)
+    """
+    if datatype is None or isinstance(datatype, str):
+        return datatype
+    return datatype.__name__ if isinstance(datatype, type) else type(datatype).__name__
+
+
+def object_name(obj) -> str:
+    """
+    Machine-readable name of an Orchestra object (or a "source.feature" reference string)
+
+    Looks at `metadata.name` first and then `name`, falling back to the function name for decorated code.
+    """
+    if isinstance(obj, str):
+        return obj
+    metadata = getattr(obj, "metadata", None)
+    name = getattr(metadata, "name", None) or getattr(obj, "name", None)
+    if name is None:
+        name = getattr(obj, "__name__", None)
+    if not isinstance(name, str):
+        raise ValueError(f"{obj!r} has no name")
+    return name
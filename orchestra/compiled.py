@@ -0,0 +1,265 @@
+import json
+import math
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from common import object_name
+
+
+class OneHotEncoding:
+    """
+    A fitted one-hot encoder for one column, as a {category: output position} hash map
+    """
+
+    def __init__(self, categories: Sequence[Any], drop: Optional[int] = None, handle_unknown: str = "ignore"):
+        if handle_unknown not in ("ignore", "error"):
+            raise ValueError(f"handle_unknown must be 'ignore' or 'error', got {handle_unknown}")
+        self.categories = list(categories)
+        self.drop = drop
+        self.handle_unknown = handle_unknown
+        kept = [c for i, c in enumerate(self.categories) if i != drop]
+        self.vocabulary: Dict[Any, int] = {_key(c): i for i, c in enumerate(kept)}
+        self.width = len(kept)
+
+    def position(self, value: Any) -> int:
+        """
+        Output position of `value`, or -1 for the dropped category and (with handle_unknown="ignore") unknown ones
+        """
+        key = _key(value)
+        position = self.vocabulary.get(key, -1)
+        if position < 0 and self.handle_unknown == "error" and (
+            self.drop is None or key != _key(self.categories[self.drop])
+        ):
+            raise ValueError(f"Unknown category {value!r}")
+        return position
+
+
+class LinearScaling:
+    """
+    A fitted scaler for one column: (x - offset) / scale, clipped to `clip` = (low, high) if given
+    """
+
+    width = 1
+
+    def __init__(self, offset: float = 0.0, scale: float = 1.0, clip: Optional[Tuple[float, float]] = None):
+        self.offset = float(offset)
+        self.scale = float(scale) if scale else 1.0
+        self.clip = None if clip is None else (float(clip[0]), float(clip[1]))
+
+
+CompiledTransformation = Union[OneHotEncoding, LinearScaling]
+
+
+_NAN = object()
+
+
+def _key(value: Any) -> Any:
+    # NumPy scalars and Python values of the same category must hit the same hash map entry, and so must every NaN
+    value = value.item() if isinstance(value, np.generic) else value
+    return _NAN if isinstance(value, float) and math.isnan(value) else value
+
+
+def compile_transformation(fitted: Any) -> List[CompiledTransformation]:
+    """
+    Compile a fitted scikit-learn preprocessing estimator into one `CompiledTransformation` per input column.
+
+    Supported, by their fitted attributes: OneHotEncoder (`categories_`, `drop_idx_`), StandardScaler (`mean_`, `scale_`, `with_mean`, `with_std`), RobustScaler (`center_`, `scale_`, `with_centering`, `with_scaling`), MinMaxScaler (`min_`, `scale_`, `clip`) and MaxAbsScaler (`scale_`).
+    """
+    if hasattr(fitted, "categories_"):
+        drops = getattr(fitted, "drop_idx_", None)
+        handle_unknown = getattr(fitted, "handle_unknown", "error")
+        if getattr(fitted, "infrequent_categories_", None) is not None and any(
+            c is not None for c in fitted.infrequent_categories_
+        ):
+            raise ValueError("OneHotEncoder with infrequent categories can't be compiled")
+        return [
+            OneHotEncoding(
+                categories,
+                None if drops is None or drops[i] is None else int(drops[i]),
+                "ignore" if handle_unknown != "error" else "error",
+            )
+            for i, categories in enumerate(fitted.categories_)
+        ]
+    if not hasattr(fitted, "scale_") and not hasattr(fitted, "mean_"):
+        raise ValueError(f"Don't know how to compile {type(fitted).__name__}")
+    scale = getattr(fitted, "scale_", None)
+    clip = None
+    if hasattr(fitted, "min_"):
+        # MinMaxScaler: x * scale_ + min_
+        offset, scale = -np.asarray(fitted.min_) / scale, 1.0 / np.asarray(scale)
+        if getattr(fitted, "clip", False):
+            clip = tuple(getattr(fitted, "feature_range", (0, 1)))
+    elif hasattr(fitted, "center_"):
+        offset = fitted.center_ if getattr(fitted, "with_centering", True) else None
+        scale = scale if getattr(fitted, "with_scaling", True) else None
+    elif hasattr(fitted, "mean_"):
+        offset = fitted.mean_ if getattr(fitted, "with_mean", True) else None
+        scale = scale if getattr(fitted, "with_std", True) else None
+    else:
+        offset = None
+    width = getattr(fitted, "n_features_in_", None)
+    if width is None:
+        width = len(np.atleast_1d(next((a for a in (scale, offset) if a is not None), 0.0)))
+    offset = np.zeros(width) if offset is None else np.atleast_1d(offset)
+    scale = np.ones(width) if scale is None else np.atleast_1d(scale)
+    return [LinearScaling(o, s, clip) for o, s in zip(offset, scale)]
+
+
+class FusedTransformation:
+    """
+    Every input feature of a `Model`, with its compiled ML transformation, fused into a single vector transform.
+
+    `columns` is the model's input order as (feature name, compiled transformation or None for features passed through as-is).  All numeric columns - scaled and passed through - are handled by one gather, one subtraction and one division; one-hot columns by a hash map lookup each.  No pandas is involved, so a single request costs a few NumPy operations.
+    """
+
+    def __init__(self, columns: List[Tuple[str, Optional[CompiledTransformation]]]):
+        self.columns = columns
+        numeric: List[Tuple[str, int, float, float]] = []
+        clips: List[Tuple[float, float]] = []
+        self.onehot: List[Tuple[str, int, OneHotEncoding]] = []
+        position = 0
+        for name, transformation in columns:
+            if isinstance(transformation, OneHotEncoding):
+                self.onehot.append((name, position, transformation))
+                position += transformation.width
+            elif transformation is None:
+                numeric.append((name, position, 0.0, 1.0))
+                clips.append((-np.inf, np.inf))
+                position += 1
+            else:
+                numeric.append((name, position, transformation.offset, transformation.scale))
+                clips.append(transformation.clip or (-np.inf, np.inf))
+                position += 1
+        self.width = position
+        self.numeric_names = [n for n, _, _, _ in numeric]
+        self.numeric_positions = np.array([p for _, p, _, _ in numeric], dtype=np.intp)
+        self.offset = np.array([o for _, _, o, _ in numeric], dtype=np.float64)
+        self.scale = np.array([s for _, _, _, s in numeric], dtype=np.float64)
+        self.low = np.array([low for low, _ in clips], dtype=np.float64)
+        self.high = np.array([high for _, high in clips], dtype=np.float64)
+        self.clipped = bool(np.isfinite(self.low).any() or np.isfinite(self.high).any())
+
+    @classmethod
+    def for_model(cls, model: Any, fitted: Optional[Dict[str, Any]] = None) -> "FusedTransformation":
+        """
+        Compile the fitted `ml_transformations` of each of `model.input_features`, in order.
+
+        The fitted estimator of a feature comes from `fitted[feature name]` if given, otherwise from the `fitted` attribute of its `SciKitLearnTransformation`.
+        """
+        fitted = fitted or {}
+        columns: List[Tuple[str, Optional[CompiledTransformation]]] = []
+        for feature in model.input_features:
+            name = object_name(feature)
+            estimator = fitted.get(name)
+            if estimator is None:
+                candidates = [
+                    t.fitted for t in getattr(feature, "ml_transformations", None) or []
+                    if getattr(t, "fitted", None) is not None
+                ]
+                if len(candidates) > 1:
+                    raise ValueError(f"{name} has {len(candidates)} fitted transformations, only one can be compiled")
+                estimator = candidates[0] if candidates else None
+            if estimator is None:
+                columns.append((name, None))
+                continue
+            compiled = compile_transformation(estimator)
+            if len(compiled) != 1:
+                raise ValueError(f"The transformation of {name} was fitted on {len(compiled)} columns, expected 1")
+            columns.append((name, compiled[0]))
+        return cls(columns)
+
+    def transform(self, record: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The model input vector of one record, {feature name: value}
+        """
+        if out is None:
+            out = np.zeros(self.width, dtype=np.float64)
+        else:
+            out[:] = 0
+        values = np.array([record[name] for name in self.numeric_names], dtype=np.float64)
+        values = (values - self.offset) / self.scale
+        out[self.numeric_positions] = np.clip(values, self.low, self.high) if self.clipped else values
+        for name, start, encoding in self.onehot:
+            position = encoding.position(record[name])
+            if position >= 0:
+                out[start + position] = 1.0
+        return out
+
+    def transform_batch(self, columns: Dict[str, Any], out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        The model input matrix of a batch of columns, {feature name: values}
+        """
+        length = len(columns[self.columns[0][0]]) if self.columns else 0
+        if out is None:
+            out = np.zeros((length, self.width), dtype=np.float64)
+        else:
+            out[:] = 0
+        if self.numeric_names:
+            values = np.column_stack([np.asarray(columns[name], dtype=np.float64) for name in self.numeric_names])
+            values = (values - self.offset) / self.scale
+            out[:, self.numeric_positions] = np.clip(values, self.low, self.high) if self.clipped else values
+        rows = np.arange(length)
+        for name, start, encoding in self.onehot:
+            positions = np.fromiter((encoding.position(v) for v in columns[name]), dtype=np.intp, count=length)
+            known = positions >= 0
+            out[rows[known], start + positions[known]] = 1.0
+        return out
+
+    def save(self, path: str):
+        """
+        Save as a NumPy .npz file, readable without scikit-learn.  Categories are stored as JSON, so mixed types, None and NaN survive a round trip; a category that isn't a JSON scalar raises ValueError.
+        """
+        arrays: Dict[str, np.ndarray] = {"names": np.array([name for name, _ in self.columns])}
+        kinds = []
+        for index, (name, transformation) in enumerate(self.columns):
+            if isinstance(transformation, OneHotEncoding):
+                kinds.append("onehot")
+                try:
+                    categories = [c.item() if isinstance(c, np.generic) else c for c in transformation.categories]
+                    categories = json.dumps(categories)
+                except TypeError as error:
+                    raise ValueError(f"Can't save the categories of {name}: {error}") from None
+                arrays[f"categories_{index}"] = np.array(categories)
+                arrays[f"options_{index}"] = np.array(
+                    [-1 if transformation.drop is None else transformation.drop, transformation.handle_unknown == "error"]
+                )
+            elif isinstance(transformation, LinearScaling):
+                kinds.append("linear")
+                low, high = transformation.clip or (-np.inf, np.inf)
+                arrays[f"linear_{index}"] = np.array([transformation.offset, transformation.scale, low, high])
+            else:
+                kinds.append("none")
+        arrays["kinds"] = np.array(kinds)
+        np.savez(path, **arrays)
+
+    @classmethod
+    def load(cls, path: str) -> "FusedTransformation":
+        with np.load(path, allow_pickle=False) as arrays:
+            columns: List[Tuple[str, Optional[CompiledTransformation]]] = []
+            for index, (name, kind) in enumerate(zip(arrays["names"].tolist(), arrays["kinds"].tolist())):
+                if kind == "onehot":
+                    drop, error = arrays[f"options_{index}"].tolist()
+                    categories = arrays[f"categories_{index}"]
+                    # files written before categories were stored as JSON hold a plain array
+                    categories = json.loads(categories.item()) if categories.ndim == 0 else categories.tolist()
+                    columns.append(
+                        (
+                            name,
+                            OneHotEncoding(
+                                categories,
+                                None if drop < 0 else drop,
+                                "error" if error else "ignore",
+                            ),
+                        )
+                    )
+                elif kind == "linear":
+                    offset, scale, *clip = arrays[f"linear_{index}"].tolist()
+                    clip = tuple(clip) if clip and np.isfinite(clip).any() else None
+                    columns.append((name, LinearScaling(offset, scale, clip)))
+                else:
+                    columns.append((name, None))
+        return cls(columns)
+
+
+# TODO: compile more of sklearn.preprocessing (OrdinalEncoder, KBinsDiscretizer, Normalizer) and chains of transformations on one feature.
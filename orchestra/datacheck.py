@@ -1,9 +1,10 @@
-from typing import Optional
+from typing import Any, List, Optional
 from common import Metadata
 
 
 class DataCheck:
     """
+    Declarative data quality and distribution checks on a column.  Every check that is set is evaluated by `checks.DataCheckEngine` in one vectorized pass per column batch; unset checks are skipped.
 
     Placeholder for Deequ, PyTest, great_expectation based checks
     """
@@ -13,6 +14,32 @@ class DataCheck:
     name, description, key:value tags
     """
 
+    column: Optional[str]
+    """
+    Optional. The column to check; defaults to every column of the check point (e.g., each of a Feature's `input_features` for `raw_input_features`).
+    """
+
+    max_null_rate: Optional[float]
+    """
+    Largest allowed fraction of null / NaN values, between 0 and 1
+    """
+
+    min_value: Optional[float]
+    max_value: Optional[float]
+    """
+    Inclusive bounds for the non-null values of a numeric column
+    """
+
+    allowed_values: Optional[List[Any]]
+    """
+    The only values a (categorical) column may take, nulls aside
+    """
+
+    max_drift: Optional[float]
+    """
+    Largest allowed distance from the column's training-time profile: the Kolmogorov-Smirnov distance for numeric columns, the population stability index (PSI) for categorical ones.
+    """
+
     # TODO: Flesh out data checks.
     # [1] Do we actually need these on ml_transformations?  If so, how do we provide checks for each individual ml_transformation since they are discrete?
     # [2] What libraries do we support and in what order?  deequ, great_expectaions, pytest
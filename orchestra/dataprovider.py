@@ -127,6 +127,8 @@ class InputDataSource:
 
 
 class OutputDataDestination:
-    """ """
+    """
+    Where Orchestra writes the data it produces.  Prediction logs are batched off the request path into columnar files by `sink.PredictionLogSink`.
+    """
 
     # TODO: Add in the concept of a data sink.  How will we save things like prediction logs, cached training data, etc.
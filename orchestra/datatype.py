@@ -80,12 +80,20 @@ class FloatVector(DataType):
     human_readable = Literal[False]
     model_readable = Literal[True]
 
+    storage = "float32"
+    """
+    Packed as contiguous float32 rows, see `vector.VectorColumn`
+    """
+
     length: int
     """
     Number of floats that make up this embedding
     e.g., [0.4, 0.4, 0.5] == 3
     """
 
+    def __init__(self, length: int):
+        self.length = length
+
 
 class DoubleVector(DataType):
     """
@@ -96,12 +104,20 @@ class DoubleVector(DataType):
     human_readable = Literal[False]
     model_readable = Literal[True]
 
+    storage = "float64"
+    """
+    Packed as contiguous float64 rows, see `vector.VectorColumn`
+    """
+
     length: int
     """
     Number of floats that make up this embedding
     e.g., [0.4, 0.4, 0.5] == 3
     """
 
+    def __init__(self, length: int):
+        self.length = length
+
 
 class Int64(DataType):
     """
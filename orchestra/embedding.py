@@ -0,0 +1,149 @@
+import hashlib
+import os
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from common import object_name
+from mltransformation import ModelEncoderTransformation
+
+
+KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache in front of an embedding model, e.g. a `ModelEncoderTransformation` such as `sentence_bert` or `Transformers(model="bert-base-uncased")`.
+
+    Entries are keyed by a hash of (model name, model version, input), so repeated inputs - business names repeat across millions of transactions - never reach the model again, and a new model version never reads stale vectors.
+
+    Two tiers:
+    [1] memory - a bounded LRU of vectors
+    [2] disk - optional; a packed file of fixed-stride rows (e.g., 128 float32s per `FloatVector(128)`) read through a memory map, plus an append-only index of key -> row
+
+    `encode(inputs)` is the model itself: it takes a list of inputs and returns an (n, dim) array.  Cache misses are deduplicated and sent to it in batches of `batch_size`.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        model_name: str,
+        model_version: str,
+        dim: int,
+        dtype=np.float32,
+        memory_rows: int = 100000,
+        path: Optional[str] = None,
+        batch_size: int = 64,
+    ):
+        self.encode_batch = encode
+        self.prefix = f"{model_name}\0{model_version}\0".encode()
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.memory_rows = memory_rows
+        self.batch_size = batch_size
+        self.memory: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.rows: Dict[bytes, int] = {}
+        self.path = path
+        self.mapped: Optional[np.memmap] = None
+        if path is not None:
+            os.makedirs(path, exist_ok=True)
+            self.vectors_path = os.path.join(path, f"vectors.{self.dtype.name}.{dim}")
+            self.index_path = os.path.join(path, "index")
+            self._load_index()
+
+    @classmethod
+    def for_transformation(
+        cls, transformation: ModelEncoderTransformation, encode, dim: int, **kwargs
+    ) -> "EmbeddingCache":
+        """
+        A cache keyed on the transformation's model name and version
+        """
+        model = getattr(transformation, "model", transformation)
+        version = getattr(model, "version", None) or "latest"
+        return cls(encode, object_name(model), str(version), dim, **kwargs)
+
+    def key(self, value: str) -> bytes:
+        return hashlib.blake2b(self.prefix + value.encode(), digest_size=KEY_BYTES).digest()
+
+    def encode(self, inputs: List[str]) -> np.ndarray:
+        """
+        Embeddings for `inputs` as an (n, dim) array, running the model only on inputs never seen before
+        """
+        keys = [self.key(value) for value in inputs]
+        output = np.empty((len(inputs), self.dim), dtype=self.dtype)
+        misses: Dict[bytes, List[int]] = {}
+        for position, key in enumerate(keys):
+            vector = self._get(key)
+            if vector is None:
+                misses.setdefault(key, []).append(position)
+            else:
+                output[position] = vector
+        missing = list(misses)
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start : start + self.batch_size]
+            vectors = np.asarray(
+                self.encode_batch([inputs[misses[key][0]] for key in batch]), dtype=self.dtype
+            )
+            if vectors.shape != (len(batch), self.dim):
+                raise ValueError(f"Model returned shape {vectors.shape}, expected {(len(batch), self.dim)}")
+            self._put_many(batch, vectors)
+            for key, vector in zip(batch, vectors):
+                output[misses[key]] = vector
+        return output
+
+    def _get(self, key: bytes) -> Optional[np.ndarray]:
+        vector = self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+            return vector
+        row = self.rows.get(key)
+        if row is None:
+            return None
+        if self.mapped is None or row >= len(self.mapped):
+            self._remap()
+        vector = self.mapped[row]
+        self._remember(key, vector)
+        return vector
+
+    def _put_many(self, keys: List[bytes], vectors: np.ndarray):
+        for key, vector in zip(keys, vectors):
+            self._remember(key, vector.copy())
+        if self.path is None:
+            return
+        first = len(self.rows)
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.ascontiguousarray(vectors).tobytes())
+        with open(self.index_path, "ab") as f:
+            f.write(b"".join(keys))
+        for offset, key in enumerate(keys):
+            self.rows[key] = first + offset
+
+    def _remember(self, key: bytes, vector: np.ndarray):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_rows:
+            self.memory.popitem(last=False)
+
+    def _load_index(self):
+        index = b""
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                index = f.read()
+        row_bytes = self.dim * self.dtype.itemsize
+        vectors = os.path.getsize(self.vectors_path) // row_bytes if os.path.exists(self.vectors_path) else 0
+        rows = min(len(index) // KEY_BYTES, vectors)
+        # a crash between the two appends (or before the index was first written) can leave a key without a vector, or
+        # vectors without keys; drop the tail of both files so the next append starts at the last indexed row
+        for path, size in ((self.index_path, rows * KEY_BYTES), (self.vectors_path, rows * row_bytes)):
+            with open(path, "ab") as f:
+                f.truncate(size)
+        for row in range(rows):
+            self.rows[index[row * KEY_BYTES : (row + 1) * KEY_BYTES]] = row
+
+    def _remap(self):
+        rows = os.path.getsize(self.vectors_path) // (self.dim * self.dtype.itemsize)
+        self.mapped = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(rows, self.dim))
+
+
+# TODO: compaction/eviction of the disk tier - today it only grows.
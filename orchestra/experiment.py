@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from lazy import lazy_import
+
+cloudpickle = lazy_import("cloudpickle")
+pa = lazy_import("pyarrow")
+ipc = lazy_import("pyarrow.ipc")
+
+
+SPLITS = ("train", "test")
+
+
+class FeatureCache:
+    """
+    Columnar cache holding the union of every candidate feature of an experiment, materialized once.
+
+    Each split is an Arrow IPC file that is memory-mapped on open, so every trial (in any process) reads the same pages and `project()` selects columns without copying them.
+    """
+
+    def __init__(self, directory: str, label: str):
+        self.directory = directory
+        self.label = label
+        self.tables: Dict[str, pa.Table] = {}
+
+    @classmethod
+    def create(
+        cls,
+        directory: str,
+        label: str,
+        train: Dict[str, np.ndarray],
+        test: Dict[str, np.ndarray],
+    ) -> "FeatureCache":
+        """
+        Write the train and test splits, each {column name: values} including the label column
+        """
+        os.makedirs(directory, exist_ok=True)
+        for split, columns in zip(SPLITS, (train, test)):
+            table = pa.table(columns)
+            with pa.OSFile(os.path.join(directory, f"{split}.arrow"), "wb") as sink:
+                with ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+        return cls(directory, label)
+
+    def table(self, split: str) -> pa.Table:
+        if split not in self.tables:
+            source = pa.memory_map(os.path.join(self.directory, f"{split}.arrow"), "r")
+            self.tables[split] = ipc.open_file(source).read_all()
+        return self.tables[split]
+
+    def project(self, split: str, features: List[str]) -> pa.Table:
+        """
+        The `features` columns of a split, sharing the cached buffers
+        """
+        return self.table(split).select(features)
+
+    def data(self, features: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        (X_train, X_test, y_train, y_test) for a feature subset.  Columns come straight from the memory map; building each X is a single copy into the model's matrix.
+        """
+        matrices = []
+        for split in SPLITS:
+            table = self.project(split, features)
+            X = np.empty((table.num_rows, len(features)), dtype=np.float64, order="F")
+            for index, column in enumerate(table.columns):
+                X[:, index] = column.to_numpy()
+            matrices.append(X)
+        labels = [self.table(split).column(self.label).to_numpy() for split in SPLITS]
+        return matrices[0], matrices[1], labels[0], labels[1]
+
+
+class TrialResult(NamedTuple):
+    features: Tuple[str, ...]
+    metrics: Dict[str, float]
+
+
+# worker process state
+_caches: Dict[str, FeatureCache] = {}
+_train_functions: Dict[bytes, Callable] = {}
+
+
+def _run_trial(directory: str, label: str, features: Tuple[str, ...], train_bytes: bytes) -> Dict[str, float]:
+    if directory not in _caches:
+        _caches[directory] = FeatureCache(directory, label)
+    if train_bytes not in _train_functions:
+        _train_functions[train_bytes] = cloudpickle.loads(train_bytes)
+    return _train_functions[train_bytes](*_caches[directory].data(list(features)))
+
+
+class ExperimentRunner:
+    """
+    Runs a feature experiment such as `register_expirement(..., expirement_config={"algorithm": "try_all_permutations", ...})`.
+
+    Training data for the union of `base_features` and `new_features` is fetched once into a `FeatureCache`; each trial trains on `base_features` plus one non-empty subset of `new_features`, served as a projection of that cache.  Trials run in parallel on a process pool, smallest subsets first.
+
+    `train(X_train, X_test, y_train, y_test)` returns {metric name: value}.  The first of `metrics` is the one early stopping watches, in the direction of its `metrics_goals` entry ("maximize" or "minimize"): once `patience` trials in a row finish without beating the best so far, or a trial reaches `target`, the trials not yet started are cancelled.
+    """
+
+    def __init__(
+        self,
+        cache: FeatureCache,
+        base_features: List[str],
+        new_features: List[str],
+        metrics: List[str],
+        metrics_goals: List[str],
+        workers: Optional[int] = None,
+        patience: Optional[int] = None,
+        target: Optional[float] = None,
+    ):
+        if len(metrics) != len(metrics_goals):
+            raise ValueError("Every metric needs a goal")
+        if any(goal not in ("maximize", "minimize") for goal in metrics_goals):
+            raise ValueError(f"Goals must be 'maximize' or 'minimize', got {metrics_goals}")
+        self.cache = cache
+        self.base_features = base_features
+        self.new_features = new_features
+        self.metric = metrics[0]
+        self.sign = 1.0 if metrics_goals[0] == "maximize" else -1.0
+        self.workers = workers or os.cpu_count() or 1
+        self.patience = patience
+        self.target = target
+
+    @classmethod
+    def for_expirement(
+        cls,
+        cache: FeatureCache,
+        base_features: List[str],
+        new_features: List[str],
+        expirement_config: Dict[str, List[str]],
+        **kwargs,
+    ) -> "ExperimentRunner":
+        """
+        Runner for the `expirement_config` given to `register_expirement`
+        """
+        algorithm = expirement_config.get("algorithm", "try_all_permutations")
+        if algorithm != "try_all_permutations":
+            raise ValueError(f"Unsupported experiment algorithm {algorithm}")
+        return cls(
+            cache, base_features, new_features, expirement_config["metrics"], expirement_config["metrics_goals"], **kwargs
+        )
+
+    def permutations(self) -> List[Tuple[str, ...]]:
+        """
+        Feature sets to try: the base features plus every non-empty subset of the new features
+        """
+        subsets = []
+        for size in range(1, len(self.new_features) + 1):
+            for subset in itertools.combinations(self.new_features, size):
+                subsets.append(tuple(self.base_features) + subset)
+        return subsets
+
+    def _reached_target(self, score: float) -> bool:
+        return self.target is not None and self.sign * score >= self.sign * self.target
+
+    def run(self, train: Callable[..., Dict[str, float]]) -> List[TrialResult]:
+        """
+        Run the trials and return the finished ones, best first
+        """
+        train_bytes = cloudpickle.dumps(train)
+        results: List[TrialResult] = []
+        best: Optional[float] = None
+        without_improvement = 0
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=context) as pool:
+            pending = {
+                pool.submit(_run_trial, self.cache.directory, self.cache.label, features, train_bytes): features
+                for features in self.permutations()
+            }
+            stop = False
+            while pending and not stop:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    features = pending.pop(future)
+                    metrics = future.result()
+                    results.append(TrialResult(features, metrics))
+                    score = self.sign * metrics[self.metric]
+                    if best is None or score > best:
+                        best, without_improvement = score, 0
+                    else:
+                        without_improvement += 1
+                    if self._reached_target(metrics[self.metric]) or (
+                        self.patience is not None and without_improvement >= self.patience
+                    ):
+                        stop = True
+            for future in pending:
+                future.cancel()
+            # trials that were already running still finish; keep their results
+            for future, features in pending.items():
+                if not future.cancelled():
+                    results.append(TrialResult(features, future.result()))
+        return sorted(results, key=lambda result: -self.sign * result.metrics[self.metric])
+
+
+# TODO: support search algorithms beyond try_all_permutations (e.g., greedy forward selection) once `register_expirement` defines them.
@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import pickle
+import time
+from datetime import timedelta
+from typing import Any, Callable, List, NamedTuple, Optional, Tuple
+
+from common import object_name
+from dataprovider import InputDataSource
+from lazy import lazy_import
+from materialize import stable_description
+
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+ipc = lazy_import("pyarrow.ipc")
+
+
+class ExtractState(NamedTuple):
+    """
+    What is cached for one (provider, config, columns) extract
+    """
+
+    extracted_at: float
+    watermark: Any
+    """
+    Largest timestamp extracted so far, None without a timestamp column
+    """
+
+    parts: List[str]
+    rows: int
+
+
+class ExtractCache:
+    """
+    Local on-disk cache of DataProvider extracts, e.g. the `user-demos` BigQuery table pulled on every development iteration.
+
+    Extracts are keyed by provider name, provider config and the requested columns, and stored as Arrow IPC parts that are memory-mapped when read.  `get` then:
+    [1] returns the cached extract as-is while it is younger than `max_age` - the provider's `freshness` by default, and forever for a provider without one
+    [2] once it is older, and the extract has a timestamp column (`InputDataSchema.timestamp`), asks the provider only for rows at or after the watermark - the largest timestamp seen - minus `overlap` (in the timestamp's units, e.g. a timedelta), and appends them as a new part
+    [3] otherwise re-extracts everything
+
+    Without `keys`, appended rows are limited to those strictly after the watermark.  With `keys`, the overlap is re-pulled and a row replaces the cached row with the same keys, which also catches late-arriving updates: only the key columns of the cached parts are scanned, and only the parts that held a replaced row are rewritten.  Parts are compacted into one once there are more than `max_parts`.
+    """
+
+    def __init__(self, directory: str, max_parts: int = 16, clock: Callable[[], float] = time.time):
+        self.directory = directory
+        self.max_parts = max_parts
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, provider: InputDataSource, columns: List[str]) -> str:
+        config = getattr(provider, "provider_config", None) or getattr(provider, "config", None)
+        return hashlib.sha256(
+            "\0".join([object_name(provider), stable_description(config), ",".join(sorted(columns))]).encode()
+        ).hexdigest()[:32]
+
+    def _path(self, provider: InputDataSource, columns: List[str], *parts: str) -> str:
+        return os.path.join(self.directory, object_name(provider), self.key(provider, columns), *parts)
+
+    def state(self, provider: InputDataSource, columns: List[str]) -> Optional[ExtractState]:
+        try:
+            with open(self._path(provider, columns, "state.pkl"), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _save_state(self, provider: InputDataSource, columns: List[str], state: ExtractState):
+        path = self._path(provider, columns, "state.pkl")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(state, f)
+        os.replace(temporary, path)
+
+    def _write_part(self, provider: InputDataSource, columns: List[str], table: pa.Table) -> str:
+        name = f"part-{time.time_ns()}-{os.getpid()}.arrow"
+        path = self._path(provider, columns, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with pa.OSFile(f"{path}.tmp", "wb") as sink:
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(f"{path}.tmp", path)
+        return name
+
+    def _read(self, provider: InputDataSource, columns: List[str], state: ExtractState) -> pa.Table:
+        tables = [
+            ipc.open_file(pa.memory_map(self._path(provider, columns, part), "r")).read_all()
+            for part in state.parts
+        ]
+        return pa.concat_tables(tables) if tables else pa.table({})
+
+    @staticmethod
+    def _upsert(table: pa.Table, keys: List[str]) -> pa.Table:
+        """
+        Keep the last row for every key
+        """
+        position = "__orchestra_position"
+        indexed = table.append_column(position, pa.array(range(table.num_rows), type=pa.int64()))
+        last = indexed.group_by(keys).aggregate([(position, "max")])
+        keep = pc.sort_indices(last[f"{position}_max"])
+        return table.take(pc.take(last[f"{position}_max"], keep))
+
+    def _supersede(
+        self, provider: InputDataSource, columns: List[str], parts: List[str], new: pa.Table, keys: List[str]
+    ) -> Tuple[List[str], List[str]]:
+        """
+        Drop the cached rows whose keys are in `new`, rewriting only the parts that hold one.  Returns the parts to keep and the parts replaced.
+        """
+        position = "__orchestra_position"
+        replacing = new.select(keys)
+        kept_parts, replaced = [], []
+        for part in parts:
+            table = ipc.open_file(pa.memory_map(self._path(provider, columns, part), "r")).read_all()
+            indexed = table.select(keys).append_column(position, pa.array(range(table.num_rows), type=pa.int64()))
+            kept = indexed.join(replacing, keys, join_type="left anti")[position]
+            if len(kept) == table.num_rows:
+                kept_parts.append(part)
+                continue
+            replaced.append(part)
+            if len(kept):
+                # the join doesn't keep the row order
+                rows = pc.take(kept, pc.sort_indices(kept))
+                kept_parts.append(self._write_part(provider, columns, table.take(rows)))
+        return kept_parts, replaced
+
+    def get(
+        self,
+        provider: InputDataSource,
+        columns: List[str],
+        extract: Callable[[Optional[Any]], pa.Table],
+        timestamp: Optional[str] = None,
+        keys: Optional[List[str]] = None,
+        overlap: Any = None,
+        max_age: Optional[timedelta] = None,
+    ) -> pa.Table:
+        """
+        The provider's `columns`, from the cache when possible.
+
+        `extract(since)` pulls from the provider: every row when `since` is None, otherwise the rows whose `timestamp` is at or after `since`.  `max_age` overrides the provider's `freshness`; timedelta(0) forces a refresh.
+        """
+        state = self.state(provider, columns)
+        if max_age is None:
+            freshness = getattr(provider, "freshness", None)
+            max_age = freshness if isinstance(freshness, timedelta) else None
+        now = self.clock()
+        if state is not None and (max_age is None or now - state.extracted_at < max_age.total_seconds()):
+            return self._read(provider, columns, state)
+
+        if state is None or timestamp is None or state.watermark is None:
+            table = extract(None)
+            parts = [self._write_part(provider, columns, table)]
+            old = state.parts if state is not None else []
+        else:
+            since = state.watermark - overlap if keys is not None and overlap else state.watermark
+            new = extract(since)
+            parts, old = list(state.parts), []
+            if keys is None:
+                column = new[timestamp]
+                new = new.filter(pc.greater(column, pa.scalar(state.watermark, type=column.type)))
+            elif new.num_rows:
+                new = self._upsert(new, keys)
+                parts, old = self._supersede(provider, columns, parts, new, keys)
+            if new.num_rows:
+                parts.append(self._write_part(provider, columns, new))
+            table = None
+            if len(parts) > self.max_parts:
+                table = self._read(provider, columns, ExtractState(now, None, parts, 0))
+                parts, old = [self._write_part(provider, columns, table)], old + parts
+
+        if table is None:
+            table = self._read(provider, columns, ExtractState(now, None, parts, 0))
+        watermark = None
+        if timestamp is not None and table.num_rows:
+            watermark = pc.max(table[timestamp]).as_py()
+        elif state is not None and timestamp is not None:
+            watermark = state.watermark
+        self._save_state(provider, columns, ExtractState(now, watermark, parts, table.num_rows))
+        for part in old:
+            if part not in parts:
+                os.remove(self._path(provider, columns, part))
+        return table
+
+
+# TODO: evict extracts of providers or column sets that haven't been read for a while.
@@ -0,0 +1,144 @@
+import os
+import pickle
+import tempfile
+from bisect import bisect_right
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+class _Spill:
+    """
+    Hash-partitioned, append-only spill of dict records to local disk
+    """
+
+    def __init__(self, directory: str, name: str, partitions: int, buffer_rows: int):
+        self.paths = [os.path.join(directory, f"{name}-{i}.pkl") for i in range(partitions)]
+        self.buffers: List[List[dict]] = [[] for _ in range(partitions)]
+        self.buffer_rows = buffer_rows
+
+    def add(self, partition: int, record: dict):
+        buffer = self.buffers[partition]
+        buffer.append(record)
+        if len(buffer) >= self.buffer_rows:
+            self.flush(partition)
+
+    def flush(self, partition: int):
+        if self.buffers[partition]:
+            with open(self.paths[partition], "ab") as f:
+                pickle.dump(self.buffers[partition], f, protocol=pickle.HIGHEST_PROTOCOL)
+            self.buffers[partition] = []
+
+    def read(self, partition: int) -> Iterator[dict]:
+        self.flush(partition)
+        if not os.path.exists(self.paths[partition]):
+            return
+        with open(self.paths[partition], "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    break
+        os.remove(self.paths[partition])
+
+
+class AsOfJoin:
+    """
+    Point-in-time correct ("as-of") join of label rows to feature rows.
+
+    Every label row is joined, per `Key`, to the latest feature row whose `Timestamp` is at or before the label's timestamp - never to a feature value from the label's future.  Used by `get_training_data` to join e.g. `fraud_labels` to `txn_log` and `user_info`.
+
+    The join runs out of core: both inputs are streamed once and hash-partitioned on the keys into spill files, then each partition is loaded on its own and matched against its features sorted per key by timestamp.  Memory is bounded by the largest partition and the cost is O(n log n) in the partition sizes - there is never a join-then-filter over all (label, feature) pairs.
+
+    Records are dicts, as in `PythonDataCode`.  Timestamps only need to be comparable with each other (datetimes, epoch numbers or sortable strings); pass `parse_timestamp` otherwise.
+    """
+
+    def __init__(
+        self,
+        keys: List[str],
+        label_timestamp: str,
+        feature_timestamp: str,
+        tolerance: Any = None,
+        parse_timestamp: Optional[Callable[[Any], Any]] = None,
+        partitions: int = 64,
+        buffer_rows: int = 10000,
+        spill_directory: Optional[str] = None,
+    ):
+        self.keys = keys
+        self.label_timestamp = label_timestamp
+        self.feature_timestamp = feature_timestamp
+        self.tolerance = tolerance
+        self.parse_timestamp = parse_timestamp or (lambda value: value)
+        self.partitions = partitions
+        self.buffer_rows = buffer_rows
+        self.spill_directory = spill_directory
+
+    keys: List[str]
+    """
+    Names of the `Key` columns shared by both sides, e.g. ["user_id"]
+    """
+
+    tolerance: Any
+    """
+    Optional.  Maximum age of a feature row relative to the label (e.g., a timedelta).  Older matches are treated as missing.
+    """
+
+    def join(
+        self,
+        labels: Iterable[dict],
+        features: Iterable[dict],
+        columns: List[str],
+        prefix: str = "",
+    ) -> Iterator[dict]:
+        """
+        Yield every label row with `columns` taken from its as-of feature row (None when there is no match), named `prefix + column`.
+
+        Rows come out grouped by partition, not in input order.  Chain calls to join one data source at a time.
+        """
+        with tempfile.TemporaryDirectory(dir=self.spill_directory) as directory:
+            label_spill = _Spill(directory, "labels", self.partitions, self.buffer_rows)
+            feature_spill = _Spill(directory, "features", self.partitions, self.buffer_rows)
+            for record in labels:
+                label_spill.add(self._partition(record), record)
+            for record in features:
+                feature_spill.add(self._partition(record), record)
+            for partition in range(self.partitions):
+                yield from self._merge(
+                    label_spill.read(partition), feature_spill.read(partition), columns, prefix
+                )
+
+    def _key(self, record: dict) -> Tuple:
+        return tuple(record[k] for k in self.keys)
+
+    def _partition(self, record: dict) -> int:
+        return hash(self._key(record)) % self.partitions
+
+    def _merge(
+        self, labels: Iterable[dict], features: Iterable[dict], columns: List[str], prefix: str
+    ) -> Iterator[dict]:
+        history: Dict[Tuple, List[Tuple[Any, int, dict]]] = {}
+        for position, record in enumerate(features):
+            time = self.parse_timestamp(record[self.feature_timestamp])
+            history.setdefault(self._key(record), []).append((time, position, record))
+
+        # only the (time, position) pairs are compared, never the records
+        times: Dict[Tuple, List[Any]] = {}
+        for key, rows in history.items():
+            rows.sort(key=lambda row: row[:2])
+            times[key] = [row[0] for row in rows]
+
+        for label in labels:
+            key = self._key(label)
+            match = None
+            if key in history:
+                time = self.parse_timestamp(label[self.label_timestamp])
+                index = bisect_right(times[key], time) - 1
+                if index >= 0:
+                    match_time, _, match = history[key][index]
+                    if self.tolerance is not None and time - match_time > self.tolerance:
+                        match = None
+            joined = dict(label)
+            for column in columns:
+                joined[prefix + column] = match.get(column) if match is not None else None
+            yield joined
+
+
+# TODO: Columnar (Arrow) partitions instead of pickled dicts once training data is exported as Arrow end to end.
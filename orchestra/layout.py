@@ -0,0 +1,118 @@
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from common import datatype_name, object_name
+from compiled import FusedTransformation
+
+
+MODEL_READABLE = {"Int64", "Int32", "Float", "Double", "Float64", "Boolean", "FloatVector", "DoubleVector"}
+
+
+class ColumnSlot(NamedTuple):
+    """
+    Where one input feature goes in the model input matrix
+    """
+
+    name: str
+    start: int
+    width: int
+    """
+    1 for scalars, the vector length for `FloatVector` / `DoubleVector`
+    """
+
+
+class ModelInput:
+    """
+    Assembles a `Model`'s input matrix straight from feature values, with no DataFrame in between.
+
+    The layout is computed once per Model from `input_features` (in the order the model was trained on): every feature gets a fixed column slot and its values are cast to the model's `dtype` as they are written.  Scalars are written with one fancy-index assignment per request (one column assignment each per batch), vectors as a slice.  If the model's features have fitted `ml_transformations`, the compiled `FusedTransformation` writes the transformed values instead.
+
+    The output buffer is preallocated and reused, one per thread: a returned matrix is only valid until the same thread's next call.  Copy it if it has to outlive the request.
+    """
+
+    def __init__(
+        self,
+        slots: List[ColumnSlot],
+        dtype: Any = np.float32,
+        transformation: Optional[FusedTransformation] = None,
+        batch_size: int = 64,
+    ):
+        self.slots = slots
+        self.dtype = np.dtype(dtype)
+        self.transformation = transformation
+        self.width = transformation.width if transformation is not None else sum(s.width for s in slots)
+        self.batch_size = batch_size
+        scalars = [s for s in slots if s.width == 1]
+        self.scalar_names = [s.name for s in scalars]
+        self.scalar_positions = np.array([s.start for s in scalars], dtype=np.intp)
+        self.vectors = [s for s in slots if s.width != 1]
+        self.local = threading.local()
+
+    @classmethod
+    def for_model(
+        cls,
+        model: Any,
+        dtype: Any = np.float32,
+        fitted: Optional[Dict[str, Any]] = None,
+        batch_size: int = 64,
+    ) -> "ModelInput":
+        """
+        The layout of `model.input_features`.  Features must be model-readable unless they have a fitted transformation.
+        """
+        transformation = FusedTransformation.for_model(model, fitted)
+        if all(t is None for _, t in transformation.columns):
+            transformation = None
+        slots, start = [], 0
+        for feature in model.input_features:
+            name = object_name(feature)
+            datatype = getattr(feature, "human_datatype", None) or getattr(feature, "type", None)
+            type_name = datatype_name(datatype)
+            width = getattr(datatype, "length", None) if type_name in ("FloatVector", "DoubleVector") else 1
+            if not isinstance(width, int):
+                raise ValueError(f"{name} is a vector without a fixed length, e.g. {type_name}(128)")
+            transformed = transformation is not None and dict(transformation.columns)[name] is not None
+            if type_name is not None and type_name not in MODEL_READABLE and not transformed:
+                raise ValueError(f"{name} is a {type_name}, which a model can't read without an ml_transformation")
+            if transformation is not None and width != 1:
+                raise ValueError(f"Vector feature {name} can't be combined with compiled transformations")
+            slots.append(ColumnSlot(name, start, width))
+            start += width
+        return cls(slots, dtype, transformation, batch_size)
+
+    def _buffer(self, rows: int) -> np.ndarray:
+        buffer = getattr(self.local, "buffer", None)
+        if buffer is None or len(buffer) < rows:
+            buffer = self.local.buffer = np.empty((max(rows, self.batch_size), self.width), dtype=self.dtype)
+        return buffer[:rows]
+
+    def assemble(self, record: Dict[str, Any]) -> np.ndarray:
+        """
+        (1, width) input of one request, {feature name: value}
+        """
+        out = self._buffer(1)
+        if self.transformation is not None:
+            self.transformation.transform(record, out[0])
+            return out
+        out[0, self.scalar_positions] = [record[name] for name in self.scalar_names]
+        for slot in self.vectors:
+            out[0, slot.start:slot.start + slot.width] = record[slot.name]
+        return out
+
+    def assemble_batch(self, columns: Dict[str, Sequence[Any]]) -> np.ndarray:
+        """
+        (rows, width) input of a batch, {feature name: values}
+        """
+        rows = len(columns[self.slots[0].name]) if self.slots else 0
+        out = self._buffer(rows)
+        if self.transformation is not None:
+            return self.transformation.transform_batch(columns, out)
+        for name, position in zip(self.scalar_names, self.scalar_positions):
+            out[:, position] = columns[name]
+        for slot in self.vectors:
+            out[:, slot.start:slot.start + slot.width] = np.asarray(columns[slot.name])
+        return out
+
+
+# TODO: let a Model declare its input dtype (e.g., float64 for scikit-learn, float32 for XGBoost / PyTorch) instead of passing it here.
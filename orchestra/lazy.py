@@ -0,0 +1,40 @@
+import importlib
+import sys
+import types
+from typing import List
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported on first attribute access, after which it behaves like the real module.
+
+    Used for backends that only some code paths need (pandas, pyarrow, fsspec, fastavro, requests, ...) so importing an Orchestra module stays cheap, e.g. when a serving pod cold-starts.  Annotations that name a lazy module must not be evaluated at import time, hence `from __future__ import annotations` in the modules using it.
+    """
+
+    def __getattr__(self, attribute: str):
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attribute)
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    `name` itself if it was already imported, a `LazyModule` otherwise
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+def preload(names: List[str]) -> List[str]:
+    """
+    Import `names` now, e.g. while a serving pod starts instead of on its first request.  Returns the names that aren't installed.
+    """
+    missing = []
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            missing.append(name)
+    return missing
+
+
+# TODO: warn when a lazily imported backend is first loaded on a latency-sensitive path (e.g., inside a StageTimers stage).
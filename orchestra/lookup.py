@@ -0,0 +1,292 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from common import object_name
+from dataprovider import InputDataSource
+from lazy import lazy_import
+from metrics import StageTimers
+from plan import PlanStep, code_function
+
+requests = lazy_import("requests")
+adapters = lazy_import("requests.adapters")
+
+
+class LookupClient:
+    """
+    Asynchronous lookup layer behind `input_lookups` / `input_datasources`.
+
+    Every `get(key)` from any row or request goes through one client per DataProvider, which:
+    [1] answers from a TTL cache, with the TTL taken from the provider's `freshness`, holding the `max_cache_rows` most recently used keys
+    [2] dedupes in-flight requests - concurrent gets for the same key share one fetch
+    [3] batches the remaining keys across rows into multi-get calls of up to `max_batch_size` keys, waiting at most `max_delay` to fill a batch
+    [4] bounds concurrent multi-gets to `max_concurrency`, the size of the provider's connection pool
+
+    `fetch_many(keys)` is the provider-specific multi-get and returns {key: row}; keys it leaves out resolve to None.
+
+    Use `get` / `get_many` from one event loop, or the blocking `lookup` from any thread: it answers cache hits directly and sends the misses to the client's own long-lived event loop thread.  `JoinExecutor` uses `lookup` to serve the lookups of a whole batch at once.
+
+    With `timers`, every multi-get is timed as stage `stage` ("lookup:<provider name>" for `for_provider`).
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[Hashable]], Awaitable[Dict[Hashable, Any]]],
+        ttl: Optional[timedelta] = None,
+        max_batch_size: int = 100,
+        max_delay: timedelta = timedelta(milliseconds=2),
+        max_concurrency: int = 10,
+        max_cache_rows: int = 100000,
+        clock: Callable[[], float] = time.monotonic,
+        timers: Optional[StageTimers] = None,
+        stage: str = "lookup",
+    ):
+        self.fetch_many = fetch_many
+        self.ttl = ttl.total_seconds() if ttl is not None else None
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay.total_seconds()
+        self.max_concurrency = max_concurrency
+        self.clock = clock
+        self.timers = timers
+        self.stage = stage
+        self.max_cache_rows = max_cache_rows
+        self.cache: "OrderedDict[Hashable, Tuple[Any, float]]" = OrderedDict()
+        self.cache_lock = threading.Lock()
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_lock = threading.Lock()
+        self.in_flight: Dict[Hashable, asyncio.Future] = {}
+        self.pending: List[Hashable] = []
+        self.flush_handle: Optional[asyncio.TimerHandle] = None
+        self.semaphores: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    @classmethod
+    def for_provider(cls, provider: InputDataSource, fetch_many, **kwargs) -> "LookupClient":
+        """
+        A client whose cache TTL follows the provider's `freshness`
+        """
+        kwargs.setdefault("stage", f"lookup:{object_name(provider)}")
+        return cls(fetch_many, ttl=getattr(provider, "freshness", None), **kwargs)
+
+    def _cached(self, key: Hashable) -> Optional[Tuple[Any, float]]:
+        with self.cache_lock:
+            cached = self.cache.get(key)
+            if cached is None:
+                return None
+            if self.ttl is not None and self.clock() - cached[1] >= self.ttl:
+                del self.cache[key]
+                return None
+            self.cache.move_to_end(key)
+            return cached
+
+    def _remember(self, rows: Dict[Hashable, Any], keys: List[Hashable]):
+        now = self.clock()
+        with self.cache_lock:
+            for key in keys:
+                self.cache[key] = (rows.get(key), now)
+                self.cache.move_to_end(key)
+            while len(self.cache) > self.max_cache_rows:
+                self.cache.popitem(last=False)
+
+    async def get(self, key: Hashable) -> Any:
+        """
+        The row for `key`, or None if the provider doesn't have it
+        """
+        cached = self._cached(key)
+        if cached is not None:
+            return cached[0]
+        future = self.in_flight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self.in_flight[key] = loop.create_future()
+            self.pending.append(key)
+            if len(self.pending) >= self.max_batch_size:
+                self._flush()
+            elif self.flush_handle is None:
+                self.flush_handle = loop.call_later(self.max_delay, self._flush)
+        return await future
+
+    async def get_many(self, keys: List[Hashable]) -> List[Any]:
+        """
+        Rows for `keys` in order, e.g. the lookup keys of every row in a batch
+        """
+        return list(await asyncio.gather(*(self.get(key) for key in keys)))
+
+    def lookup(self, keys: List[Hashable]) -> List[Any]:
+        """
+        Blocking `get_many` for callers outside an event loop, such as batch feature execution
+        """
+        found: Dict[Hashable, Any] = {}
+        missing = []
+        for key in keys:
+            if key in found:
+                continue
+            cached = self._cached(key)
+            if cached is None:
+                missing.append(key)
+            else:
+                found[key] = cached[0]
+        if missing:
+            rows = asyncio.run_coroutine_threadsafe(self.get_many(missing), self._loop()).result()
+            found.update(zip(missing, rows))
+        return [found[key] for key in keys]
+
+    def _loop(self) -> asyncio.AbstractEventLoop:
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                threading.Thread(target=self.loop.run_forever, name="orchestra-lookup-loop", daemon=True).start()
+            return self.loop
+
+    def close(self):
+        """
+        Stop the event loop thread behind `lookup`
+        """
+        with self.loop_lock:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self.loop = None
+
+    def _flush(self):
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        keys, self.pending = self.pending, []
+        for start in range(0, len(keys), self.max_batch_size):
+            asyncio.ensure_future(self._fetch(keys[start : start + self.max_batch_size]))
+
+    async def _fetch(self, keys: List[Hashable]):
+        loop = asyncio.get_running_loop()
+        if loop not in self.semaphores:
+            # semaphores are bound to one loop: `lookup()`'s own, or the caller's for `get`
+            self.semaphores = {loop: asyncio.Semaphore(self.max_concurrency)}
+        try:
+            async with self.semaphores[loop]:
+                start = time.perf_counter_ns()
+                rows = await self.fetch_many(keys)
+                if self.timers is not None:
+                    self.timers.record(self.stage, time.perf_counter_ns() - start)
+        except Exception as error:
+            for key in keys:
+                future = self.in_flight.pop(key)
+                if not future.done():
+                    future.set_exception(error)
+            return
+        self._remember(rows, keys)
+        for key in keys:
+            future = self.in_flight.pop(key)
+            if not future.done():
+                future.set_result(rows.get(key))
+
+
+class _Lookups:
+    """
+    What a Join DataCode sees as `data_sources[name]`: rows prefetched for the whole batch, falling back to the client for keys that weren't
+    """
+
+    def __init__(self, client: LookupClient, rows: Dict[Hashable, Any]):
+        self.client = client
+        self.rows = rows
+
+    def keys(self, keys: List[Hashable]) -> Any:
+        """
+        The row of a single key, or the rows of several
+        """
+        missing = [key for key in keys if key not in self.rows]
+        if missing:
+            self.rows.update(zip(missing, self.client.lookup(missing)))
+        rows = [self.rows[key] for key in keys]
+        return rows[0] if len(keys) == 1 else rows
+
+
+class JoinExecutor:
+    """
+    `ExecutionPlan.run` executor for Join steps (DataCodes with `input_datasources`): `executors={"Join": JoinExecutor({"user_info": client})}`.
+
+    Instead of one blocking lookup per row, the executor collects the lookup keys of every row in the batch, fetches them with one `LookupClient.lookup` (cache hits answered directly, misses deduped and batched into multi-gets) and then calls the DataCode per row with `data_sources[name].keys([key])` answered from the prefetched rows.
+
+    `keys` maps a data source name to the batch column holding its lookup key (e.g., {"user_info": "txn_log.user_id"}).  Without an entry, the step input named like the data source's first `Key` is used.
+    """
+
+    def __init__(self, clients: Dict[str, LookupClient], keys: Optional[Dict[str, str]] = None):
+        self.clients = clients
+        self.keys = keys or {}
+
+    def _key_column(self, source: Any, inputs: List[str]) -> str:
+        name = object_name(source)
+        if name in self.keys:
+            return self.keys[name]
+        schema_keys = getattr(source, "keys", None) or getattr(getattr(source, "schema", None), "keys", None) or []
+        if schema_keys and not callable(schema_keys):
+            key = object_name(schema_keys[0]).split(".")[-1]
+            for column in inputs:
+                if column.split(".")[-1] == key:
+                    return column
+        raise ValueError(f"No lookup key column for data source {name}; pass it in `keys`")
+
+    def __call__(self, step: PlanStep, columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        code = step.codes[0]
+        function = code_function(code)
+        inputs, output = step.wiring[0]
+        data_sources = {}
+        for source in getattr(code, "input_datasources", None) or []:
+            name = object_name(source)
+            if name not in self.clients:
+                raise ValueError(f"No LookupClient for data source {name}")
+            keys = list(dict.fromkeys(columns[self._key_column(source, inputs)]))
+            data_sources[name] = _Lookups(self.clients[name], dict(zip(keys, self.clients[name].lookup(keys))))
+        length = len(columns[inputs[0]]) if inputs else 0
+        return {output: [function(*(columns[c][row] for c in inputs), **data_sources) for row in range(length)]}
+
+
+class ApiFetcher:
+    """
+    `fetch_many` for `DataProvider.types.API` providers, reusing pooled HTTP connections.
+
+    The provider config's "get" URL template is filled in per key (e.g., "https://some.rest.api/get/users/id:{{user_id}}").  If the config also has a "get_many" template, filled with the comma-separated keys, a whole batch is fetched in one request that must return a JSON list of rows containing `key_column`.  Rows are matched to the requested keys by their text, as the keys appear in the URL, so a "123" in the response answers the int key 123 and the other way around; a row for a key that wasn't requested raises ValueError.
+    """
+
+    def __init__(self, config: Dict[str, str], key_column: str, pool_size: int = 10, timeout: float = 5.0):
+        self.config = config
+        self.key_column = key_column
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        # one thread per pooled connection, so no request ever waits for or discards a connection
+        self.executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="orchestra-lookup")
+
+    def _url(self, template: str, value: str) -> str:
+        return template.replace("{{" + self.key_column + "}}", value)
+
+    def _get(self, url: str) -> Any:
+        response = self.session.get(url, timeout=self.timeout)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return response.json()
+
+    async def __call__(self, keys: List[Hashable]) -> Dict[Hashable, Any]:
+        loop = asyncio.get_running_loop()
+        if "get_many" in self.config:
+            url = self._url(self.config["get_many"], ",".join(str(k) for k in keys))
+            rows = await loop.run_in_executor(self.executor, self._get, url) or []
+            requested = {str(key): key for key in keys}
+            found = {}
+            for row in rows:
+                text = str(row[self.key_column])
+                if text not in requested:
+                    raise ValueError(f"{self.key_column} {row[self.key_column]!r} in the response wasn't requested")
+                found[requested[text]] = row
+            return found
+        rows = await asyncio.gather(
+            *(loop.run_in_executor(self.executor, self._get, self._url(self.config["get"], str(key))) for key in keys)
+        )
+        return dict(zip(keys, rows))
+
+
+# TODO: credentials - resolve config["credentials"] from the secret manager and attach them to the session.
@@ -0,0 +1,173 @@
+import hashlib
+import inspect
+import os
+import pickle
+from datetime import timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from common import object_name
+from feature import Feature, Aggregation
+from plan import ExecutionPlan, collect_features, code_function
+from sql import sql_template
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+
+def stable_description(value: Any) -> str:
+    """
+    A stable description of a config value; object reprs (which contain memory addresses) are replaced by type and name
+    """
+    if value is None or isinstance(value, (str, int, float, bool, timedelta)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ",".join(stable_description(v) for v in value) + "]"
+    if isinstance(value, dict):
+        return "{" + ",".join(f"{stable_description(k)}:{stable_description(v)}" for k, v in sorted(value.items(), key=str)) + "}"
+    if isinstance(value, type):
+        return value.__qualname__
+    try:
+        return f"{type(value).__qualname__}:{object_name(value)}"
+    except ValueError:
+        return type(value).__qualname__
+
+
+def code_fingerprint(code) -> str:
+    """
+    Fingerprint of a DataCode or MLTransformation: its type, its declared config and, for Python, the function's source (or bytecode when the source isn't available)
+    """
+    parts = [type(code).__qualname__]
+    for name, value in sorted(vars(code).items()) if hasattr(code, "__dict__") else []:
+        if name != "function" and not name.startswith("_"):
+            parts.append(f"{name}={stable_description(value)}")
+    template = sql_template(code)
+    if template is not None:
+        parts.append(template)
+    elif not isinstance(code, Aggregation):
+        try:
+            function = code_function(code)
+        except ValueError:
+            function = None
+        if function is not None:
+            try:
+                parts.append(inspect.getsource(function))
+            except (OSError, TypeError):
+                body = getattr(function, "__code__", None)
+                parts.append(repr((body.co_code, body.co_consts)) if body else repr(function))
+    return _digest(*parts)
+
+
+def partition_fingerprint(path: str, content: bool = False) -> str:
+    """
+    Fingerprint of an input partition file: its path, size and modification time, or a hash of its bytes with `content`
+    """
+    if not content:
+        stat = os.stat(path)
+        return _digest(os.path.abspath(path), str(stat.st_size), str(stat.st_mtime_ns))
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class Materializer:
+    """
+    Incremental materialization of Features, addressed by content hash.
+
+    Every Feature gets a definition fingerprint: a hash of its `business_logics` and `ml_transformations` code and config, its datatype, and the fingerprints of its `input_features` (raw columns count by name).  A materialized column is stored under hash(definition fingerprint, input partition fingerprint).
+
+    Re-running a pipeline therefore recomputes only:
+    [1] Features whose definition - or any upstream definition - changed, e.g. `unexpectedness_score` and everything downstream of it
+    [2] partitions whose input changed
+
+    Everything else is skipped without even loading the partition; unchanged upstream Features needed by a recomputed one are read back from the store instead of recomputed.
+    """
+
+    def __init__(self, directory: str, executors: Optional[Dict[str, Callable]] = None):
+        self.directory = directory
+        self.executors = executors
+        os.makedirs(directory, exist_ok=True)
+
+    def fingerprints(self, features: List[Feature]) -> Dict[str, str]:
+        """
+        Definition fingerprint of each of `features` and every Feature upstream of them
+        """
+        planned = collect_features(features)
+        fingerprints: Dict[str, str] = {}
+
+        def fingerprint(name: str) -> str:
+            if name not in fingerprints:
+                feature = planned[name]
+                parts = [name, stable_description(getattr(feature, "human_datatype", None))]
+                for ref in getattr(feature, "input_features", None) or []:
+                    ref_name = object_name(ref)
+                    short = ref_name.split(".")[-1]
+                    if ref_name in planned:
+                        parts.append(fingerprint(ref_name))
+                    elif short in planned and ref_name.split(".")[0] in ("", "{{namespace}}"):
+                        parts.append(fingerprint(short))
+                    else:
+                        parts.append(f"raw:{ref_name}")
+                for code in getattr(feature, "business_logics", None) or []:
+                    parts.append(code_fingerprint(code))
+                for transformation in getattr(feature, "ml_transformations", None) or []:
+                    parts.append(code_fingerprint(transformation))
+                fingerprints[name] = _digest(*parts)
+            return fingerprints[name]
+
+        for name in planned:
+            fingerprint(name)
+        return fingerprints
+
+    def _path(self, feature: str, definition: str, partition: str) -> str:
+        return os.path.join(self.directory, feature, _digest(definition, partition) + ".pkl")
+
+    def load(self, feature: str, definition: str, partition: str) -> Any:
+        with open(self._path(feature, definition, partition), "rb") as f:
+            return pickle.load(f)
+
+    def _store(self, feature: str, definition: str, partition: str, column: Any):
+        path = self._path(feature, definition, partition)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            pickle.dump(column, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+
+    def run(
+        self,
+        features: List[Feature],
+        partitions: Iterable[Tuple[str, Callable[[], Dict[str, Any]]]],
+        timestamp: Optional[str] = None,
+    ) -> Dict[str, int]:
+        """
+        Materialize `features` (and everything upstream of them) for each (partition fingerprint, load partition) pair.
+
+        `load()` returns the partition's raw columns as an `ExecutionPlan.run` batch and is only called if something in the partition needs computing.  Returns {feature name: number of partitions computed}.
+        """
+        planned = collect_features(features)
+        definitions = self.fingerprints(features)
+        computed = {name: 0 for name in planned}
+        for partition, load in partitions:
+            missing = [
+                name for name in planned
+                if not os.path.exists(self._path(name, definitions[name], partition))
+            ]
+            if not missing:
+                continue
+            stored = [name for name in planned if name not in missing]
+            plan = ExecutionPlan.compile([planned[name] for name in missing], timestamp=timestamp, provided=stored)
+            batch = dict(load())
+            for name in plan.raw_columns():
+                if name in stored:
+                    batch[name] = self.load(name, definitions[name], partition)
+            results = plan.run(batch, self.executors)
+            for name in missing:
+                self._store(name, definitions[name], partition, results[name])
+                computed[name] += 1
+        return computed
+
+
+# TODO: garbage-collect outputs whose fingerprints no longer match any registered Feature definition.
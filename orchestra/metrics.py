@@ -0,0 +1,218 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+PERCENTILES = [50.0, 90.0, 99.0, 99.9]
+
+
+class Histogram:
+    """
+    HDR-style latency histogram over integer nanoseconds with constant memory and O(1) recording.
+
+    Values below 2**`precision_bits` are counted exactly; above that, each power of two is split into 2**(`precision_bits` - 1) equal buckets, so every recorded value is off by less than 1 / 2**(`precision_bits` - 1) (under 1.6% with the default of 7).  Histograms with the same precision merge by adding counts, e.g. across threads or replicas.
+    """
+
+    def __init__(self, precision_bits: int = 7, max_value: int = 3600 * 10**9):
+        self.precision_bits = precision_bits
+        self.exact = 1 << precision_bits
+        self.half = 1 << (precision_bits - 1)
+        self.counts: List[int] = [0] * (self.index(max_value) + 1)
+        self.count = 0
+        self.total = 0
+        self.min: Optional[int] = None
+        self.max: Optional[int] = None
+        self.lock = threading.Lock()
+
+    def index(self, value: int) -> int:
+        if value < self.exact:
+            return value
+        shift = value.bit_length() - self.precision_bits
+        return self.exact + (shift - 1) * self.half + (value >> shift) - self.half
+
+    def highest_equivalent(self, index: int) -> int:
+        """
+        The largest value counted in bucket `index`
+        """
+        if index < self.exact:
+            return index
+        shift = (index - self.exact) // self.half + 1
+        top = (index - self.exact) % self.half + self.half
+        return ((top + 1) << shift) - 1
+
+    def record(self, nanoseconds: int):
+        if nanoseconds < self.exact:
+            index = nanoseconds if nanoseconds > 0 else 0
+        else:
+            shift = nanoseconds.bit_length() - self.precision_bits
+            index = self.exact + (shift - 1) * self.half + (nanoseconds >> shift) - self.half
+            if index >= len(self.counts):
+                index = len(self.counts) - 1
+        with self.lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += nanoseconds
+            if self.max is None:
+                self.min = self.max = nanoseconds
+            elif nanoseconds > self.max:
+                self.max = nanoseconds
+            elif nanoseconds < self.min:
+                self.min = nanoseconds
+
+    def merge(self, other: "Histogram"):
+        if other.precision_bits != self.precision_bits or len(other.counts) != len(self.counts):
+            raise ValueError("Only histograms with the same precision and range can be merged")
+        with self.lock:
+            for index, count in enumerate(other.counts):
+                if count:
+                    self.counts[index] += count
+            self.count += other.count
+            self.total += other.total
+            if other.min is not None:
+                self.min = other.min if self.min is None else min(self.min, other.min)
+                self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def percentile(self, percentile: float) -> int:
+        """
+        The value at `percentile` (0-100), in nanoseconds
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, int(round(percentile / 100.0 * self.count)))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.highest_equivalent(index), self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, float]:
+        """
+        count plus min, mean, percentiles and max in milliseconds
+        """
+        with self.lock:
+            if self.count == 0:
+                return {"count": 0}
+            summary = {"count": self.count, "min_ms": self.min / 1e6, "mean_ms": self.total / self.count / 1e6}
+            for percentile in PERCENTILES:
+                summary[f"p{percentile:g}_ms"] = self.percentile(percentile) / 1e6
+            summary["max_ms"] = self.max / 1e6
+        return summary
+
+
+class StageTimers:
+    """
+    Per-stage latency histograms for the serving hot path: input validation, each `get_features` lookup, each DataCode and MLTransformation, `predict` and `log_prediction`.
+
+    Time a stage with `with timers.time("predict"):` or decorate a function with `@timers.timed("validate_inputs")`.  Recording costs two `perf_counter_ns` calls and a bucket increment, so it can stay on in production.  Stages are created on first use.
+
+    Results are read with `snapshot()`, served as JSON by `serve()` (GET /metrics) and written to a file by `dump()` or periodically by `dump_every()`.
+    """
+
+    def __init__(self, precision_bits: int = 7):
+        self.precision_bits = precision_bits
+        self.histograms: Dict[str, Histogram] = {}
+        self.lock = threading.Lock()
+        self.server: Optional[ThreadingHTTPServer] = None
+        self.stopped = threading.Event()
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self.histograms.get(stage)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(stage, Histogram(self.precision_bits))
+        return histogram
+
+    def record(self, stage: str, nanoseconds: int):
+        self.histogram(stage).record(nanoseconds)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        histogram = self.histogram(stage)
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            histogram.record(time.perf_counter_ns() - start)
+
+    def timed(self, stage: str) -> Callable[[Callable], Callable]:
+        def decorator(function: Callable) -> Callable:
+            histogram = self.histogram(stage)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter_ns()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter_ns() - start)
+
+            return wrapper
+
+        return decorator
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        return {stage: histogram.snapshot() for stage, histogram in sorted(self.histograms.items())}
+
+    def dump(self, path: str):
+        """
+        Write the snapshot as JSON, atomically replacing `path`
+        """
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "w") as f:
+            json.dump({"timestamp": time.time(), "stages": self.snapshot()}, f, indent=2)
+        os.replace(temporary, path)
+
+    def dump_every(self, path: str, interval: float = 60.0) -> threading.Thread:
+        """
+        `dump` to `path` every `interval` seconds on a daemon thread, and once more on `stop()`
+        """
+
+        def run():
+            while not self.stopped.wait(interval):
+                self.dump(path)
+            self.dump(path)
+
+        thread = threading.Thread(target=run, name="orchestra-metrics-dump", daemon=True)
+        thread.start()
+        return thread
+
+    def serve(self, port: int = 9464, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serve the snapshot as JSON at http://host:port/metrics on a daemon thread
+        """
+        timers = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.rstrip("/") != "/metrics":
+                    self.send_error(404)
+                    return
+                body = json.dumps(timers.snapshot()).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self.server.serve_forever, name="orchestra-metrics", daemon=True).start()
+        return self.server
+
+    def stop(self):
+        self.stopped.set()
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+# TODO: export in Prometheus text format as well, so existing scrapers can pick these up.
@@ -1,4 +1,4 @@
-from typing import List, Literal
+from typing import Any, List, Literal
 from datatype import DataType
 from code import DataCode
 from model import Model
@@ -74,6 +74,11 @@ class SciKitLearnTransformation(MLTransformation):
     Orchestra implemented wrappers around the SciKit pre-processing library
     """
 
+    fitted: Any
+    """
+    Output only.  The fitted scikit-learn estimator, saved after training.  At serving time it is compiled into plain lookup tables and arrays, see `compiled.compile_transformation`.
+    """
+
     # TODO: Implement this...
 
     # TODO: which other libraries do we support for MLTransformations.SciKitLearn?
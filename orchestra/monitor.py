@@ -0,0 +1,224 @@
+import glob
+import os
+import pickle
+import socket
+import threading
+import time
+from datetime import timedelta
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Union
+
+from checks import CheckResult, ColumnProfile, profile
+from common import datatype_name, object_name
+from model import Model
+
+
+def model_columns(model: Model) -> List[str]:
+    """
+    The columns a Model serves: its `input_features`, then its `output_features` Predictions
+    """
+    return [object_name(f) for f in getattr(model, "input_features", None) or []] + prediction_columns(model)
+
+
+def prediction_columns(model: Model) -> List[str]:
+    return [object_name(p) for p in getattr(model, "output_features", None) or {}]
+
+
+def _is_vector(column: Any) -> bool:
+    datatype = getattr(column, "human_datatype", None) or getattr(column, "type", None)
+    return datatype_name(datatype) in ("FloatVector", "DoubleVector")
+
+
+def training_profile(model: Model, batch: Mapping[str, Any], **kwargs) -> Dict[str, ColumnProfile]:
+    """
+    Reference profiles of a Model's training data: one `ColumnProfile` per `Model.training_data` feature, plus each Prediction found in `batch` (e.g., the model's predictions on the test split).  `kwargs` are passed to `ColumnProfile`.
+    """
+    training_data = getattr(model, "training_data", None)
+    columns = [object_name(f) for f in getattr(training_data, "features", None) or getattr(model, "input_features", [])]
+    columns += [c for c in model_columns(model) if c not in columns and c in batch]
+    return profile(batch, columns, **kwargs)
+
+
+def save_profiles(path: str, profiles: Dict[str, ColumnProfile]):
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        pickle.dump(profiles, f)
+    os.replace(temporary, path)
+
+
+def load_profiles(path: str) -> Dict[str, ColumnProfile]:
+    with open(path, "rb") as f:
+        return pickle.load(f)
+
+
+def merge_profiles(profiles: Sequence[Dict[str, ColumnProfile]]) -> Dict[str, ColumnProfile]:
+    merged: Dict[str, ColumnProfile] = {}
+    for column_profiles in profiles:
+        for column, column_profile in column_profiles.items():
+            if column in merged:
+                merged[column].merge(column_profile)
+            else:
+                merged[column] = column_profile
+    return merged
+
+
+class DriftMonitor:
+    """
+    In-process drift monitor for served features and predictions (the "associate prediction logs with the Trained Model" part of `Model`), which never re-reads the prediction logs.
+
+    Every served request updates a `ColumnProfile` (t-digest quantiles, HyperLogLog cardinality, category counts and the null rate) per model input feature and per `Prediction`.  Values are buffered for up to `buffer_rows` requests and then added to the sketches in one vectorized pass, so the cost per request is a few list appends and memory stays constant however much traffic is served.
+
+    Monitoring never fails the request it observes: a batch that can't be profiled is counted in `errors`, and a column whose values can't be profiled (e.g., embeddings passed in by mistake) is recorded in `skipped` with its error and left out from then on.
+
+    `flush()` (or `flush_every()` on a daemon thread) writes the sketches of the last interval to `directory` as one small file per replica and interval, and starts new ones.  Any process can then `collect()` the files of a time window from every replica, merge them and `check()` them against the training-time profiles (`training_profile`).
+    """
+
+    def __init__(
+        self,
+        columns: List[str],
+        directory: str,
+        predictions: Optional[List[str]] = None,
+        replica: Optional[str] = None,
+        buffer_rows: int = 1024,
+        clock: Callable[[], float] = time.time,
+        **profile_options,
+    ):
+        self.predictions = predictions or []
+        self.columns = columns + [p for p in self.predictions if p not in columns]
+        self.directory = directory
+        self.replica = replica or f"{socket.gethostname()}-{os.getpid()}"
+        self.buffer_rows = buffer_rows
+        self.clock = clock
+        self.profile_options = profile_options
+        self.lock = threading.Lock()
+        self.buffer: Dict[str, List[Any]] = {column: [] for column in self.columns}
+        self.buffered = 0
+        self.errors = 0
+        self.skipped: Dict[str, str] = {}
+        self.profiles = self._new_profiles()
+        self.stopped = threading.Event()
+        os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def for_model(cls, model: Model, directory: str, **kwargs) -> "DriftMonitor":
+        """
+        A monitor of `model`'s input features and Predictions.  Only scalar columns can be profiled, so FloatVector / DoubleVector ones are left out; pass `columns` to choose the input columns yourself.
+        """
+        predictions = [object_name(p) for p in getattr(model, "output_features", None) or {} if not _is_vector(p)]
+        columns = kwargs.pop("columns", None) or [
+            object_name(f) for f in getattr(model, "input_features", None) or [] if not _is_vector(f)
+        ]
+        return cls(columns, os.path.join(directory, object_name(model)), predictions, **kwargs)
+
+    def _new_profiles(self) -> Dict[str, ColumnProfile]:
+        return {column: ColumnProfile(**self.profile_options) for column in self.columns}
+
+    def observe(self, record: Mapping[str, Any]):
+        """
+        Add one served request, {column: value}; missing columns count as nulls
+        """
+        with self.lock:
+            for column, values in self.buffer.items():
+                values.append(record.get(column))
+            self.buffered += 1
+            if self.buffered >= self.buffer_rows:
+                self._drain()
+
+    def observe_batch(self, columns: Mapping[str, Sequence[Any]], predictions: Any = None):
+        """
+        Add a micro-batch of served requests, {column: values}.  `predictions` are the model's outputs for the batch: {Prediction name: values}, or just the values when the model has a single Prediction.
+        """
+        try:
+            if predictions is not None:
+                if not isinstance(predictions, Mapping):
+                    if len(self.predictions) != 1:
+                        raise ValueError(f"Expected predictions by name for {len(self.predictions)} Predictions")
+                    predictions = {self.predictions[0]: predictions}
+                columns = {**columns, **predictions}
+            rows = len(next(iter(columns.values()))) if columns else 0
+        except Exception:
+            with self.lock:
+                self.errors += 1
+            return
+        with self.lock:
+            self._drain()
+            for column in self.profiles:
+                self._update(column, columns[column] if column in columns else [None] * rows)
+
+    def _update(self, column: str, values: Any):
+        if column in self.skipped:
+            return
+        try:
+            self.profiles[column].update(values)
+        except Exception as error:
+            self.errors += 1
+            self.skipped[column] = f"{type(error).__name__}: {error}"
+
+    def _drain(self):
+        if not self.buffered:
+            return
+        for column, values in self.buffer.items():
+            self._update(column, values)
+            self.buffer[column] = []
+        self.buffered = 0
+
+    def flush(self) -> Optional[str]:
+        """
+        Write the sketches gathered since the last flush to `directory` and start new ones; returns the file written, if any
+        """
+        with self.lock:
+            self._drain()
+            profiles, self.profiles = self.profiles, self._new_profiles()
+        if not any(p.rows for p in profiles.values()):
+            return None
+        path = os.path.join(self.directory, f"drift-{int(self.clock() * 1000):015d}-{self.replica}.pkl")
+        save_profiles(path, profiles)
+        return path
+
+    def flush_every(self, interval: float = 60.0) -> threading.Thread:
+        """
+        `flush` every `interval` seconds on a daemon thread, and once more on `stop()`
+        """
+
+        def run():
+            while not self.stopped.wait(interval):
+                self.flush()
+            self.flush()
+
+        thread = threading.Thread(target=run, name="orchestra-drift-flush", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.stopped.set()
+
+    def collect(self, window: Optional[timedelta] = None) -> Dict[str, ColumnProfile]:
+        """
+        The merged sketches every replica flushed within the last `window` (default: all of them)
+        """
+        since = int((self.clock() - window.total_seconds()) * 1000) if window is not None else 0
+        profiles = []
+        for path in sorted(glob.glob(os.path.join(self.directory, "drift-*.pkl"))):
+            if int(os.path.basename(path).split("-", 2)[1]) >= since:
+                profiles.append(load_profiles(path))
+        return merge_profiles(profiles)
+
+    def check(
+        self,
+        reference: Dict[str, ColumnProfile],
+        max_drift: Union[float, Dict[str, float]],
+        window: Optional[timedelta] = None,
+    ) -> List[CheckResult]:
+        """
+        Drift of every column with a reference profile over the last `window`, against `max_drift` (per column, or one threshold for all).  Numeric columns are compared by Kolmogorov-Smirnov distance and categorical ones by PSI, see `ColumnProfile.drift`.
+        """
+        results = []
+        for column, current in self.collect(window).items():
+            threshold = max_drift.get(column) if isinstance(max_drift, dict) else max_drift
+            if column not in reference or threshold is None:
+                continue
+            value = current.drift(reference[column])
+            results.append(CheckResult(column, "drift", value, threshold, not value > threshold))
+        return results
+
+
+# TODO: expire flushed sketch files past a retention period, or roll them up into hourly / daily files.
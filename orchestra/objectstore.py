@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+import io
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from dataprovider import InputDataSource
+from lazy import lazy_import
+
+fsspec = lazy_import("fsspec")
+pa = lazy_import("pyarrow")
+pc = lazy_import("pyarrow.compute")
+csv = lazy_import("pyarrow.csv")
+pq = lazy_import("pyarrow.parquet")
+
+
+Filter = Tuple[str, str, Any]
+"""
+(column, operator, value) with operator one of ==, !=, <, <=, >, >=, in, not in.  A list of filters is a conjunction.
+"""
+
+COMPARISONS = {
+    "==": "equal",
+    "!=": "not_equal",
+    "<": "less",
+    "<=": "less_equal",
+    ">": "greater",
+    ">=": "greater_equal",
+}
+
+
+def _filter_mask(table: pa.Table, filters: Sequence[Filter]) -> Optional[pa.ChunkedArray]:
+    mask = None
+    for column, operator, value in filters:
+        if operator in COMPARISONS:
+            condition = getattr(pc, COMPARISONS[operator])(table[column], pa.scalar(value, type=table[column].type))
+        elif operator in ("in", "not in"):
+            condition = pc.is_in(table[column], value_set=pa.array(list(value), type=table[column].type))
+            if operator == "not in":
+                condition = pc.invert(condition)
+        else:
+            raise ValueError(f"Unknown filter operator {operator}")
+        mask = condition if mask is None else pc.and_(mask, condition)
+    return mask
+
+
+def _outside(operator: str, value: Any, low: Any, high: Any) -> bool:
+    """
+    True if no value in [low, high] can satisfy `column <operator> value`
+    """
+    if operator == "==":
+        return value < low or value > high
+    if operator == "<":
+        return low >= value
+    if operator == "<=":
+        return low > value
+    if operator == ">":
+        return high <= value
+    if operator == ">=":
+        return high < value
+    if operator == "in":
+        return all(v < low or v > high for v in value)
+    return False
+
+
+def _hive_partitions(path: str) -> Dict[str, str]:
+    return dict(part.split("=", 1) for part in path.split("/")[:-1] if "=" in part)
+
+
+def _partition_matches(partitions: Dict[str, str], filters: Sequence[Filter]) -> bool:
+    """
+    False if a filter on a partition key excludes the partition.  The key's value is cast from its path string to the type of the filter value ("dt=2022-12-01" to a date, "hour=07" to 7) and compared like a column; a value that can't be cast raises.
+    """
+    for column, operator, value in filters:
+        if column not in partitions:
+            continue
+        if operator in ("in", "not in"):
+            values = pa.array(list(value))
+            if not len(values):
+                matches = operator == "not in"
+            else:
+                matches = pc.is_in(pa.scalar(partitions[column]).cast(values.type), value_set=values).as_py()
+                matches = matches if operator == "in" else not matches
+        elif operator in COMPARISONS:
+            typed = pa.scalar(value)
+            partition = pa.scalar(partitions[column]).cast(typed.type)
+            matches = getattr(pc, COMPARISONS[operator])(partition, typed).as_py()
+        else:
+            raise ValueError(f"Unknown filter operator {operator}")
+        if not matches:
+            return False
+    return True
+
+
+class ObjectStoreReader:
+    """
+    Parallel reader for `DataProvider.types.S3` (and any other fsspec filesystem: gcs://, abfs://, memory://, local paths, or a MinIO endpoint through `storage_options={"client_kwargs": {"endpoint_url": ...}}`).
+
+    Every object is split into independent units of work that a bounded thread pool reads concurrently:
+    [1] Parquet - one unit per row group.  Row groups whose column statistics can't match `filters` are skipped without being read, and only the requested `columns` (plus filtered ones) are decoded.
+    [2] CSV - one unit per `block_size` byte range, each extended to the next line break.  The first block is parsed first to fix the column types for the rest.  Splitting assumes no quoted field contains a line break; pass `newlines_in_values=True` to read such files in one piece.
+
+    A path may also be a prefix or glob of many objects.  Hive-style partitions ("dt=2022-12-01/") are pruned by `filters` on the partition key - any operator - before any object is opened.
+
+    Results keep the order of the objects and of the row groups / ranges within them.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 16,
+        block_size: int = 64 * 1024 * 1024,
+        storage_options: Optional[Dict[str, Any]] = None,
+    ):
+        self.max_workers = max_workers
+        self.block_size = block_size
+        self.storage_options = storage_options or {}
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="orchestra-objectstore")
+
+    @classmethod
+    def for_provider(cls, provider: InputDataSource, **kwargs) -> Tuple["ObjectStoreReader", str]:
+        """
+        A reader and the object path for a provider whose config has a "path" and, optionally, "storage_options"
+        """
+        config = getattr(provider, "provider_config", None) or getattr(provider, "config", None) or {}
+        if "path" not in config:
+            raise ValueError("Object store providers need a 'path' in their config")
+        kwargs.setdefault("storage_options", config.get("storage_options"))
+        return cls(**kwargs), config["path"]
+
+    def objects(self, path: str, filters: Sequence[Filter] = ()) -> Tuple[Any, List[str]]:
+        """
+        The filesystem and the objects under `path`, minus the Hive partitions excluded by `filters`
+        """
+        filesystem, root = fsspec.core.url_to_fs(path, **self.storage_options)
+        if any(character in root for character in "*?["):
+            paths = sorted(filesystem.glob(root))
+        elif filesystem.isdir(root):
+            paths = sorted(p for p in filesystem.find(root) if not p.rsplit("/", 1)[-1].startswith(("_", ".")))
+        else:
+            paths = [root]
+        return filesystem, [p for p in paths if _partition_matches(_hive_partitions(p), filters)]
+
+    def read(
+        self,
+        path: str,
+        columns: Optional[List[str]] = None,
+        filters: Sequence[Filter] = (),
+        format: Optional[str] = None,
+        **csv_options,
+    ) -> pa.Table:
+        """
+        Read `columns` (default: all) of the rows matching `filters`.  `format` is "parquet" or "csv", by default taken from the file extension.
+        """
+        filesystem, paths = self.objects(path, filters)
+        if not paths:
+            raise FileNotFoundError(path)
+        units = []
+        for object_path in paths:
+            # partition keys become constant string columns; the files themselves don't contain them
+            partitions = _hive_partitions(object_path)
+            file_columns = None if columns is None else [c for c in columns if c not in partitions]
+            file_filters = [f for f in filters if f[0] not in partitions]
+            kind = format or ("parquet" if object_path.endswith((".parquet", ".pq")) else "csv")
+            if kind == "parquet":
+                read = self._parquet_units(filesystem, object_path, file_columns, file_filters)
+            else:
+                read = self._csv_units(filesystem, object_path, file_columns, file_filters, **csv_options)
+            units.extend((unit, partitions) for unit in read)
+        tables = []
+        for unit, partitions in units:
+            table = unit.result()
+            for key, value in partitions.items():
+                if columns is None or key in columns:
+                    table = table.append_column(key, pa.array([value] * table.num_rows, type=pa.string()))
+            tables.append(table.select(columns) if columns is not None else table)
+        return pa.concat_tables(tables)
+
+    def _select(self, table: pa.Table, columns: Optional[List[str]], filters: Sequence[Filter]) -> pa.Table:
+        mask = _filter_mask(table, filters)
+        if mask is not None:
+            table = table.filter(mask)
+        return table.select(columns) if columns is not None else table
+
+    def _parquet_units(self, filesystem, path: str, columns, filters) -> list:
+        with filesystem.open(path, "rb") as f:
+            metadata = pq.ParquetFile(f).metadata
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+        names = metadata.schema.names
+        groups = []
+        for index in range(metadata.num_row_groups):
+            group = metadata.row_group(index)
+            skip = False
+            for column, operator, value in filters:
+                if column not in names:
+                    continue
+                statistics = group.column(names.index(column)).statistics
+                if statistics is not None and statistics.has_min_max and _outside(
+                    operator, value, statistics.min, statistics.max
+                ):
+                    skip = True
+                    break
+            if not skip:
+                groups.append(index)
+
+        def read_group(index: int) -> pa.Table:
+            with filesystem.open(path, "rb") as f:
+                table = pq.ParquetFile(f).read_row_group(index, columns=read_columns)
+            return self._select(table, columns, filters)
+
+        return [self.pool.submit(read_group, index) for index in groups]
+
+    def _csv_units(self, filesystem, path: str, columns, filters, newlines_in_values: bool = False, **options) -> list:
+        size = filesystem.size(path)
+        with filesystem.open(path, "rb") as f:
+            header = f.readline()
+        names = csv.read_csv(io.BytesIO(header)).column_names
+        read_columns = None if columns is None else list(dict.fromkeys(list(columns) + [f[0] for f in filters]))
+        block_size = size if newlines_in_values else self.block_size
+        starts = list(range(len(header), size, max(block_size, 1))) or [len(header)]
+
+        def read_range(start: int, column_types: Optional[Dict[str, pa.DataType]]) -> pa.Table:
+            with filesystem.open(path, "rb") as f:
+                if start > len(header):
+                    # the previous range owns the line that straddles `start`
+                    f.seek(start - 1)
+                    f.readline()
+                else:
+                    f.seek(start)
+                begin = f.tell()
+                end = start + block_size
+                if end < size:
+                    f.seek(end - 1)
+                    f.readline()
+                    stop = f.tell()
+                else:
+                    stop = size
+                f.seek(begin)
+                data = f.read(stop - begin) if stop > begin else b""
+            if not data:
+                # a line longer than the block started before this range and ends after it
+                kept = read_columns or names
+                return pa.table({n: pa.array([], type=(column_types or {}).get(n, pa.string())) for n in kept})
+            table = csv.read_csv(
+                io.BytesIO(data),
+                read_options=csv.ReadOptions(column_names=names),
+                parse_options=csv.ParseOptions(newlines_in_values=newlines_in_values, **options),
+                convert_options=csv.ConvertOptions(include_columns=read_columns, column_types=column_types),
+            )
+            return table
+
+        first = read_range(starts[0], None)
+        types = {field.name: field.type for field in first.schema}
+        units = [self.pool.submit(self._select, first, columns, filters)]
+        for start in starts[1:]:
+            units.append(self.pool.submit(lambda s: self._select(read_range(s, types), columns, filters), start))
+        return units
+
+    def close(self):
+        self.pool.shutdown()
+
+
+# TODO: read-ahead and retry with backoff for transient object store errors; push filters into CSV parsing once pyarrow supports it.
@@ -0,0 +1,308 @@
+import time
+from typing import Any, Callable, Collection, Dict, List, Optional, Tuple
+
+from common import object_name
+from feature import Feature, Aggregation
+from code import DataCode
+from metrics import StageTimers
+
+
+def records_needed(code: DataCode) -> str:
+    """
+    The `input_records_needed` of a DataCode as a plain string.
+
+    `DataCode.input_records_needed` defaults to the Literal type itself; anything that isn't set explicitly is treated as SingleRecord.  Code that looks up `input_datasources` is a Join.
+    """
+    if isinstance(code, Aggregation):
+        return "Aggregation"
+    if getattr(code, "input_datasources", None):
+        return "Join"
+    value = getattr(code, "input_records_needed", None)
+    return value if isinstance(value, str) else "SingleRecord"
+
+
+def code_function(code: DataCode) -> Callable:
+    """
+    The Python callable behind a DataCode, either `PythonDataCode.function` or the object itself when it is callable.
+    """
+    function = getattr(code, "function", None)
+    if function is None and callable(code):
+        function = code
+    if function is None:
+        raise ValueError(f"{object_name(code)} has no executable function")
+    return function
+
+
+def collect_features(features: List[Feature], provided: Collection[str] = ()) -> Dict[str, Feature]:
+    """
+    {name: Feature} for `features` and every Feature they reference through `input_features`, not descending into `provided` ones
+    """
+    collected: Dict[str, Feature] = {}
+    pending = list(features)
+    while pending:
+        feature = pending.pop()
+        name = object_name(feature)
+        if name in collected or name in provided:
+            continue
+        collected[name] = feature
+        for ref in getattr(feature, "input_features", None) or []:
+            if not isinstance(ref, str):
+                pending.append(ref)
+    return collected
+
+
+class PlanStep:
+    """
+    A single node of an `ExecutionPlan`.
+
+    A step reads its `inputs` columns and writes its `outputs` columns.  `codes` holds 1+ DataCodes executed in order; more than one means adjacent SingleRecord steps were fused into a single pass over the batch.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        inputs: List[str],
+        outputs: List[str],
+        codes: Optional[List[DataCode]] = None,
+        records_needed: str = "SingleRecord",
+    ):
+        self.kind = kind
+        self.inputs = inputs
+        self.outputs = outputs
+        self.codes = codes or []
+        self.records_needed = records_needed
+        self.wiring: List[Tuple[List[str], str]] = [(inputs, outputs[-1])] if codes else []
+
+    kind: str
+    """
+    "read" for the step that pulls raw columns from a data source, "code" for business logic
+    """
+
+    inputs: List[str]
+    """
+    Columns consumed by this step, in the positional order the first DataCode expects them
+    """
+
+    outputs: List[str]
+    """
+    Columns produced by this step.  Intermediate columns of a fused step are included.
+    """
+
+    wiring: List[Tuple[List[str], str]]
+    """
+    For each DataCode in `codes`, the (input columns, output column) it is called with
+    """
+
+    @property
+    def name(self) -> str:
+        """
+        Names of the step's DataCodes joined by "+", or "read"
+        """
+        names = "+".join(type(c).__name__ if isinstance(c, Aggregation) else object_name(c) for c in self.codes)
+        return names or "read"
+
+    def __repr__(self):
+        return f"PlanStep({self.kind}:{self.name} {self.inputs} -> {self.outputs})"
+
+
+class ExecutionPlan:
+    """
+    An ordered, deduplicated plan to compute a set of Features over a batch of data.
+
+    Compiling a plan:
+    [1] resolves every `input_features` reference to either a raw column ("data_source.feature_name") or another planned Feature
+    [2] eliminates shared sub-expressions - the same DataCode applied to the same inputs is planned once no matter how many Features use it
+    [3] orders the steps topologically so every intermediate value is computed exactly once per batch
+    [4] fuses chains of SingleRecord steps so they run in one pass over the records
+
+    Raw columns are grouped into one "read" step per data source, so each raw column is read once per batch.
+    """
+
+    steps: List[PlanStep]
+    """
+    Steps in execution order
+    """
+
+    outputs: Dict[str, str]
+    """
+    Feature name -> the column that holds its final value
+    """
+
+    def __init__(self, steps: List[PlanStep], outputs: Dict[str, str]):
+        self.steps = steps
+        self.outputs = outputs
+
+    @classmethod
+    def compile(
+        cls,
+        features: List[Feature],
+        fuse: bool = True,
+        timestamp: Optional[str] = None,
+        provided: Collection[str] = (),
+    ) -> "ExecutionPlan":
+        """
+        Compile `features` into an ExecutionPlan.  Features referenced through `input_features` do not need to be passed explicitly.
+
+        Features named in `provided` were computed elsewhere (e.g., loaded from a materialized store): they are read from the batch like raw columns instead of being planned.
+
+        Aggregation steps read their `aggregate_by` columns after the aggregated value, followed by `timestamp` (the data source's `Timestamp` column) when provided.
+        """
+        planned = collect_features(features, provided)
+
+        # (code identity, input columns) -> output column
+        expressions: Dict[Tuple[int, Tuple[str, ...]], str] = {}
+        code_steps: Dict[str, PlanStep] = {}
+        raw_columns: Dict[str, List[str]] = {}
+        outputs: Dict[str, str] = {}
+        resolving: List[str] = []
+
+        def resolve(ref) -> str:
+            name = object_name(ref)
+            if name in outputs:
+                return outputs[name]
+            short = name.split(".")[-1]
+            if (short in planned or short in provided) and name.split(".")[0] in ("", "{{namespace}}"):
+                name = short
+            if name not in planned:
+                source = name.split(".")[0] if "." in name else ""
+                columns = raw_columns.setdefault(source, [])
+                if name not in columns:
+                    columns.append(name)
+                return name
+            if name in resolving:
+                raise ValueError(f"Circular feature dependency: {' -> '.join(resolving + [name])}")
+            resolving.append(name)
+            feature = planned[name]
+            columns = [resolve(r) for r in getattr(feature, "input_features", None) or []]
+            for index, code in enumerate(getattr(feature, "business_logics", None) or []):
+                if isinstance(code, Aggregation):
+                    group_by = getattr(code, "aggregate_by", None) or getattr(code, "group_by", None) or []
+                    columns = columns + [resolve(k) for k in group_by] + ([resolve(timestamp)] if timestamp else [])
+                key = (id(code), tuple(columns))
+                if key not in expressions:
+                    column = name if index == len(feature.business_logics) - 1 else f"{name}#{index}"
+                    expressions[key] = column
+                    code_steps[column] = PlanStep(
+                        "code", columns, [column], [code], records_needed(code)
+                    )
+                columns = [expressions[key]]
+            resolving.pop()
+            if len(columns) != 1:
+                raise ValueError(f"Feature {name} has {len(columns)} inputs but no business logic to combine them")
+            outputs[name] = columns[0]
+            return columns[0]
+
+        for name in planned:
+            resolve(name)
+
+        reads = [PlanStep("read", [], columns) for columns in raw_columns.values()]
+        steps = reads + cls._order(list(code_steps.values()))
+        if fuse:
+            steps = cls._fuse(steps, set(outputs.values()))
+        return cls(steps, outputs)
+
+    @staticmethod
+    def _order(steps: List[PlanStep]) -> List[PlanStep]:
+        producers = {column: step for step in steps for column in step.outputs}
+        ordered: List[PlanStep] = []
+        visited = set()
+
+        def visit(step):
+            if id(step) in visited:
+                return
+            visited.add(id(step))
+            for column in step.inputs:
+                if column in producers:
+                    visit(producers[column])
+            ordered.append(step)
+
+        for step in steps:
+            visit(step)
+        return ordered
+
+    @staticmethod
+    def _fuse(steps: List[PlanStep], kept: set) -> List[PlanStep]:
+        consumers: Dict[str, int] = {}
+        for step in steps:
+            for column in step.inputs:
+                consumers[column] = consumers.get(column, 0) + 1
+
+        fused: List[PlanStep] = []
+        for step in steps:
+            previous = fused[-1] if fused else None
+            if (
+                previous is not None
+                and previous.kind == step.kind == "code"
+                and previous.records_needed == step.records_needed == "SingleRecord"
+                and previous.outputs[-1] in step.inputs
+            ):
+                extra = [c for c in step.inputs if c not in previous.inputs and c not in previous.outputs]
+                previous.inputs = previous.inputs + extra
+                previous.codes = previous.codes + step.codes
+                previous.wiring = previous.wiring + step.wiring
+                previous.outputs = previous.outputs + step.outputs
+                continue
+            fused.append(step)
+
+        # intermediates nobody else reads don't need to be materialized
+        for step in fused:
+            if len(step.codes) > 1:
+                step.outputs = [
+                    c for c in step.outputs if c in kept or consumers.get(c, 0) > 1 or c == step.outputs[-1]
+                ]
+        return fused
+
+    def raw_columns(self) -> List[str]:
+        """
+        Every raw "data_source.feature_name" column the plan reads, each listed once
+        """
+        return [column for step in self.steps if step.kind == "read" for column in step.outputs]
+
+    def run(
+        self,
+        batch: Dict[str, List[Any]],
+        executors: Optional[Dict[str, Callable[[PlanStep, Dict[str, List[Any]]], Dict[str, List[Any]]]]] = None,
+        timers: Optional[StageTimers] = None,
+    ) -> Dict[str, List[Any]]:
+        """
+        Execute the plan over a columnar batch of raw data ({"data_source.feature_name": [values]}) and return {feature name: [values]}.
+
+        SingleRecord steps are executed here, one pass over the batch per (fused) step.  Steps needing other records (Aggregation, Join, AllRecords) are handed to `executors[step.records_needed]`, which returns the step's output columns.
+
+        With `timers`, each code step is timed as stage "datacode:<step name>".
+        """
+        executors = executors or {}
+        rows = len(next(iter(batch.values()))) if batch else 0
+        columns: Dict[str, List[Any]] = {}
+        for step in self.steps:
+            if step.kind == "read":
+                for column in step.outputs:
+                    columns[column] = batch[column]
+                continue
+            start = time.perf_counter_ns()
+            if step.records_needed in executors:
+                columns.update(executors[step.records_needed](step, columns))
+            elif step.records_needed == "SingleRecord":
+                columns.update(self._run_records(step, columns, rows))
+            else:
+                raise NotImplementedError(f"No executor for {step.records_needed} step {step!r}")
+            if timers is not None:
+                timers.record(f"datacode:{step.name}", time.perf_counter_ns() - start)
+        return {name: columns[column] for name, column in self.outputs.items()}
+
+    @staticmethod
+    def _run_records(step: PlanStep, columns: Dict[str, List[Any]], rows: int) -> Dict[str, List[Any]]:
+        # `rows` is the batch's row count, so a step without inputs (e.g., a constant) still gives one value per row
+        calls = [(code_function(code), inputs, output) for code, (inputs, output) in zip(step.codes, step.wiring)]
+        results: Dict[str, List[Any]] = {output: [None] * rows for _, _, output in calls}
+        for row in range(rows):
+            for function, inputs, output in calls:
+                args = [
+                    results[column][row] if column in results else columns[column][row]
+                    for column in inputs
+                ]
+                results[output][row] = function(*args)
+        return {column: results[column] for column in step.outputs}
+
+
+# TODO: Plans over multiple Keys - when input_features come from 2+ Datasets, the read steps assume they were already joined on the shared Key space.
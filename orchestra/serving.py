@@ -1,4 +1,10 @@
-from typing import List, Set
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from datetime import timedelta
+from typing import Any, Callable, List, Optional, Sequence, Set, Tuple
+
 from common import Metadata
 from model import Model
 from feature import Feature
@@ -31,3 +37,96 @@ class PredictionEndpoint:
 
     # TODO expirements
     # TBD - how do we define this?
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into micro-batches.
+
+    Callers block in `__call__` while a background thread collects requests for up to `max_delay` (or until `max_batch_size` requests are queued), runs `process` once on the whole batch and fans the results back out.  One batched feature fetch and one `.predict()` on a stacked matrix costs far less per row than one of each per request.
+
+    `process(requests)` must return one result per request, in order.  If it raises, every caller in that batch gets the exception.  Requests whose Future was cancelled before their batch started are left out of it.  `close()` processes what is already queued and stops the worker.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 64,
+        max_delay: timedelta = timedelta(milliseconds=5),
+    ):
+        self.process = process
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay.total_seconds()
+        self.queue: "queue.SimpleQueue[Optional[Tuple[Any, Future]]]" = queue.SimpleQueue()
+        self.lock = threading.Lock()
+        self.closed = False
+        self.worker = threading.Thread(target=self._run, name="orchestra-microbatcher", daemon=True)
+        self.worker.start()
+
+    def submit(self, request: Any) -> Future:
+        """
+        Queue a request and return a Future for its result
+        """
+        future: Future = Future()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Can't submit requests to a closed MicroBatcher")
+            self.queue.put((request, future))
+        return future
+
+    def __call__(self, request: Any) -> Any:
+        return self.submit(request).result()
+
+    def close(self, timeout: Optional[float] = None):
+        """
+        Stop accepting requests, finish the queued ones and stop the worker
+        """
+        with self.lock:
+            if not self.closed:
+                self.closed = True
+                self.queue.put(None)
+        self.worker.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self.queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._process(batch)
+            except Exception as error:
+                # never let one batch take the worker (and every later caller) down
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _process(self, batch: List[Tuple[Any, Future]]):
+        batch = [(request, future) for request, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        requests = [request for request, _ in batch]
+        try:
+            results = self.process(requests)
+            if len(results) != len(requests):
+                raise ValueError(f"Batch of {len(requests)} requests returned {len(results)} results")
+        except Exception as error:
+            for _, future in batch:
+                future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
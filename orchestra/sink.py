@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Literal, Mapping, Optional, Sequence, Tuple, Union
+
+from common import datatype_name, object_name
+from lazy import lazy_import
+
+pa = lazy_import("pyarrow")
+ipc = lazy_import("pyarrow.ipc")
+pq = lazy_import("pyarrow.parquet")
+
+
+LOG_TYPES = {
+    # DataType name: Arrow type of its prediction log column; vectors become fixed-size lists of their length
+    "Int64": lambda: pa.int64(),
+    "Int32": lambda: pa.int32(),
+    "Float": lambda: pa.float32(),
+    "Double": lambda: pa.float64(),
+    "Float64": lambda: pa.float64(),
+    "Boolean": lambda: pa.bool_(),
+    "String": lambda: pa.string(),
+    "Timestamp": lambda: pa.timestamp("us", tz="UTC"),
+    "FloatVector": lambda: pa.float32(),
+    "DoubleVector": lambda: pa.float64(),
+}
+
+LogField = Tuple[str, Optional[str], Optional[int]]
+
+
+def log_fields(model: Any) -> List[LogField]:
+    """
+    (column, DataType name, vector length) of every logged column of a Model: its `input_features`, then its `output_features` Predictions
+    """
+    fields = []
+    columns = list(getattr(model, "input_features", None) or []) + list(getattr(model, "output_features", None) or {})
+    for column in columns:
+        datatype = getattr(column, "human_datatype", None) or getattr(column, "type", None)
+        length = getattr(datatype, "length", None)
+        fields.append((object_name(column), datatype_name(datatype), length if isinstance(length, int) else None))
+    return fields
+
+
+def log_schema(fields: Sequence[LogField]) -> pa.Schema:
+    """
+    The Arrow schema of `log_fields`.  Raises ValueError for a column without a loggable DataType.
+    """
+    columns = []
+    for name, type_name, length in fields:
+        if type_name not in LOG_TYPES:
+            raise ValueError(f"Can't log {name} of type {type_name}; pass an explicit schema")
+        arrow_type = LOG_TYPES[type_name]()
+        if type_name.endswith("Vector"):
+            arrow_type = pa.list_(arrow_type, length) if length is not None else pa.list_(arrow_type)
+        columns.append(pa.field(name, arrow_type))
+    return pa.schema(columns)
+
+
+class PredictionLogSink:
+    """
+    Non-blocking sink for prediction logs (`orchestra.log_prediction`).
+
+    `log(record)` appends to an in-process deque - no lock, no I/O - and returns immediately.  A background writer drains it in batches of up to `batch_rows` (or whatever arrived within `flush_interval`) into compressed columnar files, Parquet or Arrow IPC.  Files are rotated after `rotate_rows` rows, `rotate_bytes` bytes or `rotate_interval`, whichever comes first; a file is written as `*.inprogress` and renamed when closed, so readers only ever see complete files.
+
+    When more than `max_queue` records are waiting, `policy` decides:
+    [1] "drop_newest" (default) - the new record is dropped
+    [2] "drop_oldest" - the oldest waiting record is dropped
+    [3] "block" - the caller waits for room; only use this where losing logs is worse than adding latency
+
+    Dropped records are counted in `dropped`.
+
+    Every file has the same `schema`: an Arrow schema, or the `log_fields` it is built from (see `for_model`).  Records missing a column get nulls and extra keys are ignored.  Values are converted to the column's type only where nothing is lost (an int into a float column, 2.0 into an int column); a record with a value that can't be converted (2.5 or "x" into an int column) is left out and counted in `rejected`, instead of failing or truncating its batch.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        schema: Union[pa.Schema, Sequence[LogField]],
+        format: Literal["parquet", "ipc"] = "parquet",
+        compression: str = "zstd",
+        batch_rows: int = 10000,
+        flush_interval: timedelta = timedelta(seconds=1),
+        rotate_rows: int = 1000000,
+        rotate_bytes: int = 128 * 1024 * 1024,
+        rotate_interval: timedelta = timedelta(minutes=15),
+        max_queue: int = 100000,
+        policy: Literal["drop_newest", "drop_oldest", "block"] = "drop_newest",
+    ):
+        if format not in ("parquet", "ipc"):
+            raise ValueError(f"format must be 'parquet' or 'ipc', got {format}")
+        if policy not in ("drop_newest", "drop_oldest", "block"):
+            raise ValueError(f"Unknown backpressure policy {policy}")
+        self.directory = directory
+        self.format = format
+        self.compression = compression
+        self.batch_rows = batch_rows
+        self.flush_interval = flush_interval.total_seconds()
+        self.rotate_rows = rotate_rows
+        self.rotate_bytes = rotate_bytes
+        self.rotate_interval = rotate_interval.total_seconds()
+        self.max_queue = max_queue
+        self.policy = policy
+        self.schema = schema if isinstance(schema, pa.Schema) else log_schema(schema)
+        self.queue: Deque[Dict[str, Any]] = deque(maxlen=max_queue if policy == "drop_oldest" else None)
+        self.room = threading.Condition()
+        self.wakeup = threading.Event()
+        self.stopped = False
+        self.counts = threading.Lock()
+        self.dropped = 0
+        self.rejected = 0
+        self.written = 0
+        self.files: List[str] = []
+        self.writer: Any = None
+        self.sequence = 0
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="orchestra-prediction-log", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def for_model(cls, model: Any, directory: str, **kwargs) -> "PredictionLogSink":
+        """
+        A sink whose schema is taken from the DataTypes of `model`'s input features and Predictions
+        """
+        return cls(directory, log_fields(model), **kwargs)
+
+    def _drop(self, count: int = 1):
+        with self.counts:
+            self.dropped += count
+
+    def log(self, record: Dict[str, Any]) -> bool:
+        """
+        Queue one record; returns False if it was dropped
+        """
+        if self.stopped:
+            self._drop()
+            return False
+        if len(self.queue) >= self.max_queue:
+            if self.policy == "drop_newest":
+                self._drop()
+                return False
+            if self.policy == "drop_oldest":
+                self._drop()  # the deque's maxlen evicts the oldest record
+            else:
+                with self.room:
+                    while len(self.queue) >= self.max_queue and not self.stopped:
+                        self.wakeup.set()
+                        self.room.wait(self.flush_interval)
+        self.queue.append(record)
+        if len(self.queue) >= self.batch_rows:
+            self.wakeup.set()
+        return True
+
+    def log_batch(self, columns: Mapping[str, Sequence[Any]]) -> int:
+        """
+        Queue a columnar batch, {column: values}, one record per row; returns the number of records queued
+        """
+        names = [name for name in self.schema.names if name in columns]
+        rows = zip(*(columns[name] for name in names))
+        return sum(self.log(dict(zip(names, row))) for row in rows)
+
+    def _drain(self) -> List[Dict[str, Any]]:
+        records = []
+        popleft = self.queue.popleft
+        try:
+            while len(records) < self.batch_rows:
+                records.append(popleft())
+        except IndexError:
+            pass
+        if records and self.policy == "block":
+            with self.room:
+                self.room.notify_all()
+        return records
+
+    def _open(self, schema: pa.Schema):
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        extension = "parquet" if self.format == "parquet" else "arrow"
+        self.path = os.path.join(self.directory, f"predictions-{stamp}-{os.getpid()}-{self.sequence:06d}.{extension}")
+        self.sequence += 1
+        self.sink = pa.OSFile(f"{self.path}.inprogress", "wb")
+        if self.format == "parquet":
+            self.writer = pq.ParquetWriter(self.sink, schema, compression=self.compression)
+        else:
+            options = ipc.IpcWriteOptions(compression=self.compression)
+            self.writer = ipc.new_file(self.sink, schema, options=options)
+        self.opened_at = time.monotonic()
+        self.rows = 0
+
+    def _close(self):
+        if self.writer is None:
+            return
+        self.writer.close()
+        self.sink.close()
+        os.replace(f"{self.path}.inprogress", self.path)
+        self.files.append(self.path)
+        self.writer = None
+
+    def _table(self, records: List[Dict[str, Any]]) -> pa.Table:
+        arrays = []
+        for field in self.schema:
+            values = [record.get(field.name) for record in records]
+            if pa.types.is_integer(field.type):
+                # a safe cast, since converting straight to an int type would truncate 2.5 to 2
+                arrays.append(pa.array(values).cast(field.type))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def _write(self, records: List[Dict[str, Any]]):
+        try:
+            table = self._table(records)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError, ValueError):
+            # find the records that don't fit the schema and write the rest
+            tables = []
+            for record in records:
+                try:
+                    tables.append(self._table([record]))
+                except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError, ValueError):
+                    with self.counts:
+                        self.rejected += 1
+            if not tables:
+                return
+            table = pa.concat_tables(tables)
+        if self.writer is None:
+            self._open(self.schema)
+        self.writer.write_table(table)
+        self.rows += table.num_rows
+        self.written += table.num_rows
+        if self.rows >= self.rotate_rows or self.sink.tell() >= self.rotate_bytes:
+            self._close()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            stopping = self.stopped
+            while True:
+                records = self._drain()
+                if not records:
+                    break
+                try:
+                    self._write(records)
+                except Exception:
+                    # logging must never take serving down; count the batch as dropped
+                    self._drop(len(records))
+            if self.writer is not None and time.monotonic() - self.opened_at >= self.rotate_interval:
+                self._close()
+            if stopping:
+                self._close()
+                return
+
+    def close(self):
+        """
+        Write everything still queued, close the current file and stop the writer
+        """
+        self.stopped = True
+        self.wakeup.set()
+        with self.room:
+            self.room.notify_all()
+        self.thread.join()
+
+
+# TODO: ship closed files to the OutputDataDestination (e.g., object storage or a warehouse table) once that abstraction is defined.
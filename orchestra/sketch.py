@@ -0,0 +1,178 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from lazy import lazy_import
+
+pd = lazy_import("pandas")
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest, k2 scale function).
+
+    Values are buffered and compressed in vectorized batches: the sorted centroids are cut into clusters whose sizes follow the k2 scale, so the tails keep more, smaller clusters and extreme quantiles stay accurate.  Memory is O(`compression`) regardless of how many values were added.
+    """
+
+    def __init__(self, compression: float = 200.0, buffer_size: int = 10000):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer: list = []
+        self.buffered = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    @property
+    def count(self) -> float:
+        return float(self.weights.sum()) + self.buffered
+
+    def update(self, values: np.ndarray):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self.buffer.append(values)
+        self.buffered += len(values)
+        if self.buffered >= self.buffer_size:
+            self._compress()
+
+    def _compress(self, means: Optional[np.ndarray] = None, weights: Optional[np.ndarray] = None):
+        parts_means = [self.means] + self.buffer + ([means] if means is not None else [])
+        parts_weights = [self.weights] + [np.ones(len(b)) for b in self.buffer] + ([weights] if weights is not None else [])
+        self.buffer, self.buffered = [], 0
+        all_means = np.concatenate(parts_means)
+        if not len(all_means):
+            return
+        all_weights = np.concatenate(parts_weights)
+        order = np.argsort(all_means, kind="mergesort")
+        all_means, all_weights = all_means[order], all_weights[order]
+        total = all_weights.sum()
+        # k2 scale of each value's quantile; values sharing floor(k) form one cluster
+        quantiles = (np.cumsum(all_weights) - all_weights / 2) / total
+        normalizer = 4 * np.log(max(total / self.compression, 1.0)) + 24
+        k = self.compression / normalizer * np.log(quantiles / (1 - quantiles))
+        clusters = np.floor(k - k[0]).astype(np.int64)
+        starts = np.flatnonzero(np.r_[True, clusters[1:] != clusters[:-1]])
+        self.weights = np.add.reduceat(all_weights, starts)
+        self.means = np.add.reduceat(all_means * all_weights, starts) / self.weights
+
+    def merge(self, other: "TDigest"):
+        other._compress()
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(other.means, other.weights)
+
+    def _points(self):
+        self._compress()
+        cumulative = (np.cumsum(self.weights) - self.weights / 2) / self.weights.sum()
+        return np.r_[self.min, self.means, self.max], np.r_[0.0, cumulative, 1.0]
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return float("nan")
+        means, cumulative = self._points()
+        return float(np.interp(q, cumulative, means))
+
+    def cdf(self, x: np.ndarray) -> np.ndarray:
+        if self.count == 0:
+            return np.full(np.shape(x), np.nan)
+        means, cumulative = self._points()
+        return np.interp(x, means, cumulative, left=0.0, right=1.0)
+
+    def ks_distance(self, other: "TDigest") -> float:
+        """
+        Kolmogorov-Smirnov distance between the two distributions, evaluated at every centroid of both
+        """
+        points = np.union1d(self._points()[0], other._points()[0])
+        return float(np.abs(self.cdf(points) - other.cdf(points)).max())
+
+
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch with 2**`precision` one-byte registers (about 1.04 / sqrt(2**precision) relative error, 1.6% at the default of 12).  Values are hashed a whole column at a time with pandas' 64-bit hash.
+    """
+
+    def __init__(self, precision: int = 12):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: np.ndarray):
+        if not len(values):
+            return
+        hashes = pd.util.hash_array(np.asarray(values), categorize=False)
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        remainder = hashes & np.uint64((1 << bits) - 1)
+        # rank = leading zeros in the remaining bits + 1; frexp's exponent is floor(log2(x)) + 1, exact below 2**53
+        _, exponent = np.frexp(remainder.astype(np.float64))
+        rank = np.where(remainder == 0, bits + 1, bits - exponent + 1).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Only HyperLogLogs with the same precision can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return float(estimate)
+
+
+class CategoryCounts:
+    """
+    Mergeable frequency histogram of a categorical column, capped at `capacity` categories (Misra-Gries).
+
+    While a column has at most `capacity` distinct values the counts are exact; beyond that every count is underestimated by at most total / (`capacity` + 1), and the remainder is tracked as `other`.
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.counts: Dict[Any, int] = {}
+        self.total = 0
+
+    @property
+    def other(self) -> int:
+        return self.total - sum(self.counts.values())
+
+    def update(self, values: np.ndarray):
+        if not len(values):
+            return
+        unique, counts = np.unique(np.asarray(values), return_counts=True)
+        self._add(dict(zip(unique.tolist(), counts.tolist())), int(counts.sum()))
+
+    def _add(self, counts: Dict[Any, int], total: int):
+        for value, count in counts.items():
+            self.counts[value] = self.counts.get(value, 0) + count
+        self.total += total
+        if len(self.counts) > self.capacity:
+            cut = sorted(self.counts.values(), reverse=True)[self.capacity]
+            self.counts = {v: c - cut for v, c in self.counts.items() if c > cut}
+
+    def merge(self, other: "CategoryCounts"):
+        self._add(other.counts, other.total)
+
+    def frequencies(self) -> Dict[Any, float]:
+        return {value: count / self.total for value, count in self.counts.items()} if self.total else {}
+
+    def psi(self, reference: "CategoryCounts", epsilon: float = 1e-4) -> float:
+        """
+        Population stability index of this distribution against `reference`, with untracked values pooled as one "other" category
+        """
+        categories = set(self.counts) | set(reference.counts)
+        current = np.array([self.counts.get(c, 0) for c in categories] + [self.other], dtype=np.float64)
+        expected = np.array([reference.counts.get(c, 0) for c in categories] + [reference.other], dtype=np.float64)
+        current = np.maximum(current / max(current.sum(), 1), epsilon)
+        expected = np.maximum(expected / max(expected.sum(), 1), epsilon)
+        return float(np.sum((current - expected) * np.log(current / expected)))
+
+
+# TODO: serialize sketches to a compact, versioned byte format instead of relying on pickle when they travel between replicas.
@@ -0,0 +1,232 @@
+import re
+from datetime import timedelta
+from typing import Dict, List, NamedTuple, Optional
+
+from common import object_name
+from code import DataCode, SQLDataCode
+from dataprovider import InputDataSchema
+from feature import Feature, Aggregation
+from plan import collect_features
+from window import aggregate_function, parse_window
+
+
+DIALECTS = {
+    # (identifier quote, expression turning a timestamp into epoch seconds for RANGE windows)
+    "bigquery": ("`", "UNIX_SECONDS({})"),
+    "snowflake": ('"', "DATE_PART(EPOCH_SECOND, {})"),
+    "ansi": ('"', "EXTRACT(EPOCH FROM {})"),
+}
+
+PLACEHOLDER = re.compile(r"\{\{\s*([A-Za-z0-9_.]+)\s*\}\}")
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def sql_template(code: DataCode) -> Optional[str]:
+    """
+    The SQL fragment of a `SQLDataCode`, from `sql` or by calling the decorated function
+    """
+    if not isinstance(code, SQLDataCode):
+        return None
+    template = getattr(code, "sql", None)
+    if template is None and callable(getattr(code, "function", None)):
+        template = code.function()
+    return template
+
+
+class SQLQuery(NamedTuple):
+    """
+    A single pushed-down query and the Features it computes
+    """
+
+    sql: str
+    features: List[str]
+    unsupported: List[str]
+    """
+    Features that can't be expressed in SQL (e.g., PythonDataCode) and need to run elsewhere
+    """
+
+
+class _Layers:
+    """
+    The CTE layers of one query.  SQL can't nest window functions, so a window over an expression that already contains one (e.g., the MAX of an upstream AVG window) reads that expression as a column materialized in the layer below.
+
+    Every expression has a depth: the number of layers that must exist before it can be selected (0 is the table itself).
+    """
+
+    def __init__(self):
+        self.layers: List[List[str]] = []
+        self.depths: Dict[str, int] = {}
+        self.windowed: set = set()
+        self.aliases: Dict[str, str] = {}
+
+    def depth(self, sql: str) -> int:
+        return self.depths.get(sql, 0)
+
+    def combine(self, sql: str, inputs: List[str], window: bool = False) -> str:
+        """
+        Record `sql`, built from `inputs`, at the depth of its deepest input
+        """
+        self.depths[sql] = max([self.depth(i) for i in inputs], default=0)
+        if window or any(i in self.windowed for i in inputs):
+            self.windowed.add(sql)
+        return sql
+
+    def column(self, sql: str) -> str:
+        """
+        `sql` itself, or - if it contains a window function - a column holding it in the next layer
+        """
+        if sql not in self.windowed:
+            return sql
+        if sql not in self.aliases:
+            depth = self.depth(sql)
+            while len(self.layers) <= depth:
+                self.layers.append([])
+            alias = f"_window_{len(self.aliases) + 1}"
+            self.layers[depth].append(f"{sql} AS {alias}")
+            self.aliases[sql] = alias
+            self.depths[alias] = depth + 1
+        return self.aliases[sql]
+
+    def query(self, selected: List[str], table: str) -> str:
+        ctes = []
+        source = table
+        for index, items in enumerate(self.layers, start=1):
+            ctes.append(f"layer_{index} AS (\n  SELECT\n    " + ",\n    ".join(["*"] + items) + f"\n  FROM {source}\n)")
+            source = f"layer_{index}"
+        prefix = "WITH " + ",\n".join(ctes) + "\n" if ctes else ""
+        return prefix + "SELECT\n  " + ",\n  ".join(selected) + f"\nFROM {source}"
+
+
+class SQLCompiler:
+    """
+    Compiles every SQL-expressible Feature over one `InputDataSchema` into a single query, so one warehouse scan produces all of them.
+
+    A Feature is SQL-expressible if its `business_logics` contain only `SQLDataCode` and built-in `Aggregation`s and its inputs are raw columns of the schema or other SQL-expressible Features:
+    [1] `{{input_feature}}` placeholders are replaced by the column, or by the inlined expression of an upstream Feature.  Placeholders match either the feature's name (with or without the "data_source." prefix) or its position, `{{input_feature_1}}` being the first input.
+    [2] Aggregations become window functions over the schema's timestamp - `ROWS BETWEEN n-1 PRECEDING` for LASTN and `RANGE BETWEEN <seconds> PRECEDING` over epoch seconds for TIME windows - partitioned by `aggregate_by`.
+    [3] A window over an upstream window (e.g., the MAX of a rolling AVG) reads the upstream window from a `WITH layer_n AS (SELECT *, ...)` layer, since window functions can't be nested.
+
+    Upstream Features referenced through `input_features` are compiled too, as with `ExecutionPlan`, but only the `features` passed in are selected.
+    """
+
+    def __init__(self, dialect: str = "ansi"):
+        if dialect not in DIALECTS:
+            raise ValueError(f"Unknown SQL dialect {dialect}, expected one of {sorted(DIALECTS)}")
+        self.quote, self.epoch = DIALECTS[dialect]
+
+    def identifier(self, name: str) -> str:
+        return name if IDENTIFIER.match(name) else f"{self.quote}{name}{self.quote}"
+
+    def compile_schema(self, schema: InputDataSchema, table: str, features: List[Feature]) -> SQLQuery:
+        """
+        `compile` with the keys and timestamp taken from the schema
+        """
+        keys = [object_name(key) for key in getattr(schema, "keys", None) or []]
+        return self.compile(features, table, keys, object_name(schema.timestamp), object_name(schema))
+
+    def compile(
+        self,
+        features: List[Feature],
+        table: str,
+        keys: List[str],
+        timestamp: str,
+        source: Optional[str] = None,
+    ) -> SQLQuery:
+        """
+        One `SELECT keys, timestamp, <feature expressions> FROM table` for all SQL-expressible `features`.  `source` is the data source name used in "data_source.feature_name" references.
+        """
+        by_name = collect_features(features)
+        expressions: Dict[str, Optional[str]] = {}
+        layers = _Layers()
+
+        def column(reference: str) -> Optional[str]:
+            name = object_name(reference)
+            short = name.split(".")[-1]
+            if name in by_name or (short in by_name and name.split(".")[0] in ("{{namespace}}", "")):
+                feature = by_name[name if name in by_name else short]
+                if getattr(feature, "business_logics", None) or getattr(feature, "input_features", None):
+                    return expression(feature)
+            if "." in name and source is not None and name.split(".")[0] != source:
+                return None
+            return self.identifier(short)
+
+        def expression(feature: Feature) -> Optional[str]:
+            name = object_name(feature)
+            if name in expressions:
+                if expressions[name] == "":
+                    raise ValueError(f"Circular feature dependency through {name}")
+                return expressions[name]
+            expressions[name] = ""
+            inputs = [column(r) for r in getattr(feature, "input_features", None) or []]
+            if None in inputs:
+                result = None
+            else:
+                result = self._logic(feature, inputs, column, self.identifier(timestamp), layers)
+            expressions[name] = result
+            return result
+
+        selected, unsupported = [], []
+        for feature in features:
+            name = object_name(feature)
+            sql = expression(feature)
+            if sql is None:
+                unsupported.append(name)
+            else:
+                selected.append(f"{sql} AS {self.identifier(name)}")
+
+        columns = [self.identifier(k) for k in keys] + [self.identifier(timestamp)]
+        query = layers.query(columns + selected, table)
+        return SQLQuery(query, [object_name(f) for f in features if object_name(f) not in unsupported], unsupported)
+
+    def _logic(self, feature: Feature, inputs: List[str], column, timestamp: str, layers: _Layers) -> Optional[str]:
+        references = [object_name(r) for r in getattr(feature, "input_features", None) or []]
+        for code in getattr(feature, "business_logics", None) or []:
+            if isinstance(code, Aggregation):
+                if len(inputs) != 1:
+                    return None
+                window = self._window(code, inputs[0], column, timestamp, layers)
+                if window is None:
+                    return None
+                inputs, references = [window], [object_name(feature)]
+                continue
+            template = sql_template(code)
+            if template is None:
+                return None
+            values = {}
+            for position, (reference, value) in enumerate(zip(references, inputs), start=1):
+                values[reference] = values[reference.split(".")[-1]] = value
+                values[f"input_feature_{position}"] = value
+            try:
+                rendered = PLACEHOLDER.sub(lambda match: values[match.group(1)], template.strip())
+            except KeyError as error:
+                raise ValueError(f"Unknown placeholder {error} in SQL of {object_name(feature)}") from None
+            inputs, references = [layers.combine(f"({rendered})", list(values.values()))], [object_name(feature)]
+        return inputs[0] if len(inputs) == 1 else None
+
+    def _window(self, aggregation: Aggregation, value: str, column, timestamp: str, layers: _Layers) -> Optional[str]:
+        try:
+            function = aggregate_function(aggregation)
+        except ValueError:
+            return None
+        group_by = getattr(aggregation, "aggregate_by", None) or getattr(aggregation, "group_by", None) or []
+        partition = [column(object_name(k)) for k in group_by]
+        if None in partition:
+            return None
+        partition = [layers.column(p) for p in partition]
+        window = parse_window(aggregation)
+        over = f"PARTITION BY {', '.join(partition)} " if partition else ""
+        if isinstance(window, int):
+            order = getattr(aggregation, "order_by", None)
+            order_columns = [column(object_name(f)) for f in order[0]] if isinstance(order, tuple) else [timestamp]
+            if None in order_columns:
+                return None
+            order_columns = [layers.column(c) for c in order_columns]
+            order_sql = ", ".join(f"{c} {order[1]}" for c in order_columns) if isinstance(order, tuple) else timestamp
+            frame = f"ROWS BETWEEN {window - 1} PRECEDING AND CURRENT ROW"
+        else:
+            order_columns = [timestamp]
+            order_sql = self.epoch.format(timestamp)
+            frame = f"RANGE BETWEEN {int(window / timedelta(seconds=1))} PRECEDING AND CURRENT ROW"
+        value = layers.column(value)
+        sql = f"{function}({value}) OVER ({over}ORDER BY {order_sql} {frame})"
+        return layers.combine(sql, [value] + partition + order_columns, window=True)
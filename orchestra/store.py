@@ -0,0 +1,221 @@
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from typing import Any, Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+from common import object_name
+from feature import Feature
+
+
+class OnlineStore:
+    """
+    Embedded online feature store: the latest value of each Feature per `Key`, recomputed according to `Feature.freshness`.
+
+    Two tiers:
+    [1] memory - a bounded LRU hash map of (feature, key) -> (value, time_of_last_computation)
+    [2] disk - an optional SQLite file with the same rows, so a restarted serving container starts warm.  Change reports are written to it as well, so a restarted store still knows which values went stale before the restart.
+
+    A value is recomputed if [now() - time_of_last_computation] >= `freshness` and any of its `input_features` may have changed since it was computed.  Inputs that report their changes through `changed()` are known to be unchanged otherwise; inputs that never report are assumed to have changed.
+
+    Recomputation happens lazily on `get()`, or eagerly in `changed(..., eager=True)`.  `compute` runs outside the store's lock, so a slow recompute only holds up readers of the same (feature, key), which wait for its result instead of computing it again.
+
+    Change reports are kept for the last `max_changes` (input, key) pairs; a key whose report was evicted is treated as changed at the newest evicted report, which can cost a recompute but never serves a stale value.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_rows: int = 100000,
+        max_changes: int = 1000000,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.memory_rows = memory_rows
+        self.max_changes = max_changes
+        self.clock = clock
+        self.memory: "OrderedDict[Tuple[str, Hashable], Tuple[Any, float]]" = OrderedDict()
+        self.computes: Dict[str, Callable[[Hashable], Any]] = {}
+        self.freshness: Dict[str, Optional[float]] = {}
+        self.dependents: Dict[str, Set[str]] = {}
+        self.inputs: Dict[str, List[str]] = {}
+        self.tracked: Set[str] = set()
+        self.last_changed: "OrderedDict[Tuple[str, Hashable], float]" = OrderedDict()
+        self.forgotten = 0.0
+        self.lock = threading.Lock()
+        self.computing: Dict[Tuple[str, Hashable], List[Any]] = {}  # (feature, key) -> [lock, waiters]
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS features ("
+                "feature TEXT, key BLOB, value BLOB, computed_at REAL, PRIMARY KEY (feature, key))"
+            )
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS changes (input TEXT, key BLOB, changed_at REAL, PRIMARY KEY (input, key))"
+            )
+            self.db.execute("CREATE TABLE IF NOT EXISTS forgotten (changed_at REAL)")
+            self._load_changes()
+
+    def _load_changes(self):
+        for (changed_at,) in self.db.execute("SELECT changed_at FROM forgotten"):
+            self.forgotten = max(self.forgotten, changed_at)
+        rows = self.db.execute("SELECT input, key, changed_at FROM changes ORDER BY changed_at").fetchall()
+        for input_feature, key, changed_at in rows:
+            self.tracked.add(input_feature)
+            self.last_changed[(input_feature, pickle.loads(key))] = changed_at
+        self._forget()
+
+    def register(self, feature: Feature, compute: Callable[[Hashable], Any]):
+        """
+        Serve `feature` from the store, computing missing or stale values for a key with `compute(key)`
+        """
+        name = object_name(feature)
+        freshness = getattr(feature, "freshness", None)
+        self.computes[name] = compute
+        self.freshness[name] = freshness.total_seconds() if isinstance(freshness, timedelta) else None
+        self.inputs[name] = [object_name(f) for f in getattr(feature, "input_features", None) or []]
+        for input_name in self.inputs[name]:
+            self.dependents.setdefault(input_name, set()).add(name)
+
+    def get(self, feature: str, key: Hashable) -> Any:
+        """
+        Value of `feature` for `key`, recomputing it first if it is missing or stale
+        """
+        with self.lock:
+            row = self._read(feature, key)
+            if row is not None and not self._stale(feature, key, row[1]):
+                return row[0]
+        return self._compute(feature, key)
+
+    def get_features(self, key: Hashable, features: List[str]) -> Dict[str, Any]:
+        """
+        {feature name: value} for one key, e.g. to answer `get_features` in a serving container
+        """
+        return {feature: self.get(feature, key) for feature in features}
+
+    def put(self, feature: str, key: Hashable, value: Any, computed_at: Optional[float] = None):
+        """
+        Store a value computed elsewhere (e.g., a batch backfill or the streaming pipeline)
+        """
+        with self.lock:
+            self._write(feature, key, value, self.clock() if computed_at is None else computed_at)
+
+    def changed(self, input_feature: str, key: Hashable, eager: bool = False):
+        """
+        Report that an upstream `input_feature` changed for `key`.  With `eager`, stale dependents are recomputed now instead of on their next read.
+        """
+        with self.lock:
+            self.tracked.add(input_feature)
+            changed_at = self.clock()
+            self.last_changed[(input_feature, key)] = changed_at
+            self.last_changed.move_to_end((input_feature, key))
+            if self.db is not None:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO changes VALUES (?, ?, ?)", (input_feature, pickle.dumps(key), changed_at)
+                )
+            self._forget()
+            if not eager:
+                return
+            stale = []
+            for feature in self.dependents.get(input_feature, ()):
+                row = self._read(feature, key)
+                if row is not None and self._stale(feature, key, row[1]):
+                    stale.append(feature)
+        for feature in stale:
+            self._compute(feature, key)
+
+    def _forget(self):
+        forgotten = []
+        while len(self.last_changed) > self.max_changes:
+            forgotten.append(self.last_changed.popitem(last=False))
+        if not forgotten:
+            return
+        self.forgotten = max([self.forgotten] + [changed_at for _, changed_at in forgotten])
+        if self.db is not None:
+            self.db.executemany(
+                "DELETE FROM changes WHERE input = ? AND key = ?",
+                [(input_feature, pickle.dumps(key)) for (input_feature, key), _ in forgotten],
+            )
+            self.db.execute("DELETE FROM forgotten")
+            self.db.execute("INSERT INTO forgotten VALUES (?)", (self.forgotten,))
+
+    def _stale(self, feature: str, key: Hashable, computed_at: float) -> bool:
+        freshness = self.freshness.get(feature)
+        if freshness is None or self.clock() - computed_at < freshness:
+            return False
+        inputs = self.inputs.get(feature)
+        if not inputs:
+            return True
+        return any(
+            input_feature not in self.tracked
+            or self.last_changed.get((input_feature, key), self.forgotten) >= computed_at
+            for input_feature in inputs
+        )
+
+    def _compute(self, feature: str, key: Hashable) -> Any:
+        if feature not in self.computes:
+            raise KeyError(f"Feature {feature} is not registered with the online store")
+        with self.lock:
+            entry = self.computing.setdefault((feature, key), [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                with self.lock:
+                    # another reader may have recomputed it while this one waited
+                    row = self._read(feature, key)
+                    if row is not None and not self._stale(feature, key, row[1]):
+                        return row[0]
+                # inputs reported as changed while computing make the value stale again
+                started = self.clock()
+                value = self.computes[feature](key)
+                with self.lock:
+                    self._write(feature, key, value, started)
+                return value
+        finally:
+            with self.lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.computing[(feature, key)]
+
+    def _read(self, feature: str, key: Hashable) -> Optional[Tuple[Any, float]]:
+        row = self.memory.get((feature, key))
+        if row is not None:
+            self.memory.move_to_end((feature, key))
+            return row
+        if self.db is None:
+            return None
+        found = self.db.execute(
+            "SELECT value, computed_at FROM features WHERE feature = ? AND key = ?",
+            (feature, pickle.dumps(key)),
+        ).fetchone()
+        if found is None:
+            return None
+        row = (pickle.loads(found[0]), found[1])
+        self._remember(feature, key, row)
+        return row
+
+    def _write(self, feature: str, key: Hashable, value: Any, computed_at: float):
+        self._remember(feature, key, (value, computed_at))
+        if self.db is not None:
+            self.db.execute(
+                "INSERT OR REPLACE INTO features VALUES (?, ?, ?, ?)",
+                (feature, pickle.dumps(key), pickle.dumps(value), computed_at),
+            )
+
+    def _remember(self, feature: str, key: Hashable, row: Tuple[Any, float]):
+        self.memory[(feature, key)] = row
+        self.memory.move_to_end((feature, key))
+        while len(self.memory) > self.memory_rows:
+            self.memory.popitem(last=False)
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+# TODO: rebuild the change reports from the DataProviders' timestamps for a store whose SQLite file was lost.
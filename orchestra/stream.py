@@ -0,0 +1,256 @@
+import io
+import struct
+import threading
+import time
+from collections import deque
+from datetime import timedelta
+from typing import Any, Callable, Deque, Dict, List, Tuple
+
+import numpy as np
+
+from common import datatype_name, object_name
+from dataprovider import InputDataSchema
+from lazy import lazy_import
+
+fastavro = lazy_import("fastavro")
+
+
+WIRE_TYPES = {
+    # DataType name: (fixed-width NumPy type, Avro type); strings are fixed-width UTF-8 bytes in the struct format
+    "Int64": ("<i8", "long"),
+    "Int32": ("<i4", "int"),
+    "Float": ("<f4", "float"),
+    "Double": ("<f8", "double"),
+    "Float64": ("<f8", "double"),
+    "Boolean": ("?", "boolean"),
+    "Timestamp": ("<i8", "long"),
+    "String": (None, "string"),
+}
+
+LENGTH = struct.Struct("<I")
+
+
+def schema_fields(schema: InputDataSchema) -> List[Tuple[str, str]]:
+    """
+    (name, DataType name) of every field of a message, in wire order: `output_features` in their declared order, then `keys`, then `timestamp` - the order in which Orchestra appends them to the schema
+    """
+    fields = []
+    columns = list(getattr(schema, "output_features", None) or []) + list(getattr(schema, "keys", None) or [])
+    timestamp = getattr(schema, "timestamp", None)
+    if timestamp is not None:
+        columns.append(timestamp)
+    for column in columns:
+        datatype = getattr(column, "human_datatype", None) or getattr(column, "type", None)
+        if datatype is None:
+            raise ValueError(f"{object_name(column)} has no DataType, so it can't be decoded")
+        fields.append((object_name(column), datatype_name(datatype)))
+    return fields
+
+
+class StructDecoder:
+    """
+    Decoder for fixed-layout binary messages: every field packed little-endian in wire order, strings as UTF-8 in fixed-width, NUL-padded fields of `string_width` bytes.
+
+    A batch of messages is decoded with a single `np.frombuffer` over a NumPy structured dtype compiled from the schema, and each column is a strided view into that buffer - nothing is decoded per message or per field.  String columns stay as fixed-width bytes (`S<width>`); call `text(column)` only where text is needed.  `encode` raises ValueError for a string longer than its field instead of truncating it.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]], string_width: int = 32):
+        dtype = []
+        for name, datatype in fields:
+            if datatype not in WIRE_TYPES:
+                raise ValueError(f"Can't decode {name} of type {datatype}")
+            wire = WIRE_TYPES[datatype][0]
+            dtype.append((name, wire if wire is not None else f"S{string_width}"))
+        self.dtype = np.dtype(dtype)
+        self.names = [name for name, _ in fields]
+        self.string_width = string_width
+        self.strings = {name for name, datatype in fields if WIRE_TYPES[datatype][0] is None}
+
+    @classmethod
+    def for_schema(cls, schema: InputDataSchema, string_width: int = 32) -> "StructDecoder":
+        return cls(schema_fields(schema), string_width)
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        values = []
+        for name in self.names:
+            value = record[name]
+            if name in self.strings:
+                value = value.encode("utf-8") if isinstance(value, str) else value
+                if len(value) > self.string_width:
+                    raise ValueError(f"{name} is {len(value)} bytes long, the field holds {self.string_width}")
+            values.append(value)
+        return np.array([tuple(values)], dtype=self.dtype).tobytes()
+
+    def decode(self, messages: List[bytes]) -> Dict[str, np.ndarray]:
+        return self.decode_buffer(b"".join(messages))
+
+    @staticmethod
+    def text(column: np.ndarray) -> np.ndarray:
+        """
+        A decoded string column as text
+        """
+        return np.char.decode(column, "utf-8")
+
+    def decode_buffer(self, buffer: Any) -> Dict[str, np.ndarray]:
+        """
+        Decode back-to-back messages from any buffer (bytes, mmap, memoryview) without copying it
+        """
+        records = np.frombuffer(buffer, dtype=self.dtype)
+        return {name: records[name] for name in self.names}
+
+
+class AvroDecoder:
+    """
+    Decoder for schemaless Avro messages, e.g. from a Kafka topic with a registered Avro schema.  The Avro schema is compiled from the `InputDataSchema` once; each batch is decoded into one preallocated column per field.
+    """
+
+    def __init__(self, fields: List[Tuple[str, str]], name: str = "record"):
+        for field, datatype in fields:
+            if datatype not in WIRE_TYPES:
+                raise ValueError(f"Can't decode {field} of type {datatype}")
+        self.fields = fields
+        self.names = [field for field, _ in fields]
+        self.schema = fastavro.parse_schema(
+            {
+                "type": "record",
+                "name": name.replace("-", "_"),
+                "fields": [{"name": field, "type": WIRE_TYPES[datatype][1]} for field, datatype in fields],
+            }
+        )
+        self.dtypes = [np.dtype(WIRE_TYPES[datatype][0] or object) for _, datatype in fields]
+
+    @classmethod
+    def for_schema(cls, schema: InputDataSchema) -> "AvroDecoder":
+        return cls(schema_fields(schema), object_name(schema))
+
+    def encode(self, record: Dict[str, Any]) -> bytes:
+        buffer = io.BytesIO()
+        fastavro.schemaless_writer(buffer, self.schema, record)
+        return buffer.getvalue()
+
+    def decode(self, messages: List[bytes]) -> Dict[str, np.ndarray]:
+        columns = [np.empty(len(messages), dtype=dtype) for dtype in self.dtypes]
+        reader, schema = fastavro.schemaless_reader, self.schema
+        for row, message in enumerate(messages):
+            record = reader(io.BytesIO(message), schema)
+            for column, name in zip(columns, self.names):
+                column[row] = record[name]
+        return dict(zip(self.names, columns))
+
+
+class LocalTopic:
+    """
+    In-process stand-in for a Kafka topic: producers `produce`, a consumer `poll`s batches in order.  Thread-safe.
+    """
+
+    def __init__(self):
+        self.messages: Deque[bytes] = deque()
+        self.condition = threading.Condition()
+
+    def produce(self, message: bytes):
+        with self.condition:
+            self.messages.append(message)
+            self.condition.notify()
+
+    def poll(self, max_messages: int, timeout: float) -> List[bytes]:
+        """
+        Up to `max_messages`, waiting at most `timeout` seconds for the first one
+        """
+        with self.condition:
+            if not self.messages:
+                self.condition.wait(timeout)
+            count = min(max_messages, len(self.messages))
+            return [self.messages.popleft() for _ in range(count)]
+
+
+class ReplayLog:
+    """
+    A file-replayed log of length-prefixed messages (a little-endian uint32 length, then the payload), consumed like a topic.  `poll` never waits; an empty batch means the end of the log.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset = 0
+
+    @staticmethod
+    def write(path: str, messages: List[bytes]):
+        with open(path, "ab") as f:
+            for message in messages:
+                f.write(LENGTH.pack(len(message)))
+                f.write(message)
+
+    def poll(self, max_messages: int, timeout: float = 0.0) -> List[bytes]:
+        messages = []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            while len(messages) < max_messages:
+                header = f.read(LENGTH.size)
+                if len(header) < LENGTH.size:
+                    break
+                (length,) = LENGTH.unpack(header)
+                message = f.read(length)
+                if len(message) < length:
+                    break  # a message still being written
+                messages.append(message)
+                self.offset += LENGTH.size + length
+        return messages
+
+    def rewind(self):
+        self.offset = 0
+
+
+class StreamIngestor:
+    """
+    Streaming ingestion for a `DataProvider.types.Kafka` provider: polls a source, decodes each batch into columns and hands them to `sink` (e.g., `WindowAggregator` updates and `OnlineStore.put`, or an `ExecutionPlan.run` over the batch).
+
+    `source` is anything with `poll(max_messages, timeout) -> List[bytes]`: a Kafka consumer adapter, a `LocalTopic` or a `ReplayLog`.  A batch is handed over when `batch_size` messages have arrived or `max_delay` has passed since its first message, so the added latency is bounded by `max_delay` - keep it well under the provider's `freshness`.
+    """
+
+    def __init__(
+        self,
+        source: Any,
+        decoder: Any,
+        sink: Callable[[Dict[str, np.ndarray]], Any],
+        batch_size: int = 10000,
+        max_delay: timedelta = timedelta(milliseconds=10),
+    ):
+        self.source = source
+        self.decoder = decoder
+        self.sink = sink
+        self.batch_size = batch_size
+        self.max_delay = max_delay.total_seconds()
+        self.ingested = 0
+        self.stopped = threading.Event()
+
+    def step(self) -> int:
+        """
+        Collect, decode and sink one batch; returns its size
+        """
+        messages = self.source.poll(self.batch_size, self.max_delay)
+        if messages:
+            deadline = time.monotonic() + self.max_delay
+            while len(messages) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                more = self.source.poll(self.batch_size - len(messages), remaining)
+                if not more:
+                    break
+                messages.extend(more)
+            self.sink(self.decoder.decode(messages))
+            self.ingested += len(messages)
+        return len(messages)
+
+    def run(self, until_empty: bool = False):
+        """
+        Ingest until `stop()` is called, or - with `until_empty`, e.g. when replaying a log - until the source has nothing left
+        """
+        while not self.stopped.is_set():
+            if self.step() == 0 and until_empty:
+                return
+
+    def stop(self):
+        self.stopped.set()
+
+
+# TODO: a Kafka consumer adapter (partition assignment, offset commits after the sink succeeds) once DataProviderType defines the Kafka config.
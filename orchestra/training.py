@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import hashlib
+import queue
+import threading
+from typing import Iterable, Iterator, List, NamedTuple
+
+import numpy as np
+
+from lazy import lazy_import
+from vector import VectorColumn
+
+pd = lazy_import("pandas")
+pa = lazy_import("pyarrow")
+ds = lazy_import("pyarrow.dataset")
+
+
+class _DatasetScan:
+    """
+    Re-iterable scan of a dataset, so TrainingBatches built on it can be iterated once per epoch
+    """
+
+    def __init__(self, dataset: ds.Dataset, columns: List[str]):
+        self.dataset = dataset
+        self.columns = columns
+
+    def __iter__(self) -> Iterator[pa.RecordBatch]:
+        return iter(self.dataset.to_batches(columns=self.columns))
+
+
+class TrainingBatch(NamedTuple):
+    """
+    One fixed-size slice of training data, split the same way `get_training_data` splits the full set
+    """
+
+    X_train: np.ndarray
+    X_test: np.ndarray
+    y_train: np.ndarray
+    y_test: np.ndarray
+
+
+class TrainingBatches:
+    """
+    Streaming variant of `get_training_data`: yields fixed-size `TrainingBatch`es instead of materializing the full X/y.
+
+    Memory stays bounded by `batch_size` x (`prefetch` + 1) rows regardless of the size of the training examples, e.g. the full `all_training_examples` DBT table.
+
+    Train/test assignment is a deterministic hash of the `Key` columns, so a row lands on the same side of the split on every run, on every node and for every batch size.  `seed` picks a different (but equally stable) split.
+
+    Batches are prepared on a background thread, `prefetch` batches ahead of the training loop.
+    """
+
+    def __init__(
+        self,
+        batches: Iterable[pa.RecordBatch],
+        features: List[str],
+        label: str,
+        keys: List[str],
+        test_fraction: float = 0.2,
+        batch_size: int = 65536,
+        prefetch: int = 2,
+        seed: str = "orchestra",
+    ):
+        self.batches = batches
+        self.features = features
+        self.label = label
+        self.keys = keys
+        self.test_fraction = test_fraction
+        self.batch_size = batch_size
+        self.prefetch = prefetch
+        self.seed = seed
+
+    @classmethod
+    def from_dataset(cls, path: str, features: List[str], label: str, keys: List[str], format: str = "parquet", **kwargs) -> "TrainingBatches":
+        """
+        Stream a Parquet/IPC/CSV dataset (a file or a directory of partitions), reading only the needed columns
+        """
+        scan = _DatasetScan(ds.dataset(path, format=format), list(dict.fromkeys(features + [label] + keys)))
+        return cls(scan, features, label, keys, **kwargs)
+
+    def __iter__(self) -> Iterator[TrainingBatch]:
+        prepared: "queue.Queue" = queue.Queue(maxsize=max(self.prefetch, 1))
+        done = object()
+        stop = threading.Event()
+
+        def produce():
+            try:
+                for table in self._rebatch():
+                    if stop.is_set():
+                        return
+                    prepared.put(self._split(table))
+                prepared.put(done)
+            except BaseException as error:
+                prepared.put(error)
+
+        worker = threading.Thread(target=produce, name="orchestra-training-prefetch", daemon=True)
+        worker.start()
+        try:
+            while True:
+                item = prepared.get()
+                if item is done:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            # unblock the producer if it is waiting on a full queue
+            while worker.is_alive():
+                try:
+                    prepared.get_nowait()
+                except queue.Empty:
+                    worker.join(timeout=0.01)
+
+    def _rebatch(self) -> Iterator[pa.Table]:
+        buffered: List[pa.RecordBatch] = []
+        rows = 0
+        for batch in self.batches:
+            if isinstance(batch, dict):
+                batch = pa.RecordBatch.from_pydict(batch)
+            buffered.append(batch)
+            rows += batch.num_rows
+            if rows < self.batch_size:
+                continue
+            table = pa.Table.from_batches(buffered)
+            start = 0
+            while rows - start >= self.batch_size:
+                yield table.slice(start, self.batch_size)
+                start += self.batch_size
+            buffered = table.slice(start).to_batches()
+            rows -= start
+        if rows:
+            yield pa.Table.from_batches(buffered)
+
+    def is_test(self, table: pa.Table) -> np.ndarray:
+        """
+        Boolean mask of the rows assigned to the test split
+        """
+        keys = pd.DataFrame({key: table.column(key).to_numpy(zero_copy_only=False) for key in self.keys})
+        hashes = pd.util.hash_pandas_object(keys, index=False, hash_key=self._hash_key()).to_numpy()
+        # pandas only applies hash_key to strings, so the seed is mixed into the hashes of every key type here
+        seed = int.from_bytes(hashlib.sha256((self.seed or "").encode()).digest()[:8], "little")
+        hashes = pd.util.hash_array(hashes ^ np.uint64(seed))
+        threshold = min(int(self.test_fraction * 2**64), 2**64 - 1)
+        return hashes < np.uint64(threshold)
+
+    def _hash_key(self) -> str:
+        # pandas needs exactly 16 bytes
+        return (self.seed * 16)[:16] if self.seed else "0" * 16
+
+    def _matrix(self, table: pa.Table) -> np.ndarray:
+        columns = []
+        for feature in self.features:
+            column = table.column(feature)
+            if pa.types.is_fixed_size_list(column.type):
+                columns.append(VectorColumn.from_arrow(column).values)
+            else:
+                columns.append(column.to_numpy(zero_copy_only=False).reshape(-1, 1))
+        return np.hstack(columns) if columns else np.empty((table.num_rows, 0))
+
+    def _split(self, table: pa.Table) -> TrainingBatch:
+        test = self.is_test(table)
+        X = self._matrix(table)
+        y = table.column(self.label).to_numpy(zero_copy_only=False)
+        return TrainingBatch(X[~test], X[test], y[~test], y[test])
@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+from typing import List, Sequence, Union
+
+import numpy as np
+
+from datatype import DataType, FloatVector
+from lazy import lazy_import
+
+pa = lazy_import("pyarrow")
+ipc = lazy_import("pyarrow.ipc")
+
+
+COLUMN = "vector"
+
+
+def vector_dtype(datatype: Union[DataType, type]) -> np.dtype:
+    """
+    NumPy dtype of the packed storage of a `FloatVector` (float32) or `DoubleVector` (float64)
+    """
+    storage = getattr(datatype, "storage", None)
+    if storage is None:
+        raise ValueError(f"{datatype!r} is not a vector DataType")
+    return np.dtype(storage)
+
+
+class VectorColumn:
+    """
+    Packed storage for a column of `FloatVector` / `DoubleVector` values.
+
+    Values live in one C-contiguous (rows, length) float32/float64 array - never as per-row Python lists - so model code can take `.values` (or a row slice of it) as-is.
+
+    In memory the same buffer is exposed as an Arrow `FixedSizeList<float>` array without copying.  On disk it is an Arrow IPC file that `load` memory-maps, so reading a column back is also zero-copy.
+    """
+
+    values: np.ndarray
+    """
+    The (rows, length) array
+    """
+
+    def __init__(self, values: np.ndarray):
+        if values.ndim != 2:
+            raise ValueError(f"Expected a (rows, length) array, got shape {values.shape}")
+        if values.dtype not in (np.float32, np.float64):
+            raise ValueError(f"Vectors are stored as float32 or float64, got {values.dtype}")
+        self.values = np.ascontiguousarray(values)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[Sequence[float]], datatype: Union[DataType, type] = FloatVector) -> "VectorColumn":
+        """
+        Pack Python rows (e.g., a model's output) once, at the boundary
+        """
+        values = np.asarray(rows, dtype=vector_dtype(datatype))
+        length = getattr(datatype, "length", None)
+        if len(values) == 0:
+            values = values.reshape(0, length if isinstance(length, int) else 0)
+        if isinstance(length, int) and values.shape[1:] != (length,):
+            raise ValueError(f"Expected vectors of length {length}, got shape {values.shape}")
+        return cls(values)
+
+    @classmethod
+    def from_arrow(cls, array: Union[pa.FixedSizeListArray, pa.ChunkedArray]) -> "VectorColumn":
+        """
+        Wrap an Arrow FixedSizeList array; zero-copy unless it has several chunks or nulls
+        """
+        if isinstance(array, pa.ChunkedArray):
+            array = array.combine_chunks() if array.num_chunks != 1 else array.chunk(0)
+        if array.null_count:
+            raise ValueError("Vector columns can't contain nulls")
+        length = array.type.list_size
+        flat = array.flatten().to_numpy(zero_copy_only=True)
+        return cls(flat.reshape(-1, length))
+
+    def to_arrow(self) -> pa.FixedSizeListArray:
+        """
+        The column as an Arrow FixedSizeList array sharing this column's buffer
+        """
+        return pa.FixedSizeListArray.from_arrays(pa.array(self.values.reshape(-1)), self.length)
+
+    def save(self, path: str):
+        """
+        Write the column as an Arrow IPC file
+        """
+        table = pa.table({COLUMN: self.to_arrow()})
+        with pa.OSFile(path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=max(len(self), 1))
+
+    @classmethod
+    def load(cls, path: str) -> "VectorColumn":
+        """
+        Memory-map a column written by `save`; rows are only paged in when touched
+        """
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        return cls.from_arrow(table.column(COLUMN))
+
+    @property
+    def length(self) -> int:
+        return self.values.shape[1]
+
+    def __len__(self) -> int:
+        return self.values.shape[0]
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return self.values[rows]
+
+
+def hstack(columns: List[VectorColumn]) -> np.ndarray:
+    """
+    Concatenate vector columns side by side into one model input matrix (one copy, no per-row work)
+    """
+    return np.hstack([column.values for column in columns])
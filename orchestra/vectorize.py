@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from code import DataCode
+from plan import PlanStep, code_function
+
+
+def to_numpy(column) -> np.ndarray:
+    """
+    A 1-D NumPy view (or copy, when unavoidable) of a list, NumPy array or Arrow Array/ChunkedArray column
+    """
+    if isinstance(column, np.ndarray):
+        return column
+    if hasattr(column, "to_numpy"):
+        # pyarrow zero-copies primitive columns without nulls and copies the rest
+        return column.to_numpy(zero_copy_only=False)
+    values = np.asarray(column)
+    if values.ndim != 1:
+        # e.g., a list of tuples - keep one Python object per row
+        values = np.empty(len(column), dtype=object)
+        values[:] = column
+    return values
+
+
+class BatchExecutor:
+    """
+    Columnar execution of row-oriented `PythonDataCode` over large batches.
+
+    For every function the executor picks, once, one of:
+    [1] vectorized - the function is called a single time with whole NumPy columns (e.g., `business_name + " " + business_address` works elementwise on object arrays).  Used when `PythonDataCode.vectorized` is True, or when a probe on the first `probe_rows` rows matches row-by-row results - or finds a function that only works on arrays (e.g., `value.astype(np.int32)`), which fails row by row.
+    [2] chunked - the function is called once per row, but over plain Python values pulled out of the columns `chunk_size` rows at a time, so there is no per-row dict or DataFrame.  Used for anything with per-row control flow (`if payment_method != "pos"`) or that fails the probe.
+
+    Works as the `ExecutionPlan.run` executor for SingleRecord steps: `executors={"SingleRecord": BatchExecutor()}`.
+    """
+
+    def __init__(self, chunk_size: int = 65536, probe_rows: int = 16):
+        self.chunk_size = chunk_size
+        self.probe_rows = probe_rows
+        self.vectorizable: Dict[Callable, bool] = {}
+
+    def __call__(self, step: PlanStep, columns: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        results: Dict[str, np.ndarray] = {}
+        for code, (inputs, output) in zip(step.codes, step.wiring):
+            args = [results[c] if c in results else to_numpy(columns[c]) for c in inputs]
+            results[output] = self.apply(code, args)
+        return {column: results[column] for column in step.outputs}
+
+    def apply(self, code: DataCode, args: List[np.ndarray]) -> np.ndarray:
+        """
+        Run `code` over equally long argument columns and return its output column
+        """
+        function = code_function(code)
+        length = len(args[0]) if args else 0
+        if function not in self.vectorizable:
+            declared = getattr(code, "vectorized", None)
+            self.vectorizable[function] = (
+                declared if isinstance(declared, bool) else self._probe(function, args, length)
+            )
+        if self.vectorizable[function]:
+            result = self._vectorized(function, args, length)
+            if result is not None:
+                return result
+            self.vectorizable[function] = False
+        return self._chunked(function, args, length)
+
+    @staticmethod
+    def _vectorized(function: Callable, args: List[np.ndarray], length: int) -> Optional[np.ndarray]:
+        try:
+            result = function(*args)
+        except Exception:
+            return None
+        result = np.asarray(result)
+        if result.shape[:1] != (length,):
+            return None
+        return result
+
+    def _chunked(self, function: Callable, args: List[np.ndarray], length: int) -> np.ndarray:
+        chunks = []
+        for start in range(0, length, self.chunk_size):
+            rows = [a[start : start + self.chunk_size].tolist() for a in args]
+            chunks.append(to_numpy([function(*values) for values in zip(*rows)]))
+        if not chunks:
+            return np.empty(0, dtype=object)
+        return np.concatenate(chunks)
+
+    def _probe(self, function: Callable, args: List[np.ndarray], length: int) -> bool:
+        """
+        Does calling `function` with whole columns give the same answer as calling it per row?  True as well when only the call with whole columns works.
+        """
+        rows = min(length, self.probe_rows)
+        if rows == 0:
+            return False
+        sample = [a[:rows] for a in args]
+        vectorized = self._vectorized(function, sample, rows)
+        if vectorized is None:
+            return False
+        try:
+            expected = self._chunked(function, sample, rows)
+        except Exception:
+            return True
+        return bool(vectorized.tolist() == expected.tolist())
+
+
+# TODO: Push Arrow-native kernels (pyarrow.compute) for common string/datetime DataCode so the probe isn't needed for them.
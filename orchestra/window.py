@@ -0,0 +1,249 @@
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional, Tuple, Union
+
+from feature import Aggregation
+from plan import PlanStep
+
+
+WINDOW_UNITS = {
+    "d": timedelta(days=1),
+    "h": timedelta(hours=1),
+    "m": timedelta(minutes=1),
+    "s": timedelta(seconds=1),
+}
+
+
+def parse_window(aggregation: Aggregation) -> Union[int, timedelta]:
+    """
+    The window of an Aggregation as either an int (last N records) or a timedelta (time window).
+
+    Accepts the `Aggregation.window` strings ("5n", "7d", "3m", ...) as well as `window=5, type="LASTN"` and `window=timedelta(...)`.
+    """
+    window = aggregation.window
+    if isinstance(window, timedelta):
+        return window
+    if isinstance(window, int):
+        if getattr(aggregation, "type", "LASTN") != "LASTN":
+            raise ValueError(f"Integer window {window} needs type LASTN")
+        return window
+    count, unit = int(window[:-1]), window[-1]
+    if unit == "n":
+        return count
+    if unit not in WINDOW_UNITS:
+        raise ValueError(f"Unknown window unit '{unit}' in '{window}', expected one of d, h, m, s, n")
+    return count * WINDOW_UNITS[unit]
+
+
+def aggregate_function(aggregation: Aggregation) -> str:
+    """
+    `Aggregation.aggregate_function`, also accepting the shorthand `function=` used in the examples
+    """
+    function = getattr(aggregation, "aggregate_function", None) or getattr(aggregation, "function", None)
+    if function not in ("SUM", "COUNT", "MAX", "MIN", "AVG"):
+        raise ValueError(f"Aggregate function {function!r} can't be computed incrementally")
+    return function
+
+
+class _Extremes:
+    """
+    Monotonic deque answering MIN or MAX of a sliding window in amortized O(1).
+
+    Holds (position, value) pairs where position is a sequence number or a timestamp; values that can never be the extreme again are dropped on insert.  A late value (older than the newest position) is inserted at its own position, and dropped if a newer value already hides it.
+    """
+
+    def __init__(self, function: str):
+        self.keep = (lambda old, new: old < new) if function == "MIN" else (lambda old, new: old > new)
+        self.items: Deque[Tuple[Any, float]] = deque()
+
+    def push(self, position, value):
+        index = len(self.items)
+        while index and self.items[index - 1][0] > position:
+            index -= 1
+        if index < len(self.items) and not self.keep(value, self.items[index][1]):
+            return
+        while index and not self.keep(self.items[index - 1][1], value):
+            del self.items[index - 1]
+            index -= 1
+        self.items.insert(index, (position, value))
+
+    def evict(self, oldest):
+        while self.items and self.items[0][0] < oldest:
+            self.items.popleft()
+
+    def value(self) -> Optional[float]:
+        return self.items[0][1] if self.items else None
+
+
+class LastNState:
+    """
+    Running state of a last-N-records window for one key: a ring buffer of the last N values plus a running sum.
+    """
+
+    def __init__(self, n: int, function: str):
+        self.n = n
+        self.function = function
+        self.buffer: List[float] = [0.0] * n
+        self.seen = 0
+        self.total = 0.0
+        self.extremes = _Extremes(function) if function in ("MIN", "MAX") else None
+
+    def update(self, value: float, timestamp: Optional[datetime] = None):
+        slot = self.seen % self.n
+        if self.seen >= self.n:
+            self.total -= self.buffer[slot]
+        self.buffer[slot] = value
+        self.total += value
+        if self.extremes is not None:
+            self.extremes.push(self.seen, value)
+            self.extremes.evict(self.seen - self.n + 1)
+        self.seen += 1
+
+    def value(self, now: Optional[datetime] = None) -> Optional[float]:
+        count = min(self.seen, self.n)
+        if self.function == "COUNT":
+            return count
+        if count == 0:
+            return None
+        if self.function == "SUM":
+            return self.total
+        if self.function == "AVG":
+            return self.total / count
+        return self.extremes.value()
+
+
+class TimeWindowState:
+    """
+    Running state of a time window for one key.
+
+    SUM/COUNT/AVG keep partial sums per time bucket (`window / buckets` wide); buckets that fall out of the window are subtracted from the running totals.  MIN/MAX keep a monotonic deque keyed on timestamp.
+
+    Events are expected in roughly increasing timestamp order (as delivered by a stream).  A late event is added to the newest bucket (MIN/MAX: at its own timestamp), and one that is already outside the window is ignored.  The window edge is exact to one bucket width.
+    """
+
+    def __init__(self, window: timedelta, function: str, buckets: int = 60):
+        self.window = window
+        self.width = window / buckets
+        self.function = function
+        self.buckets: Deque[List[Any]] = deque()  # [bucket_start, sum, count]
+        self.total = 0.0
+        self.count = 0
+        self.latest: Optional[datetime] = None
+        self.extremes = _Extremes(function) if function in ("MIN", "MAX") else None
+
+    def _evict(self, now: datetime):
+        oldest = now - self.window
+        while self.buckets and self.buckets[0][0] + self.width <= oldest:
+            _, total, count = self.buckets.popleft()
+            self.total -= total
+            self.count -= count
+        if self.extremes is not None:
+            self.extremes.evict(oldest)
+
+    def update(self, value: float, timestamp: datetime):
+        if self.latest is not None and timestamp <= self.latest - self.window:
+            return
+        if self.latest is None or timestamp > self.latest:
+            self.latest = timestamp
+        if self.extremes is not None:
+            self.extremes.push(timestamp, value)
+        elif not self.buckets or timestamp >= self.buckets[-1][0] + self.width:
+            self.buckets.append([timestamp, value, 1])
+            self.total += value
+            self.count += 1
+        else:
+            self.buckets[-1][1] += value
+            self.buckets[-1][2] += 1
+            self.total += value
+            self.count += 1
+        self._evict(self.latest)
+
+    def value(self, now: Optional[datetime] = None) -> Optional[float]:
+        if now is not None:
+            self._evict(now)
+        if self.function == "COUNT":
+            return self.count
+        if self.extremes is not None:
+            return self.extremes.value()
+        if self.count == 0:
+            return None
+        return self.total if self.function == "SUM" else self.total / self.count
+
+
+class WindowAggregator:
+    """
+    Incremental, per-key execution of a single `Aggregation`.
+
+    Each event costs O(1) (amortized for MIN/MAX) regardless of the window size, so streaming providers never rescan history.  State is kept in memory per `aggregate_by` key.
+    """
+
+    def __init__(self, aggregation: Aggregation, buckets: int = 60):
+        self.aggregation = aggregation
+        self.function = aggregate_function(aggregation)
+        self.window = parse_window(aggregation)
+        self.buckets = buckets
+        self.states: Dict[Hashable, Union[LastNState, TimeWindowState]] = {}
+
+    def _state(self, key: Hashable):
+        state = self.states.get(key)
+        if state is None:
+            if isinstance(self.window, int):
+                state = LastNState(self.window, self.function)
+            else:
+                state = TimeWindowState(self.window, self.function, self.buckets)
+            self.states[key] = state
+        return state
+
+    def update(self, key: Hashable, value: float, timestamp: Optional[datetime] = None) -> Optional[float]:
+        """
+        Add one event and return the key's aggregate including it
+        """
+        if timestamp is None and not isinstance(self.window, int):
+            raise ValueError("Time windows need the event timestamp")
+        state = self._state(key)
+        state.update(value, timestamp)
+        return state.value()
+
+    def value(self, key: Hashable, now: Optional[datetime] = None) -> Optional[float]:
+        """
+        Current aggregate for `key`, evicting anything older than `now - window` for time windows
+        """
+        state = self.states.get(key)
+        if state is None:
+            return 0 if self.function == "COUNT" else None
+        return state.value(now)
+
+
+class AggregationExecutor:
+    """
+    `ExecutionPlan.run` executor for Aggregation steps: `executors={"Aggregation": AggregationExecutor()}`.
+
+    The step's inputs are the aggregated value, the `aggregate_by` columns and, when the plan was compiled with a `timestamp`, the timestamp column.  Aggregator state persists across batches, so consecutive micro-batches from a stream continue the same windows.
+    """
+
+    def __init__(self, parse_timestamp: Optional[Callable[[Any], datetime]] = None):
+        self.parse_timestamp = parse_timestamp
+        self.aggregators: Dict[int, WindowAggregator] = {}
+
+    def __call__(self, step: PlanStep, columns: Dict[str, List[Any]]) -> Dict[str, List[Any]]:
+        aggregation = step.codes[0]
+        aggregator = self.aggregators.get(id(aggregation))
+        if aggregator is None:
+            aggregator = self.aggregators[id(aggregation)] = WindowAggregator(aggregation)
+        group_by = len(getattr(aggregation, "aggregate_by", None) or getattr(aggregation, "group_by", None) or [])
+        values = columns[step.inputs[0]]
+        keys = list(zip(*(columns[c] for c in step.inputs[1 : 1 + group_by]))) or [()] * len(values)
+        timestamps = [None] * len(values)
+        if len(step.inputs) > 1 + group_by:
+            timestamps = columns[step.inputs[-1]]
+            if self.parse_timestamp is not None:
+                timestamps = [self.parse_timestamp(t) for t in timestamps]
+        return {
+            step.outputs[0]: [
+                aggregator.update(key, value, timestamp)
+                for key, value, timestamp in zip(keys, values, timestamps)
+            ]
+        }
+
+
+# TODO: CUSTOM aggregate functions can't be made incremental in general - should they declare add/remove (invertible) or merge (bucketed) operations?
@@ -0,0 +1,253 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import re
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from code import DataCode
+from common import object_name
+from lazy import lazy_import
+from plan import PlanStep, code_function
+from vectorize import BatchExecutor, to_numpy
+
+cloudpickle = lazy_import("cloudpickle")
+
+
+ENVIRONMENT_FIELDS = ["python_modules", "requirements_txt", "conda_yaml", "python_version", "docker_container"]
+
+
+def environment_hash(code: DataCode) -> str:
+    """
+    Hash of everything that defines a `PythonDataCode`'s environment; code blocks with the same hash can share worker processes
+    """
+    environment = {}
+    for field in ENVIRONMENT_FIELDS:
+        value = getattr(code, field, None)
+        environment[field] = value if isinstance(value, (str, dict)) else None
+    return hashlib.sha256(json.dumps(environment, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def _installed(module: str) -> Optional[str]:
+    try:
+        return metadata.version(module)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def environment_mismatches(code: DataCode) -> List[str]:
+    """
+    How the running interpreter differs from the environment a `PythonDataCode` declares; empty when the code can run here.
+
+    [1] `python_version` must match the running version in every component it gives ("3.9" matches 3.9.x)
+    [2] every `python_modules` entry and every requirements_txt line must be installed, at the pinned version for "==" pins
+    [3] `conda_yaml` and `docker_container` environments can't be provided by a local process, so declaring one is always a mismatch
+    """
+    mismatches = []
+    version = getattr(code, "python_version", None)
+    if isinstance(version, str) and version:
+        running = platform.python_version_tuple()
+        if list(running[: len(version.split("."))]) != version.split("."):
+            mismatches.append(f"python {version} (running {platform.python_version()})")
+    required: Dict[str, Optional[str]] = {}
+    modules = getattr(code, "python_modules", None)
+    if isinstance(modules, dict):
+        required.update({module: version or None for module, version in modules.items()})
+    requirements = getattr(code, "requirements_txt", None)
+    if isinstance(requirements, str):
+        if "\n" not in requirements and os.path.isfile(requirements):
+            with open(requirements) as f:
+                requirements = f.read()
+        for line in requirements.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if not line or line.startswith("-"):
+                continue
+            module, _, pin = line.partition("==")
+            required[re.split(r"[\s<>=!~;\[]", module, 1)[0]] = pin.strip() or None
+    for module, pin in required.items():
+        installed = _installed(module)
+        if installed is None:
+            mismatches.append(f"{module} (not installed)")
+        elif pin is not None and installed != pin:
+            mismatches.append(f"{module}=={pin} (installed {installed})")
+    for field in ("conda_yaml", "docker_container"):
+        if isinstance(getattr(code, field, None), str):
+            mismatches.append(f"a {field} environment")
+    return mismatches
+
+
+class _ShippedCode(NamedTuple):
+    """
+    What a worker needs of a `PythonDataCode` to run it like `BatchExecutor.apply` would in the parent
+    """
+
+    function: Callable
+    vectorized: Optional[bool]
+
+
+# worker process state: unpickled functions and the executor that runs them
+_functions: Dict[Tuple[str, Optional[bool]], Callable] = {}
+_executor = BatchExecutor()
+
+
+def _run_shard(
+    function_id: str,
+    function_bytes: bytes,
+    vectorized: Optional[bool],
+    inputs: List[Tuple[str, Any]],
+    start: int,
+    stop: int,
+    output: Optional[Tuple[str, str]],
+):
+    # one copy per declared `vectorized`, since the executor remembers its choice per function object
+    function = _functions.get((function_id, vectorized))
+    if function is None:
+        function = _functions[function_id, vectorized] = cloudpickle.loads(function_bytes)
+    # spawned workers share the parent's resource tracker; the parent unlinks every block
+    blocks, args = [], []
+    for kind, value in inputs:
+        if kind == "shared":
+            name, dtype, length = value
+            block = shared_memory.SharedMemory(name=name)
+            blocks.append(block)
+            args.append(np.ndarray((length,), dtype=np.dtype(dtype), buffer=block.buf)[start:stop])
+        else:
+            args.append(value)
+    try:
+        result = _executor.apply(_ShippedCode(function, vectorized), args)
+        if output is None:
+            # a copy: the result may be a view of the shared inputs (e.g., `lambda x: x`), which are closed below
+            return np.array(result)
+        name, dtype = output
+        block = shared_memory.SharedMemory(name=name)
+        blocks.append(block)
+        np.ndarray((stop,), dtype=np.dtype(dtype), buffer=block.buf)[start:stop] = result
+        return None
+    finally:
+        args = result = None
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                pass  # a traceback still holds views of the block; the parent unlinks it either way
+
+
+class ProcessExecutor:
+    """
+    Runs `PythonDataCode` across all cores, with warm worker-process pools keyed by environment hash.
+
+    Workers run the parent's interpreter and packages, so code whose declared environment (`python_version`, `python_modules`, `requirements_txt`, `conda_yaml`, `docker_container`) differs from the running one is rejected with ValueError instead of running against the wrong packages; see `environment_mismatches`.
+
+    Each batch is split into `workers` contiguous shards, one task per shard.  Fixed-width (numeric, boolean, datetime) input columns are placed in shared memory once and every worker maps its slice, so no input data is pickled; with `output_dtype` the workers also write their results straight into a shared output column, which is copied out once at the end.  Object columns (e.g., strings) are sent to the workers in pickled shards.
+
+    Pools are created on first use and kept warm until `close()`.  Inside a worker, each shard runs through `vectorize.BatchExecutor`, so vectorizable functions still run column-at-a-time.
+
+    Functions are shipped with cloudpickle once per worker and cached there, so lambdas and closures work.  `PythonDataCode.vectorized` is sent with every shard, so workers decide between whole columns and rows exactly like the parent.
+    """
+
+    def __init__(self, workers: Optional[int] = None, min_shard_rows: int = 10000):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard_rows = min_shard_rows
+        self.pools: Dict[str, ProcessPoolExecutor] = {}
+        self.pickled: Dict[Callable, Tuple[str, bytes]] = {}
+        self.context = multiprocessing.get_context("spawn")
+        self.checked: Dict[str, List[str]] = {}
+
+    def check(self, code: DataCode):
+        """
+        Raise ValueError if `code` declares an environment other than the running one
+        """
+        key = environment_hash(code)
+        if key not in self.checked:
+            self.checked[key] = environment_mismatches(code)
+        if self.checked[key]:
+            needs = ", ".join(self.checked[key])
+            raise ValueError(f"{object_name(code)} needs {needs}; ProcessExecutor only runs code in the current environment")
+
+    def pool(self, code: DataCode) -> ProcessPoolExecutor:
+        self.check(code)
+        key = environment_hash(code)
+        if key not in self.pools:
+            self.pools[key] = ProcessPoolExecutor(max_workers=self.workers, mp_context=self.context)
+        return self.pools[key]
+
+    def apply(self, code: DataCode, args: List[Any], output_dtype: Optional[str] = None) -> np.ndarray:
+        """
+        Run `code` over equally long argument columns on the worker pool for its environment
+        """
+        self.check(code)
+        function = code_function(code)
+        columns = [to_numpy(a) for a in args]
+        length = len(columns[0]) if columns else 0
+        if length < self.min_shard_rows:
+            return _executor.apply(code, columns)
+        declared = getattr(code, "vectorized", None)
+        vectorized = declared if isinstance(declared, bool) else None
+        if function not in self.pickled:
+            pickled = cloudpickle.dumps(function)
+            self.pickled[function] = (hashlib.sha256(pickled).hexdigest(), pickled)
+        function_id, function_bytes = self.pickled[function]
+
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            shared = []
+            for column in columns:
+                if column.dtype.hasobject:
+                    shared.append(None)
+                    continue
+                block = shared_memory.SharedMemory(create=True, size=max(column.nbytes, 1))
+                blocks.append(block)
+                np.ndarray(column.shape, dtype=column.dtype, buffer=block.buf)[:] = column
+                shared.append((block.name, column.dtype.str, length))
+            output = None
+            if output_dtype is not None:
+                dtype = np.dtype(output_dtype)
+                block = shared_memory.SharedMemory(create=True, size=max(length * dtype.itemsize, 1))
+                blocks.append(block)
+                output = (block.name, dtype.str)
+
+            shard = max(-(-length // self.workers), self.min_shard_rows)
+            tasks = []
+            for start in range(0, length, shard):
+                stop = min(start + shard, length)
+                inputs = [
+                    ("shared", value) if value is not None else ("pickled", column[start:stop])
+                    for column, value in zip(columns, shared)
+                ]
+                tasks.append(
+                    self.pool(code).submit(
+                        _run_shard, function_id, function_bytes, vectorized, inputs, start, stop, output
+                    )
+                )
+            results = [task.result() for task in tasks]
+            if output is None:
+                return np.concatenate(results)
+            return np.ndarray((length,), dtype=np.dtype(output_dtype), buffer=blocks[-1].buf).copy()
+        finally:
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+    def __call__(self, step: PlanStep, columns: Dict[str, Any]) -> Dict[str, np.ndarray]:
+        """
+        `ExecutionPlan.run` executor for SingleRecord steps: `executors={"SingleRecord": ProcessExecutor()}`
+        """
+        results: Dict[str, np.ndarray] = {}
+        for code, (inputs, output) in zip(step.codes, step.wiring):
+            args = [results[c] if c in results else columns[c] for c in inputs]
+            results[output] = self.apply(code, args)
+        return {column: results[column] for column in step.outputs}
+
+    def close(self):
+        for pool in self.pools.values():
+            pool.shutdown()
+        self.pools = {}
+
+
+# TODO: build the declared environments (a venv or conda env per environment hash) and point each pool at its interpreter with `set_executable`, instead of rejecting them.
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# orchestra/ modules import each other as top-level modules ("from common import object_name")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "orchestra"))
@@ -0,0 +1,49 @@
+import math
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from compiled import FusedTransformation, LinearScaling, OneHotEncoding, compile_transformation
+
+
+def test_scaler_flags_are_honored():
+    standard = SimpleNamespace(mean_=np.array([10.0]), scale_=None, with_mean=True, with_std=False, n_features_in_=1)
+    assert [(t.offset, t.scale) for t in compile_transformation(standard)] == [(10.0, 1.0)]
+    standard = SimpleNamespace(mean_=np.array([10.0]), scale_=np.array([2.0]), with_mean=False, with_std=True)
+    assert [(t.offset, t.scale) for t in compile_transformation(standard)] == [(0.0, 2.0)]
+    robust = SimpleNamespace(center_=None, scale_=np.array([4.0, 5.0]), with_centering=False, with_scaling=True)
+    assert [(t.offset, t.scale) for t in compile_transformation(robust)] == [(0.0, 4.0), (0.0, 5.0)]
+    robust = SimpleNamespace(center_=np.array([1.0]), scale_=None, with_centering=True, with_scaling=False)
+    assert [(t.offset, t.scale) for t in compile_transformation(robust)] == [(1.0, 1.0)]
+
+
+def test_min_max_clip():
+    # feature_range (0, 1) fitted on [0, 10]: x * 0.1 + 0
+    scaler = SimpleNamespace(min_=np.array([0.0]), scale_=np.array([0.1]), clip=True, feature_range=(0, 1))
+    fused = FusedTransformation([("amount", compile_transformation(scaler)[0])])
+    assert fused.transform({"amount": 20.0}).tolist() == [1.0]
+    assert fused.transform_batch({"amount": [-5.0, 5.0, 20.0]})[:, 0].tolist() == [0.0, 0.5, 1.0]
+    scaler.clip = False
+    fused = FusedTransformation([("amount", compile_transformation(scaler)[0])])
+    assert fused.transform({"amount": 20.0}).tolist() == [2.0]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    fused = FusedTransformation(
+        [
+            ("method", OneHotEncoding([1, "online", None, float("nan"), 2.5], drop=None, handle_unknown="error")),
+            ("amount", LinearScaling(1.0, 2.0, clip=(0.0, 1.0))),
+            ("hour", None),
+        ]
+    )
+    path = str(tmp_path / "transformation.npz")
+    fused.save(path)
+    loaded = FusedTransformation.load(path)
+    values = [(1, 0.0), ("online", 2.0), (None, 9.0), (math.nan, 1.5), (2.5, 1.0)]
+    records = [{"method": method, "amount": amount, "hour": 3} for method, amount in values]
+    for record in records:
+        assert loaded.transform(record).tolist() == fused.transform(record).tolist()
+    assert loaded.columns[0][1].categories[0] == 1 and loaded.columns[0][1].categories[2] is None
+    with pytest.raises(ValueError):
+        loaded.transform({"method": "1", "amount": 0.0, "hour": 0})
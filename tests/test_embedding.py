@@ -0,0 +1,48 @@
+import os
+
+import numpy as np
+
+from embedding import EmbeddingCache
+
+
+def encoder(calls):
+    def encode(inputs):
+        calls.append(list(inputs))
+        return np.array([[len(value), i] for i, value in enumerate(inputs)], dtype=np.float32)
+
+    return encode
+
+
+def test_repeated_inputs_reach_the_model_once(tmp_path):
+    calls = []
+    cache = EmbeddingCache(encoder(calls), "model", "1", dim=2, path=str(tmp_path))
+    first = cache.encode(["a", "bb", "a"])
+    assert calls == [["a", "bb"]]
+    assert (first[0] == first[2]).all()
+    reopened = EmbeddingCache(encoder(calls), "model", "1", dim=2, path=str(tmp_path), memory_rows=0)
+    assert (reopened.encode(["bb"]) == first[1]).all()
+    assert len(calls) == 1
+
+
+def test_vectors_without_an_index_are_truncated(tmp_path):
+    calls = []
+    cache = EmbeddingCache(encoder(calls), "model", "1", dim=2, path=str(tmp_path))
+    cache.encode(["a", "bb"])
+    # a crash after the first vector append, before the index file was ever written
+    os.remove(cache.index_path)
+    reopened = EmbeddingCache(encoder(calls), "model", "1", dim=2, path=str(tmp_path), memory_rows=0)
+    assert os.path.getsize(reopened.vectors_path) == 0
+    vectors = reopened.encode(["ccc", "a"])
+    again = EmbeddingCache(encoder(calls), "model", "1", dim=2, path=str(tmp_path), memory_rows=0)
+    assert (again.encode(["ccc", "a"]) == vectors).all()
+    assert len(calls) == 2
+
+
+def test_orphan_vectors_after_the_last_key_are_dropped(tmp_path):
+    cache = EmbeddingCache(encoder([]), "model", "1", dim=2, path=str(tmp_path))
+    cache.encode(["a"])
+    with open(cache.vectors_path, "ab") as f:
+        f.write(np.zeros(2, dtype=np.float32).tobytes())
+    reopened = EmbeddingCache(encoder([]), "model", "1", dim=2, path=str(tmp_path))
+    assert os.path.getsize(reopened.vectors_path) == 2 * 4
+    assert len(reopened.rows) == 1
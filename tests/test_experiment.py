@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from experiment import ExperimentRunner, FeatureCache
+
+
+@pytest.fixture
+def cache(tmp_path):
+    rng = np.random.default_rng(0)
+
+    def split(rows):
+        columns = {name: rng.normal(size=rows) for name in ("amount", "hour", "age", "noise")}
+        columns["is_fraud"] = (columns["amount"] + columns["age"] > 0).astype(np.int32)
+        return columns
+
+    return FeatureCache.create(str(tmp_path), "is_fraud", split(400), split(100))
+
+
+def least_squares(X_train, X_test, y_train, y_test):
+    weights, *_ = np.linalg.lstsq(np.c_[X_train, np.ones(len(X_train))], y_train, rcond=None)
+    predicted = np.c_[X_test, np.ones(len(X_test))] @ weights > 0.5
+    return {"accuracy": float((predicted == y_test).mean()), "columns": X_train.shape[1]}
+
+
+def test_projections_share_the_cached_buffers(cache):
+    table = cache.table("train")
+    projected = cache.project("train", ["age", "amount"])
+    assert projected.column_names == ["age", "amount"]
+    assert projected.column("age").chunk(0).buffers()[1].address == table.column("age").chunk(0).buffers()[1].address
+    X_train, X_test, y_train, y_test = cache.data(["amount", "age"])
+    assert X_train.shape == (400, 2) and X_test.shape == (100, 2)
+    assert X_train[:, 1].tolist() == table.column("age").to_pylist()
+    assert y_train.tolist() == table.column("is_fraud").to_pylist()
+
+
+def test_every_permutation_trains_on_the_one_cache_best_first(cache):
+    runner = ExperimentRunner.for_expirement(
+        cache,
+        ["amount"],
+        ["hour", "age", "noise"],
+        {"algorithm": "try_all_permutations", "metrics": ["accuracy"], "metrics_goals": ["maximize"]},
+        workers=2,
+    )
+    assert len(runner.permutations()) == 7
+    assert all(features[0] == "amount" for features in runner.permutations())
+    results = runner.run(least_squares)
+    assert sorted(result.features for result in results) == sorted(runner.permutations())
+    assert all(result.metrics["columns"] == len(result.features) for result in results)
+    scores = [result.metrics["accuracy"] for result in results]
+    assert scores == sorted(scores, reverse=True)
+    assert "age" in results[0].features
+
+
+def test_reaching_the_target_cancels_the_trials_not_started(cache):
+    runner = ExperimentRunner(
+        cache, [], ["amount", "hour", "age", "noise"], ["accuracy"], ["maximize"], workers=1, target=0.0
+    )
+    assert len(runner.run(least_squares)) < len(runner.permutations())
+
+
+def test_goals_are_validated(cache):
+    with pytest.raises(ValueError):
+        ExperimentRunner(cache, [], ["age"], ["accuracy"], ["most"])
+    with pytest.raises(ValueError):
+        ExperimentRunner.for_expirement(cache, [], ["age"], {"algorithm": "greedy", "metrics": [], "metrics_goals": []})
@@ -0,0 +1,111 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pyarrow as pa
+import pytest
+
+from extracts import ExtractCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Source:
+    """
+    A provider table, {column: values}, that records every `since` it is asked for
+    """
+
+    def __init__(self, **columns):
+        self.table = pa.table(columns)
+        self.calls = []
+
+    def add(self, **columns):
+        self.table = pa.concat_tables([self.table, pa.table(columns)])
+
+    def __call__(self, since):
+        self.calls.append(since)
+        if since is None:
+            return self.table
+        return self.table.filter(pa.compute.greater_equal(self.table["ts"], since))
+
+
+def provider(**fields):
+    return SimpleNamespace(name="user_demos", config={"table": "user-demos"}, **fields)
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_extracts_are_reused_while_fresh(tmp_path, clock):
+    cache = ExtractCache(str(tmp_path), clock=clock)
+    source = Source(id=[1, 2], ts=[10, 20])
+    fresh = provider(freshness=timedelta(hours=1))
+    assert cache.get(fresh, ["id", "ts"], source, "ts").num_rows == 2
+    clock.now = 1800
+    assert cache.get(fresh, ["id", "ts"], source, "ts").num_rows == 2
+    assert source.calls == [None]
+    clock.now = 3600
+    cache.get(fresh, ["id", "ts"], source, "ts")
+    assert source.calls == [None, 20]
+
+
+def test_providers_without_freshness_are_never_stale(tmp_path, clock):
+    cache = ExtractCache(str(tmp_path), clock=clock)
+    source = Source(id=[1], ts=[10])
+    clock.now = 10**9
+    cache.get(provider(), ["id", "ts"], source, "ts")
+    cache.get(provider(), ["id", "ts"], source, "ts")
+    assert source.calls == [None]
+    cache.get(provider(), ["id", "ts"], source, "ts", max_age=timedelta(0))
+    assert source.calls == [None, 10]
+
+
+def test_new_rows_after_the_watermark_are_appended(tmp_path, clock):
+    cache = ExtractCache(str(tmp_path), clock=clock)
+    source = Source(id=[1, 2], ts=[10, 20])
+    cache.get(provider(), ["id", "ts"], source, "ts")
+    first = cache.state(provider(), ["id", "ts"]).parts
+    source.add(id=[3, 4], ts=[20, 30])
+    table = cache.get(provider(), ["id", "ts"], source, "ts", max_age=timedelta(0))
+    # rows at the watermark were extracted already
+    assert table["id"].to_pylist() == [1, 2, 4]
+    state = cache.state(provider(), ["id", "ts"])
+    assert state.parts[:1] == first and len(state.parts) == 2
+    assert state.watermark == 30 and state.rows == 3
+
+
+def test_keyed_refreshes_replace_rows_and_only_rewrite_the_parts_they_touch(tmp_path, clock):
+    cache = ExtractCache(str(tmp_path), clock=clock)
+    source = Source(id=[1, 2], ts=[10, 20], age=[40, 50])
+    get = lambda: cache.get(provider(), ["id", "ts", "age"], source, "ts", ["id"], overlap=5, max_age=timedelta(0))
+    get()
+    source.add(id=[3, 4], ts=[30, 30], age=[60, 70])
+    get()
+    untouched, touched = cache.state(provider(), ["id", "ts", "age"]).parts
+    # a late update of id 4, re-pulled with the overlap
+    source.add(id=[4], ts=[32], age=[71])
+    table = get()
+    assert source.calls[-1] == 25
+    assert sorted(zip(table["id"].to_pylist(), table["age"].to_pylist())) == [(1, 40), (2, 50), (3, 60), (4, 71)]
+    parts = cache.state(provider(), ["id", "ts", "age"]).parts
+    assert parts[0] == untouched and touched not in parts and len(parts) == 3
+    assert sorted(p.name for p in (tmp_path / "user_demos").rglob("part-*.arrow")) == sorted(parts)
+
+
+def test_parts_are_compacted_past_max_parts(tmp_path, clock):
+    cache = ExtractCache(str(tmp_path), max_parts=2, clock=clock)
+    source = Source(id=[0], ts=[0])
+    cache.get(provider(), ["id", "ts"], source, "ts")
+    for i in range(1, 4):
+        source.add(id=[i], ts=[i])
+        table = cache.get(provider(), ["id", "ts"], source, "ts", max_age=timedelta(0))
+        assert table["id"].to_pylist() == list(range(i + 1))
+    assert len(cache.state(provider(), ["id", "ts"]).parts) <= 2
+    assert len(list((tmp_path / "user_demos").rglob("part-*.arrow"))) == len(cache.state(provider(), ["id", "ts"]).parts)
@@ -0,0 +1,75 @@
+import random
+from datetime import datetime, timedelta
+
+from join import AsOfJoin
+
+
+def at(hours: float) -> datetime:
+    return datetime(2022, 12, 1) + timedelta(hours=hours)
+
+
+def by_label(rows):
+    return {row["label_id"]: row for row in rows}
+
+
+def test_labels_get_the_latest_feature_row_at_or_before_them():
+    features = [
+        {"user_id": 1, "time": at(0), "age": 30},
+        {"user_id": 1, "time": at(2), "age": 31},
+        {"user_id": 1, "time": at(5), "age": 32},
+        {"user_id": 2, "time": at(1), "age": 40},
+    ]
+    labels = [
+        {"label_id": "before", "user_id": 1, "timestamp": at(-1)},
+        {"label_id": "exact", "user_id": 1, "timestamp": at(2)},
+        {"label_id": "between", "user_id": 1, "timestamp": at(4)},
+        {"label_id": "other_user", "user_id": 2, "timestamp": at(9)},
+        {"label_id": "unknown_user", "user_id": 3, "timestamp": at(9)},
+    ]
+    joined = by_label(AsOfJoin(["user_id"], "timestamp", "time", partitions=4).join(labels, features, ["age"], "user_"))
+    assert {label: row["user_age"] for label, row in joined.items()} == {
+        "before": None,
+        "exact": 31,
+        "between": 31,
+        "other_user": 40,
+        "unknown_user": None,
+    }
+    assert joined["exact"]["timestamp"] == at(2)
+
+
+def test_matches_older_than_the_tolerance_are_missing():
+    features = [{"user_id": 1, "time": at(0), "age": 30}]
+    labels = [
+        {"label_id": "fresh", "user_id": 1, "timestamp": at(1)},
+        {"label_id": "stale", "user_id": 1, "timestamp": at(3)},
+    ]
+    join = AsOfJoin(["user_id"], "timestamp", "time", tolerance=timedelta(hours=2))
+    joined = by_label(join.join(labels, features, ["age"]))
+    assert joined["fresh"]["age"] == 30
+    assert joined["stale"]["age"] is None
+
+
+def test_ties_take_the_last_feature_row_and_timestamps_can_be_parsed():
+    features = [
+        {"user_id": 1, "time": "100", "age": 30},
+        {"user_id": 1, "time": "100", "age": 31},
+        {"user_id": 1, "time": "20", "age": 29},
+    ]
+    labels = [{"label_id": "tie", "user_id": 1, "timestamp": 100}, {"label_id": "early", "user_id": 1, "timestamp": 50}]
+    joined = by_label(AsOfJoin(["user_id"], "timestamp", "time", parse_timestamp=int).join(labels, features, ["age"]))
+    assert joined["tie"]["age"] == 31
+    assert joined["early"]["age"] == 29
+
+
+def test_spilled_join_matches_a_brute_force_join(tmp_path):
+    rng = random.Random(7)
+    features = [{"user_id": rng.randrange(50), "time": rng.random() * 100, "score": i} for i in range(2000)]
+    labels = [{"label_id": i, "user_id": rng.randrange(60), "timestamp": rng.random() * 100} for i in range(500)]
+    join = AsOfJoin(["user_id"], "timestamp", "time", partitions=8, buffer_rows=37, spill_directory=str(tmp_path))
+    joined = by_label(join.join(labels, features, ["score"]))
+    assert len(joined) == len(labels)
+    for label in labels:
+        candidates = [f for f in features if f["user_id"] == label["user_id"] and f["time"] <= label["timestamp"]]
+        expected = max(candidates, key=lambda f: f["time"])["score"] if candidates else None
+        assert joined[label["label_id"]]["score"] == expected
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,45 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from bundle import ServingBundle
+from datatype import Double, FloatVector
+from layout import ColumnSlot, ModelInput
+
+
+def model(*features):
+    return SimpleNamespace(name="fraud", input_features=list(features), output_features={})
+
+
+def test_sized_vectors_get_their_own_slice():
+    embedding = SimpleNamespace(name="embedding", type=FloatVector(3))
+    amount = SimpleNamespace(name="amount", type=Double)
+    model_input = ModelInput.for_model(model(amount, embedding))
+    assert model_input.slots == [ColumnSlot("amount", 0, 1), ColumnSlot("embedding", 1, 3)]
+    assert model_input.assemble({"amount": 2.0, "embedding": [1.0, 2.0, 3.0]}).tolist() == [[2.0, 1.0, 2.0, 3.0]]
+    batch = model_input.assemble_batch({"amount": [1.0, 2.0], "embedding": np.ones((2, 3))})
+    assert batch.tolist() == [[1.0, 1.0, 1.0, 1.0], [2.0, 1.0, 1.0, 1.0]]
+
+
+def test_vectors_without_a_length_are_rejected():
+    with pytest.raises(ValueError):
+        ModelInput.for_model(model(SimpleNamespace(name="embedding", type=FloatVector)))
+
+
+def test_bundles_keep_the_vector_layout(tmp_path):
+    features = [SimpleNamespace(name="amount", type=Double), SimpleNamespace(name="embedding", type=FloatVector(128))]
+    ServingBundle.build(model(*features), str(tmp_path))
+    bundle = ServingBundle.load(str(tmp_path))
+    assert bundle.model_input.width == 129
+    assert bundle.model_input.slots[1] == ColumnSlot("embedding", 1, 128)
+
+
+def test_bundles_ship_the_model_artifact(tmp_path):
+    saved = tmp_path / "cc-fraud-xgb.json"
+    saved.write_text('{"learner": {}}')
+    ServingBundle.build(model(SimpleNamespace(name="amount", type=Double)), str(tmp_path / "bundle"), artifact=str(saved))
+    bundle = ServingBundle.load(str(tmp_path / "bundle"))
+    assert bundle.artifact == str(tmp_path / "bundle" / "model.json")
+    assert open(bundle.artifact).read() == '{"learner": {}}'
+    assert bundle.log_fields == [("amount", "Double", None)]
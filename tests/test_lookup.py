@@ -0,0 +1,109 @@
+import threading
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from lookup import ApiFetcher, JoinExecutor, LookupClient
+from plan import ExecutionPlan
+
+
+class Fetcher:
+    def __init__(self, rows):
+        self.rows = rows
+        self.calls = []
+
+    async def __call__(self, keys):
+        self.calls.append(list(keys))
+        return {key: self.rows[key] for key in keys if key in self.rows}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lookup_dedupes_and_batches_keys():
+    fetch = Fetcher({k: {"id": k} for k in range(10)})
+    client = LookupClient(fetch, max_batch_size=4)
+    assert client.lookup([1, 2, 1, 3, 99]) == [{"id": 1}, {"id": 2}, {"id": 1}, {"id": 3}, None]
+    assert sorted(k for call in fetch.calls for k in call) == [1, 2, 3, 99]
+    assert client.lookup([1, 2]) == [{"id": 1}, {"id": 2}]
+    assert len(fetch.calls) == 1
+    client.close()
+
+
+def test_lookup_reuses_one_event_loop_across_calls_and_threads():
+    fetch = Fetcher({k: k for k in range(100)})
+    client = LookupClient(fetch)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.update({i: client.lookup([i, i + 50])})) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert results == {i: [i, i + 50] for i in range(20)}
+    loop = client.loop
+    client.lookup([1000])
+    assert client.loop is loop
+    client.close()
+
+
+def test_cache_is_bounded_and_drops_stale_rows():
+    clock = Clock()
+    fetch = Fetcher({k: k for k in range(10)})
+    client = LookupClient(fetch, ttl=timedelta(seconds=10), max_cache_rows=3, clock=clock)
+    client.lookup([1, 2, 3, 4])
+    assert list(client.cache) == [2, 3, 4]
+    clock.now = 11
+    assert client.lookup([3]) == [3]
+    assert fetch.calls[-1] == [3]
+    assert 3 in client.cache and 2 in client.cache
+    client.lookup([2])
+    assert fetch.calls[-1] == [2]
+    client.close()
+
+
+def test_join_steps_prefetch_the_whole_batch():
+    users = SimpleNamespace(name="user_info", keys=[SimpleNamespace(name="user_id")])
+
+    def address_length(user_id, **data_sources):
+        return len(data_sources["user_info"].keys([user_id])["address"])
+
+    feature = SimpleNamespace(
+        name="address_length",
+        input_features=["txn_log.user_id"],
+        business_logics=[SimpleNamespace(name="address_length", function=address_length, input_datasources=[users])],
+    )
+    plan = ExecutionPlan.compile([feature])
+    fetch = Fetcher({1: {"address": "a"}, 2: {"address": "bb"}})
+    client = LookupClient(fetch)
+    result = plan.run({"txn_log.user_id": [1, 2, 1, 2, 1]}, {"Join": JoinExecutor({"user_info": client})})
+    assert result == {"address_length": [1, 2, 1, 2, 1]}
+    assert len(fetch.calls) == 1 and sorted(fetch.calls[0]) == [1, 2]
+    with pytest.raises(ValueError):
+        plan.run({"txn_log.user_id": [1]}, {"Join": JoinExecutor({})})
+    client.close()
+
+
+@pytest.mark.parametrize("keys, returned", [([1, 2, 3], ["1", "3"]), (["1", "2", "3"], [1, 3])])
+def test_api_rows_answer_keys_of_another_json_type(keys, returned):
+    fetcher = ApiFetcher({"get_many": "https://users/get_many/{{user_id}}"}, "user_id")
+    urls = []
+    fetcher._get = lambda url: urls.append(url) or [{"user_id": key, "age": 30} for key in returned]
+    client = LookupClient(fetcher)
+    assert client.lookup(keys) == [{"user_id": returned[0], "age": 30}, None, {"user_id": returned[1], "age": 30}]
+    assert urls == ["https://users/get_many/1,2,3"]
+    client.close()
+
+
+def test_api_rows_for_keys_that_werent_requested_are_an_error():
+    fetcher = ApiFetcher({"get_many": "https://users/get_many/{{user_id}}"}, "user_id")
+    fetcher._get = lambda url: [{"user_id": 7}]
+    client = LookupClient(fetcher)
+    with pytest.raises(ValueError):
+        client.lookup([1])
+    client.close()
@@ -0,0 +1,75 @@
+from types import SimpleNamespace
+
+from materialize import Materializer, partition_fingerprint
+
+
+def code(name, function):
+    return SimpleNamespace(name=name, function=function)
+
+
+def feature(name, inputs, *codes):
+    return SimpleNamespace(name=name, input_features=list(inputs), business_logics=list(codes))
+
+
+class Partitions:
+    """
+    In-memory partitions of `txn.amount` that count how often each one is loaded
+    """
+
+    def __init__(self, **partitions):
+        self.partitions = partitions
+        self.loads = []
+
+    def __iter__(self):
+        for name, amounts in self.partitions.items():
+            yield name, lambda name=name, amounts=amounts: self.loads.append(name) or {"txn.amount": amounts}
+
+
+SCALES = {
+    2: lambda value: value * 2,
+    3: lambda value: value * 3,
+}
+
+
+def pipeline(scale=2):
+    taxed = feature("taxed", ["txn.amount"], code("tax", lambda amount: amount + 1))
+    scaled = feature("scaled", [taxed], code("scale", SCALES[scale]))
+    return taxed, scaled
+
+
+def test_unchanged_partitions_are_skipped_without_loading(tmp_path):
+    materializer = Materializer(str(tmp_path))
+    partitions = Partitions(p1=[1, 2], p2=[3])
+    taxed, scaled = pipeline()
+    assert materializer.run([scaled], partitions) == {"taxed": 2, "scaled": 2}
+    assert materializer.run([scaled], partitions) == {"taxed": 0, "scaled": 0}
+    assert partitions.loads == ["p1", "p2"]
+    definitions = materializer.fingerprints([scaled])
+    assert materializer.load("scaled", definitions["scaled"], "p1") == [4, 6]
+
+
+def test_changed_definitions_recompute_only_themselves_and_downstream(tmp_path):
+    materializer = Materializer(str(tmp_path))
+    partitions = Partitions(p1=[1, 2])
+    _, scaled = pipeline(scale=2)
+    materializer.run([scaled], partitions)
+    taxed, rescaled = pipeline(scale=3)
+    assert materializer.fingerprints([rescaled])["taxed"] == materializer.fingerprints([scaled])["taxed"]
+    assert materializer.run([rescaled], partitions) == {"taxed": 0, "scaled": 1}
+    definitions = materializer.fingerprints([rescaled])
+    assert materializer.load("scaled", definitions["scaled"], "p1") == [6, 9]
+
+
+def test_changed_partitions_are_recomputed(tmp_path):
+    source = tmp_path / "part-0.csv"
+    source.write_text("1")
+    before = partition_fingerprint(str(source), content=True)
+    assert partition_fingerprint(str(source), content=True) == before
+    source.write_text("2")
+    after = partition_fingerprint(str(source), content=True)
+    assert after != before
+
+    materializer = Materializer(str(tmp_path / "store"))
+    _, scaled = pipeline()
+    materializer.run([scaled], [(before, lambda: {"txn.amount": [1]})])
+    assert materializer.run([scaled], [(after, lambda: {"txn.amount": [2]})]) == {"taxed": 1, "scaled": 1}
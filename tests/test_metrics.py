@@ -0,0 +1,85 @@
+import json
+import urllib.request
+
+import numpy as np
+import pytest
+
+from metrics import Histogram, StageTimers
+
+
+def nearest_rank(values, percentile):
+    ordered = sorted(values)
+    return ordered[max(1, int(round(percentile / 100.0 * len(ordered)))) - 1]
+
+
+@pytest.mark.parametrize("precision_bits", [3, 7])
+def test_percentiles_are_within_the_precision_bound(precision_bits):
+    values = np.random.default_rng(0).lognormal(13, 2, 20000).astype(np.int64).tolist()
+    histogram = Histogram(precision_bits)
+    for value in values:
+        histogram.record(value)
+    bound = 1 / 2 ** (precision_bits - 1)
+    for percentile in (1, 50, 90, 99, 99.9, 100):
+        exact = nearest_rank(values, percentile)
+        assert exact <= histogram.percentile(percentile) <= exact * (1 + bound)
+    assert (histogram.min, histogram.max, histogram.count) == (min(values), max(values), len(values))
+
+
+def test_small_values_are_exact():
+    histogram = Histogram()
+    for value in range(100):
+        histogram.record(value)
+    assert [histogram.percentile(p) for p in (1, 50, 100)] == [0, 49, 99]
+    assert Histogram().percentile(50) == 0
+
+
+def test_merged_histograms_match_one_over_all_values():
+    rng = np.random.default_rng(1)
+    left, right, both = Histogram(), Histogram(), Histogram()
+    for value in rng.integers(1000, 10**6, 5000).tolist():
+        left.record(value)
+        both.record(value)
+    for value in rng.integers(10**6, 10**8, 5000).tolist():
+        right.record(value)
+        both.record(value)
+    left.merge(right)
+    assert left.counts == both.counts
+    assert (left.count, left.total, left.min, left.max) == (both.count, both.total, both.min, both.max)
+    with pytest.raises(ValueError):
+        left.merge(Histogram(precision_bits=5))
+
+
+def test_stage_timers_record_every_stage(tmp_path):
+    timers = StageTimers()
+    with timers.time("validate_inputs"):
+        pass
+
+    @timers.timed("predict")
+    def predict(value):
+        if value < 0:
+            raise ValueError(value)
+        return value
+
+    assert predict(1) == 1
+    with pytest.raises(ValueError):
+        predict(-1)
+    timers.record("get_features", 2_000_000)
+    snapshot = timers.snapshot()
+    assert list(snapshot) == ["get_features", "predict", "validate_inputs"]
+    assert snapshot["predict"]["count"] == 2
+    assert snapshot["get_features"]["p50_ms"] == pytest.approx(2.0, rel=1 / 64)
+
+    path = tmp_path / "latency.json"
+    timers.dump(str(path))
+    assert json.loads(path.read_text())["stages"]["predict"]["count"] == 2
+
+
+def test_stage_timers_serve_their_snapshot():
+    timers = StageTimers()
+    timers.record("predict", 1000)
+    server = timers.serve(port=0)
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics", timeout=5) as response:
+            assert json.loads(response.read())["predict"]["count"] == 1
+    finally:
+        timers.stop()
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from datatype import Double, FloatVector
+from monitor import DriftMonitor
+
+
+def model():
+    return SimpleNamespace(
+        name="fraud",
+        input_features=[
+            SimpleNamespace(name="amount", type=Double),
+            SimpleNamespace(name="embedding", type=FloatVector(4)),
+        ],
+        output_features=[SimpleNamespace(name="score", type=Double)],
+    )
+
+
+def test_vector_features_are_not_monitored(tmp_path):
+    monitor = DriftMonitor.for_model(model(), str(tmp_path))
+    assert monitor.columns == ["amount", "score"]
+    monitor.observe_batch({"amount": [1.0, 2.0], "embedding": np.ones((2, 4))}, predictions=np.array([0.1, 0.9]))
+    assert monitor.profiles["amount"].rows == 2 and monitor.profiles["score"].rows == 2
+    assert monitor.errors == 0
+
+
+def test_columns_that_cant_be_profiled_never_fail_serving(tmp_path):
+    monitor = DriftMonitor(["amount", "embedding"], str(tmp_path), predictions=["score"], buffer_rows=2)
+    monitor.observe_batch({"amount": [1.0, 2.0], "embedding": np.ones((2, 4))}, predictions=[0.1, 0.9])
+    monitor.observe_batch({"amount": [3.0], "embedding": [np.ones(4)]}, predictions=[0.5])
+    monitor.observe({"amount": 4.0, "embedding": np.ones(4), "score": 0.2})
+    monitor.observe({"amount": 5.0, "embedding": np.ones(4), "score": 0.3})
+    assert "embedding" in monitor.skipped and monitor.errors == 1
+    assert monitor.profiles["amount"].rows == 5 and monitor.profiles["score"].rows == 5
+    assert monitor.flush() is not None
+
+
+def test_unnamed_predictions_for_several_predictions_are_counted(tmp_path):
+    monitor = DriftMonitor(["amount"], str(tmp_path), predictions=["a", "b"])
+    monitor.observe_batch({"amount": [1.0]}, predictions=[1.0])
+    assert monitor.errors == 1
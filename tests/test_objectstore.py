@@ -0,0 +1,49 @@
+import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from objectstore import ObjectStoreReader
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    for day in ["2022-12-01", "2022-12-02", "2022-12-03"]:
+        for hour in ["07", "11"]:
+            directory = tmp_path / f"dt={day}" / f"hour={hour}"
+            directory.mkdir(parents=True)
+            pq.write_table(pa.table({"amount": [1.0, 2.0]}), str(directory / "part.parquet"))
+    return str(tmp_path)
+
+
+def partitions(table):
+    return sorted(set(zip(table.column("dt").to_pylist(), table.column("hour").to_pylist())))
+
+
+@pytest.mark.parametrize(
+    "filters, expected",
+    [
+        ([("dt", "==", "2022-12-02")], [("2022-12-02", "07"), ("2022-12-02", "11")]),
+        ([("dt", ">=", "2022-12-02"), ("hour", "<", 10)], [("2022-12-02", "07"), ("2022-12-03", "07")]),
+        ([("dt", ">", datetime.date(2022, 12, 2))], [("2022-12-03", "07"), ("2022-12-03", "11")]),
+        ([("dt", "!=", "2022-12-01"), ("hour", "!=", 7)], [("2022-12-02", "11"), ("2022-12-03", "11")]),
+        ([("dt", "not in", ["2022-12-01", "2022-12-02"]), ("hour", "in", [11])], [("2022-12-03", "11")]),
+        ([("hour", "<=", 7), ("dt", "<", "2022-12-02")], [("2022-12-01", "07")]),
+    ],
+)
+def test_partition_filters_prune_with_every_operator(dataset, filters, expected):
+    reader = ObjectStoreReader(max_workers=2)
+    _, paths = reader.objects(dataset, filters)
+    table = reader.read(dataset, filters=filters)
+    assert len(paths) == len(expected)
+    assert partitions(table) == expected
+    assert table.num_rows == 2 * len(expected)
+    reader.close()
+
+
+def test_file_filters_still_apply_inside_partitions(dataset):
+    reader = ObjectStoreReader(max_workers=2)
+    table = reader.read(dataset, columns=["amount", "dt"], filters=[("dt", "<", "2022-12-02"), ("amount", ">", 1.0)])
+    assert table.to_pydict() == {"amount": [2.0, 2.0], "dt": ["2022-12-01", "2022-12-01"]}
+    reader.close()
@@ -0,0 +1,90 @@
+from types import SimpleNamespace
+
+import pytest
+
+from plan import ExecutionPlan
+
+
+def code(name, function, **fields):
+    return SimpleNamespace(name=name, function=function, **fields)
+
+
+def feature(name, inputs=(), *codes):
+    return SimpleNamespace(name=name, input_features=list(inputs), business_logics=list(codes))
+
+
+add_tax = code("add_tax", lambda amount: amount * 1.1)
+double = code("double", lambda value: value * 2)
+combine = code("combine", lambda a, b: a + b)
+
+
+def test_shared_expressions_are_planned_once():
+    calls = []
+    taxed = code("taxed", lambda amount: calls.append(amount) or amount + 1)
+    first = feature("first", ["txn.amount"], taxed)
+    second = feature("second", ["txn.amount"], taxed)
+    plan = ExecutionPlan.compile([first, second], fuse=False)
+    assert [step.kind for step in plan.steps] == ["read", "code"]
+    assert plan.outputs["first"] == plan.outputs["second"]
+    assert plan.run({"txn.amount": [1, 2]}) == {"first": [2, 3], "second": [2, 3]}
+    assert calls == [1, 2]
+
+
+def test_raw_columns_are_read_once_per_data_source():
+    plan = ExecutionPlan.compile(
+        [feature("a", ["txn.amount"], double), feature("b", ["txn.amount", "user.age"], combine)], fuse=False
+    )
+    assert sorted(step.outputs for step in plan.steps if step.kind == "read") == [["txn.amount"], ["user.age"]]
+    assert sorted(plan.raw_columns()) == ["txn.amount", "user.age"]
+
+
+def test_steps_run_after_the_steps_they_read():
+    taxed = feature("taxed", ["txn.amount"], add_tax)
+    doubled = feature("doubled", [taxed], double)
+    total = feature("total", [doubled, taxed], combine)
+    plan = ExecutionPlan.compile([total, doubled], fuse=False)
+    produced = {"txn.amount"}
+    for step in plan.steps:
+        assert set(step.inputs) <= produced
+        produced.update(step.outputs)
+    assert plan.run({"txn.amount": [10]})["total"] == [pytest.approx(33.0)]
+
+
+def test_single_record_chains_are_fused_and_intermediates_dropped():
+    taxed = feature("taxed", ["txn.amount"], add_tax, double)
+    total = feature("total", [taxed], code("negate", lambda value: -value))
+    plan = ExecutionPlan.compile([total])
+    (step,) = [step for step in plan.steps if step.kind == "code"]
+    assert step.name == "add_tax+double+negate"
+    assert step.outputs == ["taxed", "total"]
+    assert plan.run({"txn.amount": [10]}) == {"taxed": [pytest.approx(22.0)], "total": [pytest.approx(-22.0)]}
+
+
+def test_steps_needing_other_records_are_not_fused_and_need_an_executor():
+    window = code("window", lambda value: value, input_records_needed="AllRecords")
+    plan = ExecutionPlan.compile([feature("total", [feature("doubled", ["txn.amount"], double)], window)])
+    assert [step.name for step in plan.steps] == ["read", "double", "window"]
+    with pytest.raises(NotImplementedError):
+        plan.run({"txn.amount": [1]})
+    ran = plan.run({"txn.amount": [1, 2]}, {"AllRecords": lambda step, columns: {"total": [sum(columns["doubled"])] * 2}})
+    assert ran["total"] == [6, 6]
+
+
+def test_steps_without_inputs_give_one_value_per_row():
+    plan = ExecutionPlan.compile([feature("one", [], code("one", lambda: 1)), feature("a", ["txn.amount"], double)])
+    assert plan.run({"txn.amount": [1, 2, 3]}) == {"one": [1, 1, 1], "a": [2, 4, 6]}
+
+
+def test_provided_features_are_read_instead_of_planned():
+    taxed = feature("taxed", ["txn.amount"], add_tax)
+    plan = ExecutionPlan.compile([feature("doubled", [taxed], double)], provided={"taxed"})
+    assert plan.raw_columns() == ["taxed"]
+    assert plan.run({"taxed": [5]}) == {"doubled": [10]}
+
+
+def test_circular_dependencies_are_rejected():
+    first = feature("first", [], double)
+    second = feature("second", [first], double)
+    first.input_features.append(second)
+    with pytest.raises(ValueError, match="Circular"):
+        ExecutionPlan.compile([first])
@@ -0,0 +1,60 @@
+import threading
+from datetime import timedelta
+
+import pytest
+
+from serving import MicroBatcher
+
+
+def test_requests_are_batched_and_results_fanned_out():
+    sizes = []
+
+    def process(requests):
+        sizes.append(len(requests))
+        return [r * 2 for r in requests]
+
+    batcher = MicroBatcher(process, max_batch_size=8, max_delay=timedelta(milliseconds=50))
+    futures = [batcher.submit(i) for i in range(8)]
+    assert [f.result(5) for f in futures] == [i * 2 for i in range(8)]
+    assert sum(sizes) == 8 and max(sizes) > 1
+    batcher.close()
+
+
+def test_errors_reach_every_caller_of_the_batch():
+    batcher = MicroBatcher(lambda requests: [1], max_delay=timedelta(milliseconds=20))
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(5)
+    assert batcher(1) == 1
+    batcher.close()
+
+
+def test_cancelled_requests_are_skipped_and_the_worker_survives():
+    gate = threading.Event()
+    seen = []
+
+    def process(requests):
+        gate.wait(5)
+        seen.extend(requests)
+        return requests
+
+    batcher = MicroBatcher(process, max_batch_size=1, max_delay=timedelta(0))
+    first = batcher.submit("first")
+    cancelled = batcher.submit("cancelled")
+    assert cancelled.cancel()
+    gate.set()
+    assert first.result(5) == "first"
+    assert batcher.submit("after").result(5) == "after"
+    assert seen == ["first", "after"]
+    batcher.close()
+
+
+def test_close_finishes_queued_requests_and_rejects_new_ones():
+    batcher = MicroBatcher(lambda requests: requests, max_delay=timedelta(milliseconds=20))
+    futures = [batcher.submit(i) for i in range(100)]
+    batcher.close(timeout=5)
+    assert not batcher.worker.is_alive()
+    assert [f.result(0) for f in futures] == list(range(100))
+    with pytest.raises(RuntimeError):
+        batcher.submit(1)
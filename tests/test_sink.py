@@ -0,0 +1,56 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+from datatype import Double, FloatVector, Int64, String
+from sink import PredictionLogSink, log_fields
+
+
+def model():
+    return SimpleNamespace(
+        name="fraud",
+        input_features=[
+            SimpleNamespace(name="user_id", type=Int64),
+            SimpleNamespace(name="payment_method", type=String),
+            SimpleNamespace(name="embedding", type=FloatVector(2)),
+        ],
+        output_features=[SimpleNamespace(name="score", type=Double)],
+    )
+
+
+def read(sink):
+    sink.close()
+    return pq.read_table(sink.files[0])
+
+
+def test_schema_comes_from_the_model_not_the_first_batch(tmp_path):
+    sink = PredictionLogSink.for_model(model(), str(tmp_path), flush_interval=timedelta(milliseconds=10))
+    assert log_fields(model())[2] == ("embedding", "FloatVector", 2)
+    sink.log({"user_id": 1, "payment_method": None, "embedding": [0.5, 1.0], "score": 1})
+    sink.log({"user_id": 2, "payment_method": "pos", "embedding": np.ones(2), "score": 0.25, "extra": "ignored"})
+    table = read(sink)
+    assert table.schema.field("score").type == "double" and table.schema.field("payment_method").type == "string"
+    assert table.to_pydict() == {
+        "user_id": [1, 2],
+        "payment_method": [None, "pos"],
+        "embedding": [[0.5, 1.0], [1.0, 1.0]],
+        "score": [1.0, 0.25],
+    }
+
+
+def test_values_that_dont_fit_are_rejected_not_truncated(tmp_path):
+    sink = PredictionLogSink.for_model(model(), str(tmp_path), flush_interval=timedelta(milliseconds=10))
+    sink.log_batch({"user_id": [1, 2.5, 3.0, "x"], "score": [0.1, 0.2, 0.3, 0.4]})
+    table = read(sink)
+    assert table.column("user_id").to_pylist() == [1, 3]
+    assert table.column("score").to_pylist() == [0.1, 0.3]
+    assert sink.rejected == 2 and sink.dropped == 0
+
+
+def test_columns_need_a_type():
+    untyped = SimpleNamespace(name="fraud", input_features=[SimpleNamespace(name="amount")], output_features={})
+    with pytest.raises(ValueError):
+        PredictionLogSink.for_model(untyped, "unused")
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from sketch import CategoryCounts, HyperLogLog, TDigest
+
+
+def test_tdigest_quantiles_and_extremes():
+    values = np.random.default_rng(0).normal(size=100000)
+    digest = TDigest(buffer_size=1000)
+    for chunk in np.array_split(values, 37):
+        digest.update(chunk)
+    assert digest.count == len(values)
+    for q in (0.001, 0.01, 0.5, 0.99, 0.999):
+        assert digest.quantile(q) == pytest.approx(np.quantile(values, q), abs=0.02)
+    assert digest.quantile(0.0) == values.min()
+    assert digest.quantile(1.0) == values.max()
+    assert len(digest.means) < 1000
+
+
+def test_tdigest_ignores_nans_and_empty_digests_have_no_quantiles():
+    digest = TDigest()
+    assert np.isnan(digest.quantile(0.5))
+    digest.update(np.array([1.0, np.nan, 3.0]))
+    assert digest.count == 2
+    assert digest.quantile(0.5) == pytest.approx(2.0)
+
+
+def test_merged_tdigests_match_one_over_all_values():
+    rng = np.random.default_rng(1)
+    left, right = rng.exponential(size=50000), rng.exponential(size=50000) + 1
+    merged, first, second = TDigest(), TDigest(), TDigest()
+    first.update(left)
+    second.update(right)
+    merged.update(np.concatenate([left, right]))
+    first.merge(second)
+    assert first.count == merged.count
+    for q in (0.05, 0.5, 0.95):
+        assert first.quantile(q) == pytest.approx(merged.quantile(q), rel=0.02)
+    assert first.min == left.min() and first.max == right.max()
+
+
+def test_ks_distance():
+    rng = np.random.default_rng(2)
+    reference, same, shifted = TDigest(), TDigest(), TDigest()
+    reference.update(rng.normal(size=50000))
+    same.update(rng.normal(size=50000))
+    shifted.update(rng.normal(1.0, size=50000))
+    assert same.ks_distance(reference) < 0.02
+    # the exact KS distance between N(0, 1) and N(1, 1) is 2 * Phi(0.5) - 1 = 0.383
+    assert shifted.ks_distance(reference) == pytest.approx(0.383, abs=0.02)
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 100000])
+def test_hyperloglog_estimates_cardinality(cardinality):
+    sketch = HyperLogLog()
+    values = np.arange(cardinality)
+    sketch.update(np.concatenate([values, values[: cardinality // 2]]))
+    assert sketch.estimate() == pytest.approx(cardinality, rel=0.05)
+
+
+def test_merged_hyperloglogs_count_the_union():
+    left, right = HyperLogLog(), HyperLogLog()
+    left.update(np.array([f"user-{i}" for i in range(0, 30000)], dtype=object))
+    right.update(np.array([f"user-{i}" for i in range(20000, 50000)], dtype=object))
+    left.merge(right)
+    assert left.estimate() == pytest.approx(50000, rel=0.05)
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=10))
+
+
+def test_category_counts_are_exact_below_capacity_and_bounded_above():
+    counts = CategoryCounts(capacity=3)
+    counts.update(np.array(["a"] * 50 + ["b"] * 30 + ["c"] * 15))
+    assert counts.counts == {"a": 50, "b": 30, "c": 15}
+    counts.update(np.array(["d"] * 3 + ["e"] * 2))
+    assert counts.total == 100
+    assert set(counts.counts) <= {"a", "b", "c"}
+    for value, exact in (("a", 50), ("b", 30), ("c", 15)):
+        assert exact - counts.total / 4 <= counts.counts.get(value, 0) <= exact
+    assert counts.other == counts.total - sum(counts.counts.values())
+
+
+def test_category_psi():
+    reference, same, shifted = CategoryCounts(), CategoryCounts(), CategoryCounts()
+    reference.update(np.array(["online"] * 700 + ["in_store"] * 300))
+    same.update(np.array(["online"] * 70 + ["in_store"] * 30))
+    shifted.update(np.array(["online"] * 30 + ["in_store"] * 70))
+    assert same.psi(reference) == pytest.approx(0.0)
+    assert shifted.psi(reference) > 0.25
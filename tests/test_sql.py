@@ -0,0 +1,66 @@
+import sqlite3
+from datetime import timedelta
+from types import SimpleNamespace
+
+from code import SQLDataCode
+from feature import Aggregation
+from sql import SQLCompiler
+
+
+def sql_code(sql):
+    code = SQLDataCode.__new__(SQLDataCode)
+    code.__dict__.update(name="sql", sql=sql)
+    return code
+
+
+def aggregation(**config):
+    code = Aggregation.__new__(Aggregation)
+    code.__dict__.update(config)
+    return code
+
+
+def feature(name, inputs, *logics):
+    return SimpleNamespace(name=name, input_features=inputs, business_logics=list(logics))
+
+
+def run(query):
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE TABLE txn (user_id INT, event_time INT, amount REAL)")
+    rows = [(1, 1, 10.0), (1, 2, 20.0), (1, 3, 60.0), (2, 1, 5.0), (2, 2, 1.0)]
+    db.executemany("INSERT INTO txn VALUES (?, ?, ?)", rows)
+    return db.execute(query + " ORDER BY user_id, event_time").fetchall()
+
+
+def test_sql_features_compile_into_one_query():
+    doubled = feature("doubled", ["txn.amount"], sql_code("{{input_feature_1}} * 2"))
+    last_2 = feature(
+        "last_2", ["txn.amount"], aggregation(aggregate_function="SUM", window="2n", aggregate_by=["txn.user_id"])
+    )
+    query = SQLCompiler().compile([doubled, last_2], "txn", ["user_id"], "event_time", "txn")
+    assert query.features == ["doubled", "last_2"] and not query.unsupported
+    assert [row[2:] for row in run(query.sql)] == [(20.0, 10.0), (40.0, 30.0), (120.0, 80.0), (10.0, 5.0), (2.0, 6.0)]
+
+
+def test_windows_over_windows_read_from_a_layer():
+    average = feature(
+        "average", ["txn.amount"], aggregation(aggregate_function="AVG", window="2n", aggregate_by=["txn.user_id"])
+    )
+    peak = feature("peak", [average], aggregation(aggregate_function="MAX", window="3n", aggregate_by=["txn.user_id"]))
+    query = SQLCompiler().compile([peak], "txn", ["user_id"], "event_time", "txn")
+    assert "MAX(AVG" not in query.sql and "MAX(_window_1) OVER" in query.sql
+    assert [row[2] for row in run(query.sql)] == [10.0, 15.0, 40.0, 5.0, 5.0]
+
+
+def test_upstream_features_that_were_not_passed_are_compiled():
+    doubled = feature("doubled", ["txn.amount"], sql_code("{{input_feature_1}} * 2"))
+    plus_one = feature("plus_one", [doubled], sql_code("{{doubled}} + 1"))
+    query = SQLCompiler().compile([plus_one], "txn", ["user_id"], "event_time", "txn")
+    assert query.features == ["plus_one"]
+    assert "doubled" not in query.sql.replace("AS doubled", "")
+    assert [row[2] for row in run(query.sql)][:3] == [21.0, 41.0, 121.0]
+
+
+def test_python_features_are_unsupported():
+    python = feature("python", ["txn.amount"], SimpleNamespace(name="python", function=abs))
+    query = SQLCompiler().compile([python], "txn", ["user_id"], "event_time", "txn")
+    assert query.unsupported == ["python"] and query.features == []
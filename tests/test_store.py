@@ -0,0 +1,131 @@
+import threading
+import time
+from datetime import timedelta
+from types import SimpleNamespace
+
+from store import OnlineStore
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def feature(name: str, freshness: float, inputs=()):
+    return SimpleNamespace(name=name, freshness=timedelta(seconds=freshness), input_features=list(inputs))
+
+
+def test_recomputes_only_stale_values_whose_inputs_changed():
+    clock = Clock()
+    store = OnlineStore(clock=clock)
+    calls = []
+    store.register(feature("total", 10, ["txn.amount"]), lambda key: calls.append(key) or len(calls))
+    store.changed("txn.amount", "u1")
+    clock.now += 1
+    assert store.get("total", "u1") == 1
+    clock.now += 20
+    assert store.get("total", "u1") == 1  # stale, but the input hasn't changed since
+    store.changed("txn.amount", "u1")
+    assert store.get("total", "u1") == 2
+
+
+def test_slow_compute_does_not_block_other_keys():
+    store = OnlineStore()
+    started, release = threading.Event(), threading.Event()
+
+    def compute(key):
+        if key == "slow":
+            started.set()
+            release.wait(5)
+        return key
+
+    store.register(feature("f", 60), compute)
+    store.put("f", "fast", "cached")
+    slow = threading.Thread(target=store.get, args=("f", "slow"))
+    slow.start()
+    assert started.wait(5)
+    begin = time.perf_counter()
+    assert store.get("f", "fast") == "cached"
+    assert store.get("f", "other") == "other"
+    assert time.perf_counter() - begin < 1.0
+    release.set()
+    slow.join()
+    assert store.computing == {}
+
+
+def test_concurrent_readers_of_one_key_compute_once():
+    store = OnlineStore()
+    calls = []
+    gate = threading.Event()
+
+    def compute(key):
+        calls.append(key)
+        gate.wait(5)
+        return 42
+
+    store.register(feature("f", 60), compute)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(store.get("f", "k"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    gate.set()
+    for thread in threads:
+        thread.join()
+    assert results == [42] * 8
+    assert calls == ["k"]
+
+
+def test_change_reports_are_bounded_and_evictions_count_as_changes():
+    clock = Clock()
+    store = OnlineStore(max_changes=2, clock=clock)
+    values = iter(range(100))
+    store.register(feature("f", 10, ["raw"]), lambda key: next(values))
+    store.changed("raw", "a")
+    assert store.get("f", "a") == 0
+    clock.now += 1
+    for key in ["b", "c", "d"]:
+        store.changed("raw", key)
+    assert len(store.last_changed) == 2
+    clock.now += 20
+    # "a"'s report was evicted after it was computed, so it may have changed
+    assert store.get("f", "a") == 1
+
+
+def test_change_reports_survive_a_restart(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "store.db")
+    calls = []
+
+    def open_store(**kwargs):
+        store = OnlineStore(path, clock=clock, **kwargs)
+        store.register(feature("total", 10, ["txn.amount"]), lambda key: calls.append(key) or len(calls))
+        return store
+
+    store = open_store()
+    store.changed("txn.amount", "u1")
+    store.changed("txn.amount", "u2")
+    clock.now += 1
+    assert (store.get("total", "u1"), store.get("total", "u2")) == (1, 2)
+    clock.now += 1
+    store.changed("txn.amount", "u1")
+    store.close()
+
+    clock.now += 20
+    store = open_store()
+    assert store.get("total", "u2") == 2  # unchanged since it was computed
+    assert store.get("total", "u1") == 3  # changed before the restart
+    store.close()
+
+    # reports evicted before a restart still count as changes at the newest evicted one
+    store = open_store(max_changes=1)
+    assert store.forgotten == 1000.0
+    store.changed("txn.amount", "u3")
+    store.close()
+    store = open_store(max_changes=1)
+    assert list(store.last_changed) == [("txn.amount", "u3")]
+    assert store.forgotten == 1002.0
+    store.close()
@@ -0,0 +1,28 @@
+import pytest
+
+from stream import StructDecoder
+
+FIELDS = [("business_name", "String"), ("purchase_amount", "Float64"), ("user_id", "Int64")]
+
+
+def test_messages_round_trip_through_one_buffer():
+    decoder = StructDecoder(FIELDS, string_width=16)
+    records = [
+        {"business_name": "café", "purchase_amount": 12.5, "user_id": 1},
+        {"business_name": "東京", "purchase_amount": 3.0, "user_id": 2},
+    ]
+    columns = decoder.decode([decoder.encode(record) for record in records])
+    assert decoder.text(columns["business_name"]).tolist() == ["café", "東京"]
+    assert columns["purchase_amount"].tolist() == [12.5, 3.0]
+    assert columns["user_id"].tolist() == [1, 2]
+
+
+def test_strings_longer_than_their_field_are_rejected():
+    decoder = StructDecoder(FIELDS, string_width=4)
+    message = decoder.encode({"business_name": "abcd", "purchase_amount": 0.0, "user_id": 0})
+    assert decoder.text(decoder.decode([message])["business_name"]).tolist() == ["abcd"]
+    with pytest.raises(ValueError):
+        decoder.encode({"business_name": "abcde", "purchase_amount": 0.0, "user_id": 0})
+    # 3 characters, 6 bytes
+    with pytest.raises(ValueError):
+        decoder.encode({"business_name": "äöü", "purchase_amount": 0.0, "user_id": 0})
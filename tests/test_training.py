@@ -0,0 +1,67 @@
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from training import TrainingBatches
+
+
+def chunks(rows: int, chunk_rows: int):
+    for start in range(0, rows, chunk_rows):
+        ids = np.arange(start, min(start + chunk_rows, rows), dtype=np.int64)
+        yield {"txn_id": ids, "amount": ids * 0.5, "is_fraud": (ids % 7 == 0).astype(np.int32)}
+
+
+def split(batches):
+    train, test = set(), set()
+    for batch in batches:
+        train.update((batch.X_train[:, 0] * 2).astype(int).tolist())
+        test.update((batch.X_test[:, 0] * 2).astype(int).tolist())
+    return train, test
+
+
+def test_batches_have_the_requested_size_whatever_the_input_chunks():
+    batches = list(TrainingBatches(chunks(10000, 3001), ["amount"], "is_fraud", ["txn_id"], batch_size=4096))
+    sizes = [len(b.y_train) + len(b.y_test) for b in batches]
+    assert sizes == [4096, 4096, 1808]
+    assert all(b.X_train.shape[1] == 1 and len(b.X_train) == len(b.y_train) for b in batches)
+
+
+def test_the_split_is_stable_across_runs_and_batch_sizes():
+    train, test = split(TrainingBatches(chunks(20000, 5000), ["amount"], "is_fraud", ["txn_id"], batch_size=1000))
+    again = split(TrainingBatches(chunks(20000, 777), ["amount"], "is_fraud", ["txn_id"], batch_size=8192, prefetch=0))
+    assert (train, test) == again
+    assert not train & test and len(train | test) == 20000
+    assert len(test) / 20000 == pytest.approx(0.2, abs=0.02)
+    other = split(TrainingBatches(chunks(20000, 5000), ["amount"], "is_fraud", ["txn_id"], seed="another"))
+    assert other[1] != test
+
+
+def test_labels_stay_aligned_with_their_features():
+    for batch in TrainingBatches(chunks(5000, 1000), ["amount"], "is_fraud", ["txn_id"], batch_size=999):
+        for X, y in ((batch.X_train, batch.y_train), (batch.X_test, batch.y_test)):
+            ids = (X[:, 0] * 2).astype(int)
+            assert (y == (ids % 7 == 0)).all()
+
+
+def test_datasets_can_be_iterated_once_per_epoch(tmp_path):
+    for part, chunk in enumerate(chunks(3000, 1000)):
+        pq.write_table(pa.table(chunk), tmp_path / f"part-{part}.parquet")
+    batches = TrainingBatches.from_dataset(str(tmp_path), ["amount"], "is_fraud", ["txn_id"], batch_size=1024)
+    first, second = split(batches), split(batches)
+    assert first == second and len(first[0] | first[1]) == 3000
+
+
+def test_fixed_size_list_columns_become_one_column_per_element():
+    embedding = pa.FixedSizeListArray.from_arrays(pa.array(np.arange(12, dtype=np.float32)), 3)
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array([1, 2, 3, 4]), embedding, pa.array([0, 1, 0, 1])], ["txn_id", "embedding", "is_fraud"]
+    )
+    (result,) = TrainingBatches([batch], ["embedding"], "is_fraud", ["txn_id"], test_fraction=0.0)
+    assert result.X_train.tolist() == np.arange(12).reshape(4, 3).tolist()
+    assert len(result.X_test) == 0
+
+
+def test_errors_while_preparing_batches_reach_the_training_loop():
+    with pytest.raises(KeyError):
+        list(TrainingBatches(chunks(100, 10), ["missing"], "is_fraud", ["txn_id"], batch_size=10))
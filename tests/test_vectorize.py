@@ -0,0 +1,66 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vectorize import BatchExecutor, to_numpy
+
+
+def code(function, **fields):
+    return SimpleNamespace(name=function.__name__, function=function, **fields)
+
+
+def test_elementwise_functions_run_once_over_whole_columns():
+    calls = []
+
+    def total(amount, tip):
+        calls.append(np.ndim(amount))
+        return amount + tip
+
+    executor = BatchExecutor()
+    result = executor.apply(code(total), [np.arange(100.0), np.ones(100)])
+    assert result.tolist() == (np.arange(100.0) + 1).tolist()
+    assert executor.vectorizable[total] is True
+    # the probe calls it once with columns and once per probed row, then it runs once over the batch
+    assert calls.count(1) == 2
+
+
+def test_functions_with_per_row_control_flow_run_per_row():
+    def card_present(payment_method):
+        return payment_method == "pos" if payment_method else None
+
+    executor = BatchExecutor(chunk_size=7)
+    values = np.array(["pos", "web", "", "pos"] * 10, dtype=object)
+    assert executor.apply(code(card_present), [values]).tolist() == [True, False, None, True] * 10
+    assert executor.vectorizable[card_present] is False
+
+
+def test_functions_that_only_work_on_arrays_run_vectorized():
+    def to_int32(value):
+        return value.astype(np.int32)
+
+    result = BatchExecutor().apply(code(to_int32), [np.array([1.5, 2.5, 3.5])])
+    assert result.dtype == np.int32 and result.tolist() == [1, 2, 3]
+
+
+def test_functions_that_disagree_with_their_per_row_results_run_per_row():
+    def shout(name):
+        return name.upper() if isinstance(name, str) else name[::-1]
+
+    executor = BatchExecutor()
+    assert executor.apply(code(shout), [np.array(["a", "b", "c"], dtype=object)]).tolist() == ["A", "B", "C"]
+    assert executor.vectorizable[shout] is False
+
+
+@pytest.mark.parametrize("vectorized, expected", [(True, "vectorized"), (False, "rows")])
+def test_declared_vectorized_skips_the_probe(vectorized, expected):
+    def kind(value):
+        return np.full(len(value), "vectorized") if isinstance(value, np.ndarray) else "rows"
+
+    result = BatchExecutor().apply(code(kind, vectorized=vectorized), [np.arange(5)])
+    assert result.tolist() == [expected] * 5
+
+
+def test_to_numpy_keeps_tuples_as_one_object_per_row():
+    column = to_numpy([(1, 2), (3, 4)])
+    assert column.dtype == object and column.tolist() == [(1, 2), (3, 4)]
@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from feature import Aggregation
+from window import WindowAggregator, parse_window
+
+
+def aggregation(**fields) -> Aggregation:
+    aggregation = Aggregation.__new__(Aggregation)
+    aggregation.__dict__.update(fields)
+    return aggregation
+
+
+def at(seconds: float) -> datetime:
+    return datetime(2022, 12, 1) + timedelta(seconds=seconds)
+
+
+def test_parse_window():
+    assert parse_window(aggregation(window="5n")) == 5
+    assert parse_window(aggregation(window="7d")) == timedelta(days=7)
+    assert parse_window(aggregation(window=5, type="LASTN")) == 5
+    with pytest.raises(ValueError):
+        parse_window(aggregation(window="5w"))
+
+
+@pytest.mark.parametrize(
+    "function, expected",
+    [("SUM", [1, 3, 6, 9, 12]), ("COUNT", [1, 2, 3, 3, 3]), ("AVG", [1, 1.5, 2, 3, 4]), ("MAX", [1, 2, 3, 4, 5])],
+)
+def test_last_n(function, expected):
+    aggregator = WindowAggregator(aggregation(window="3n", function=function))
+    assert [aggregator.update("k", v) for v in [1, 2, 3, 4, 5]] == expected
+
+
+def test_last_n_min_evicts_the_extreme():
+    aggregator = WindowAggregator(aggregation(window="2n", function="MIN"))
+    assert [aggregator.update("k", v) for v in [1, 5, 4, 6]] == [1, 1, 4, 4]
+
+
+def test_time_window_sum_evicts_old_buckets():
+    aggregator = WindowAggregator(aggregation(window="10s", function="SUM"), buckets=10)
+    aggregator.update("k", 1.0, at(0))
+    aggregator.update("k", 2.0, at(5))
+    assert aggregator.value("k", at(9)) == 3.0
+    assert aggregator.value("k", at(12)) == 2.0
+    assert aggregator.value("other") is None
+
+
+def test_time_window_max_accepts_late_events():
+    aggregator = WindowAggregator(aggregation(window="10s", function="MAX"))
+    aggregator.update("k", 5.0, at(10))
+    assert aggregator.update("k", 9.0, at(1)) == 9.0
+    assert aggregator.value("k", at(12)) == 5.0
+
+
+def test_time_window_late_event_hidden_by_newer_extreme():
+    aggregator = WindowAggregator(aggregation(window="10s", function="MIN"))
+    aggregator.update("k", 3.0, at(5))
+    aggregator.update("k", 4.0, at(2))
+    assert aggregator.value("k", at(6)) == 3.0
+    aggregator.update("k", 1.0, at(4))
+    assert aggregator.value("k", at(6)) == 1.0
+    assert aggregator.value("k", at(14.5)) == 3.0
+
+
+def test_time_window_ignores_events_outside_the_window():
+    aggregator = WindowAggregator(aggregation(window="10s", function="COUNT"))
+    aggregator.update("k", 1.0, at(20))
+    aggregator.update("k", 1.0, at(5))
+    assert aggregator.value("k", at(20)) == 1
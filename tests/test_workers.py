@@ -0,0 +1,78 @@
+import platform
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from workers import ProcessExecutor, environment_hash, environment_mismatches
+
+
+def code(function, **fields):
+    return SimpleNamespace(name="code", function=function, **fields)
+
+
+@pytest.fixture(scope="module")
+def executor():
+    executor = ProcessExecutor(workers=2, min_shard_rows=1000)
+    yield executor
+    executor.close()
+
+
+def test_shards_are_reassembled_in_order(executor):
+    values = np.arange(5001, dtype=np.int64)
+    assert executor.apply(code(lambda x, y: x * 2 + y), [values, np.ones(5001)]).tolist() == (values * 2 + 1).tolist()
+
+
+def test_results_are_written_to_the_shared_output(executor):
+    values = np.linspace(0, 1, 4000)
+    result = executor.apply(code(lambda x: x * 10), [values], output_dtype="float32")
+    assert result.dtype == np.float32
+    np.testing.assert_allclose(result, values * 10, rtol=1e-6)
+
+
+@pytest.mark.parametrize("function", [lambda x: x, lambda x: x[::1], np.asarray])
+def test_views_of_the_shared_inputs_are_returned_intact(executor, function):
+    values = np.arange(20000, dtype=np.float64)
+    assert executor.apply(code(function), [values]).tolist() == values.tolist()
+
+
+def test_object_columns_and_closures(executor):
+    separator = " @ "
+    names = np.array([f"shop-{i}" for i in range(3000)], dtype=object)
+    result = executor.apply(code(lambda name, id: name + separator + str(id)), [names, list(range(3000))])
+    assert result[2999] == "shop-2999 @ 2999"
+    assert len(result) == 3000
+
+
+@pytest.mark.parametrize("vectorized, expected", [(True, "columns"), (False, "rows")])
+def test_workers_honor_the_declared_vectorized(executor, vectorized, expected):
+    def kind(value):
+        return np.full(len(value), "columns", dtype=object) if isinstance(value, np.ndarray) else "rows"
+
+    assert set(executor.apply(code(kind, vectorized=vectorized), [np.arange(3000)]).tolist()) == {expected}
+    assert set(executor.apply(code(kind, vectorized=vectorized), [np.arange(10)]).tolist()) == {expected}
+
+
+def test_array_only_functions_run_in_workers(executor):
+    result = executor.apply(code(lambda value: value.astype(np.int32), vectorized=True), [np.full(3000, 2.5)])
+    assert result.dtype == np.int32 and set(result.tolist()) == {2}
+
+
+def test_environments_other_than_the_running_one_are_rejected():
+    running = platform.python_version()
+    matching = code(len, python_version=running.rsplit(".", 1)[0], python_modules={"numpy": np.__version__})
+    assert environment_mismatches(matching) == []
+    assert environment_mismatches(code(len, requirements_txt="numpy\n# comment\n")) == []
+    outdated = code(len, python_modules={"numpy": "0.0.1"})
+    assert environment_mismatches(outdated) == [f"numpy==0.0.1 (installed {np.__version__})"]
+    missing = code(len, requirements_txt="not-a-real-module==1.0")
+    assert environment_mismatches(missing) == ["not-a-real-module (not installed)"]
+    assert environment_mismatches(code(len, conda_yaml="env.yaml")) == ["a conda_yaml environment"]
+    assert environment_mismatches(code(len, python_version="2.7")) == [f"python 2.7 (running {running})"]
+    with pytest.raises(ValueError, match="conda_yaml"):
+        ProcessExecutor(workers=1).apply(code(len, conda_yaml="env.yaml"), [np.arange(3)])
+
+
+def test_environment_hash_ignores_everything_but_the_environment():
+    assert environment_hash(code(len, python_version="3.9")) == environment_hash(code(abs, python_version="3.9"))
+    assert environment_hash(code(len, python_version="3.9")) != environment_hash(code(len, python_version="3.10"))